@@ -22,6 +22,12 @@ EMAIL_ADDRESS = "ibrahimkiri.stitch@gmail.com"
 EMAIL_HOST_USER = config("EMAIL_HOST_USER", cast=str, default=None)
 EMAIL_HOST_PASSWORD = config("EMAIL_HOST_PASSWORD", cast=str, default=None)
 EMAIL_USE_TLS = config("EMAIL_USE_TLS", cast=bool, default=True)  # Use EMAIL_PORT 587 for TLS
+# Outbox worker (python manage.py send_outbox_emails)
+EMAIL_OUTBOX_MAX_ATTEMPTS = config("EMAIL_OUTBOX_MAX_ATTEMPTS", cast=int, default=5)
+EMAIL_OUTBOX_RETRY_BACKOFF = config("EMAIL_OUTBOX_RETRY_BACKOFF", cast=int, default=30)  # seconds, doubled per attempt
+EMAIL_POOL_SIZE = config("EMAIL_POOL_SIZE", cast=int, default=4)  # open SMTP sessions kept by the worker
+EMAIL_BATCH_SIZE = config("EMAIL_BATCH_SIZE", cast=int, default=50)  # messages per pooled session checkout
+EMAIL_ACCESS_CACHE_TTL = config("EMAIL_ACCESS_CACHE_TTL", cast=int, default=300)  # seconds between Email.active checks per session
 
 ADMIN_USER_NAME=config("ADMIN_USER_NAME", default="admin")
 ADMIN_USER_EMAIL=config("ADMIN_USER_EMAIL", default=None)
@@ -67,7 +73,8 @@ INSTALLED_APPS = [
     "theme", # django-tailwind theme app
     # internal
     "courses",
-    "emails"
+    "emails",
+    "perf", # benchmarks and load tools (management commands only)
 ]
 
 TAILWIND_APP_NAME="theme" # django-tailwind theme app
@@ -77,6 +84,7 @@ INTERNAL_IPS = [
 ]
 
 MIDDLEWARE = [
+    "helpers.PerformanceMiddleware",  # first, so it measures the whole request
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -97,7 +105,8 @@ ROOT_URLCONF = 'course.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates with render times recorded for Server-Timing
+        'BACKEND': 'helpers.TimedDjangoTemplates',
         'DIRS': [
             TEMPLATE_DIR,
         ],
@@ -123,10 +132,101 @@ DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        # A file (not in-memory) test database, so tests can open
+        # several connections, e.g. concurrent verify_token calls
+        'TEST': {
+            'NAME': BASE_DIR / 'test_db.sqlite3',
+        },
     }
 }
 
 
+# Cache
+# https://docs.djangoproject.com/en/5.1/topics/cache/
+# Defaults to the in-process locmem cache; for a cache shared between workers
+# without Redis use the file-based backend, e.g.
+# CACHE_BACKEND=django.core.cache.backends.filebased.FileBasedCache
+# CACHE_LOCATION=/var/tmp/course_platform_cache
+
+CACHES = {
+    'default': {
+        'BACKEND': config("CACHE_BACKEND", default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': config("CACHE_LOCATION", default='course-platform'),
+    }
+}
+
+# Sessions
+# https://docs.djangoproject.com/en/5.1/topics/http/sessions/
+# SESSION_STRATEGY picks the engine: "cached_db" (default) serves verified
+# readers from the cache and writes through to the database, "db" is Django's
+# default, "signed_cookies" keeps no server-side state and "cache" no database
+# rows at all. Anonymous catalogue browsing never writes a session (the
+# post-verification `next_url` travels in a signed cookie).
+SESSION_ENGINES = {
+    "db": "django.contrib.sessions.backends.db",
+    "cached_db": "django.contrib.sessions.backends.cached_db",
+    "cache": "django.contrib.sessions.backends.cache",
+    "signed_cookies": "django.contrib.sessions.backends.signed_cookies",
+}
+SESSION_STRATEGY = config("SESSION_STRATEGY", default="cached_db")
+SESSION_ENGINE = SESSION_ENGINES[SESSION_STRATEGY]
+
+# Rendered course list / detail fragments, invalidated on content changes
+COURSES_CACHE_TIMEOUT = config("COURSES_CACHE_TIMEOUT", cast=int, default=60 * 60)
+# Courses per catalogue page; further pages load through /courses/hx/more/
+COURSES_PAGE_SIZE = config("COURSES_PAGE_SIZE", cast=int, default=12)
+# Cache-Control max-age of the /api/courses/ JSON responses
+COURSES_API_MAX_AGE = config("COURSES_API_MAX_AGE", cast=int, default=60)
+# Route /courses/ to the native async views (run under course/asgi.py)
+COURSES_ASYNC_VIEWS = config("COURSES_ASYNC_VIEWS", cast=bool, default=False)
+
+# Per-request performance metrics (helpers.PerformanceMiddleware)
+# Send a Server-Timing header (DB, templates, Cloudinary, cache) with every response
+PERF_SERVER_TIMING = config("PERF_SERVER_TIMING", cast=bool, default=DEBUG)
+# Fraction of debug / info log records written (warnings and errors always are)
+PERF_LOG_SAMPLE_RATE = config("PERF_LOG_SAMPLE_RATE", cast=float, default=1.0 if DEBUG else 0.1)
+LOG_LEVEL = config("LOG_LEVEL", default="INFO")
+# DEBUG turns on the per-request "helpers.perf" line, written from a background thread
+PERF_LOG_LEVEL = config("PERF_LOG_LEVEL", default="INFO")
+# /metrics: set METRICS_MULTIPROC_DIR to a directory shared by all worker
+# processes (gunicorn workers, send_outbox_emails) to sum their metrics
+METRICS_MULTIPROC_DIR = config("METRICS_MULTIPROC_DIR", default="")
+METRICS_FLUSH_INTERVAL = config("METRICS_FLUSH_INTERVAL", cast=float, default=5.0)
+# When set, /metrics requires "Authorization: Bearer <token>"
+METRICS_AUTH_TOKEN = config("METRICS_AUTH_TOKEN", default="")
+
+# Logging
+# https://docs.djangoproject.com/en/5.1/topics/logging/
+# "helpers.perf" writes one line per request with its metrics at DEBUG
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {
+        "sampled": {
+            "()": "helpers.SampleFilter",
+            "rate": PERF_LOG_SAMPLE_RATE,
+        },
+    },
+    "handlers": {
+        "console": {
+            "class": "logging.StreamHandler",
+            "filters": ["sampled"],
+        },
+        "perf": {
+            "class": "helpers.QueuedStreamHandler",
+            "filters": ["sampled"],
+        },
+    },
+    "loggers": {
+        "helpers.perf": {"handlers": ["perf"], "level": PERF_LOG_LEVEL, "propagate": False},
+        **{
+            name: {"handlers": ["console"], "level": LOG_LEVEL, "propagate": False}
+            for name in ("course", "courses", "emails")
+        },
+    },
+}
+
+
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
 
@@ -175,6 +275,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CLOUDINARY_CLOUD_NAME = config("CLOUDINARY_CLOUD_NAME", default="")
 CLOUDINARY_PUBLIC_API_KEY = config("CLOUDINARY_PUBLIC_API_KEY", default="")
 CLOUDINARY_SECRET_API_KEY = config("CLOUDINARY_SECRET_API_KEY")
+CLOUDINARY_URL_CACHE_SIZE = config("CLOUDINARY_URL_CACHE_SIZE", cast=int, default=2048)
+# Signed video URLs / embeds are cached for a fraction of their validity window
+CLOUDINARY_SIGNED_URL_VALIDITY = config("CLOUDINARY_SIGNED_URL_VALIDITY", cast=int, default=3600)
 
 # npm configuration
 NPM_BIN_PATH = r"C:\Program Files\nodejs\npm"  # Replace with the correct path
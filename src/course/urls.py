@@ -31,7 +31,9 @@ urlpatterns = [
     path('hx/logout/', logout_btn_hx_view),
     path('verify/<uuid:token>/', verify_email_token_view),
     path("courses/", include("courses.urls")),
+    path("api/courses/", include("courses.api_urls")),
     path("admin/", admin.site.urls),
+    path("metrics", views.metrics_view),  # Prometheus scrape endpoint
 ]
 
 # Add static and development-specific routes if in DEBUG mode
@@ -1,13 +1,22 @@
+import logging
+import helpers
 from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden
 from django.shortcuts import render
+from django.utils.crypto import constant_time_compare
 
+from courses.cache import get_cached_course_list_snippet
 from emails import services as emails_services
 from emails.models import Email, EmailVerificationEvent
-from emails.forms import EmailForm
+from emails.forms import EmailForm, get_login_form_context
+
+logger = logging.getLogger(__name__)
 
 # View for rendering the login/logout page
 def login_logout_template_view(request):
-    return render(request, "auth/login-logout.html", {})
+    # The login form (or logout button) is rendered inline, not fetched with HTMX
+    context = get_login_form_context(not request.session.get('email_id'))
+    return render(request, "auth/login-logout.html", context)
 
 # Email address used in verification messages
 EMAIL_ADDRESS = settings.EMAIL_ADDRESS
@@ -18,19 +27,35 @@ def home_view(request, *args, **kwargs):
     form = EmailForm(request.POST or None)  # Initialize form with POST data if available
     context = {
         "form": form,
-        "message": ""
+        "message": "",
+        # Inlined when already cached; otherwise loaded with HTMX once scrolled to
+        "courses_html": get_cached_course_list_snippet(),
     }
     
     if form.is_valid():  # Process form submission
         email_val = form.cleaned_data.get('email')  # Extract the email value
         obj = emails_services.start_verification_event(email_val)  # Start verification
-        print(obj)  # Log the verification object
+        logger.debug("Started email verification: %s", obj)  # Log the verification object
         context['form'] = EmailForm()  # Reset the form
         context['message'] = f"Success! Check your email for verification from {EMAIL_ADDRESS}"
     else:
-        print(form.errors)  # Log any form errors
+        logger.debug("Email form errors: %s", form.errors.as_data())  # Log any form errors
     
     # Log the email ID stored in the session (if any)
-    print('email_id', request.session.get('email_id'))
+    logger.debug("Session email_id: %s", request.session.get('email_id'))
     
     return render(request, template_name, context)  # Render the home page with the context
+
+# Optional bearer token the /metrics scraper must send
+METRICS_AUTH_TOKEN = getattr(settings, "METRICS_AUTH_TOKEN", "")
+
+# Prometheus scrape endpoint (text format), summed over workers in multi-process mode
+def metrics_view(request):
+    if METRICS_AUTH_TOKEN:
+        authorization = request.headers.get("Authorization", "")
+        if not constant_time_compare(authorization, f"Bearer {METRICS_AUTH_TOKEN}"):
+            return HttpResponseForbidden()
+    return HttpResponse(
+        helpers.render_metrics(),
+        content_type="text/plain; version=0.0.4; charset=utf-8",
+    )
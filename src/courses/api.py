@@ -0,0 +1,116 @@
+import json
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils.cache import patch_cache_control
+from django.views.decorators.http import require_GET
+
+from . import services
+from .models import AccessRequirement, PublishStatus
+
+# Seconds shared caches (CDN / edge) may serve an API response
+API_MAX_AGE = getattr(settings, "COURSES_API_MAX_AGE", 60)
+# Upper bound on `?ids=` so one request stays two bounded queries
+MAX_BULK_IDS = 100
+# Rows fetched per database round trip while streaming the catalogue
+STREAM_CHUNK_SIZE = 500
+
+def serialize_lesson(values, course_path, requires_email):
+    return {
+        "id": values["public_id"],
+        "title": values["title"],
+        "url": f"{course_path}/lessons/{values['public_id']}",
+        "coming_soon": values["status"] == PublishStatus.COMING_SOON,
+        "requires_email": requires_email,
+        "order": values["order"],
+        "can_preview": values["can_preview"],
+        "thumbnail": values["renditions"].get("thumbnail"),
+        "updated": values["updated"],
+    }
+
+def serialize_course(values, lessons=None):
+    """
+    `values` is a row from services.get_publish_courses_values(); image URLs
+    come from the precomputed renditions, never from Cloudinary calls.
+    """
+    path = f"/courses/{values['public_id']}"
+    requires_email = values["access"] == AccessRequirement.EMAIL_REQUIRED
+    data = {
+        "id": values["public_id"],
+        "title": values["title"],
+        "url": path,
+        "requires_email": requires_email,
+        "thumbnail": values["renditions"].get("thumbnail"),
+        "image": values["renditions"].get("display"),
+        "timestamp": values["timestamp"],
+        "updated": values["updated"],
+    }
+    if "description" in values:
+        data["description"] = values["description"]
+    if lessons is not None:
+        data["lessons"] = [serialize_lesson(lesson, path, requires_email) for lesson in lessons]
+    return data
+
+# Yields {"results": [...]} piece by piece so large lists are never built in memory
+def stream_results(items):
+    encoder = DjangoJSONEncoder()
+    yield '{"results": ['
+    for index, item in enumerate(items):
+        yield ("," if index else "") + encoder.encode(item)
+    yield "]}"
+
+def api_response(data, status=200):
+    response = JsonResponse(data, status=status)
+    if status == 200:
+        patch_cache_control(response, public=True, max_age=API_MAX_AGE)
+    return response
+
+# GET /api/courses/ and GET /api/courses/?ids=a,b,c
+@require_GET
+def course_list_api_view(request):
+    """
+    Lists the published catalogue, newest first (streamed).
+    With `?ids=` returns just those courses, lessons embedded, in the
+    requested order; unknown or unpublished ids are left out.
+    """
+    ids = request.GET.get("ids")
+    if ids is not None:
+        return course_bulk_response(ids)
+    rows = services.get_publish_courses_values().iterator(chunk_size=STREAM_CHUNK_SIZE)
+    response = StreamingHttpResponse(
+        stream_results(serialize_course(row) for row in rows),
+        content_type="application/json"
+    )
+    patch_cache_control(response, public=True, max_age=API_MAX_AGE)
+    return response
+
+def course_bulk_response(ids):
+    public_ids = list(dict.fromkeys(pid for pid in ids.split(",") if pid))
+    if len(public_ids) > MAX_BULK_IDS:
+        return api_response({"detail": f"At most {MAX_BULK_IDS} ids per request."}, status=400)
+    courses = list(services.get_publish_courses_values(
+        public_ids=public_ids,
+        fields=services.COURSE_DETAIL_VALUES_FIELDS
+    ))
+    lessons = services.get_course_lessons_values([course["id"] for course in courses])
+    by_public_id = {course["public_id"]: course for course in courses}
+    results = [
+        serialize_course(by_public_id[pid], lessons[by_public_id[pid]["id"]])
+        for pid in public_ids if pid in by_public_id
+    ]
+    return api_response({"results": results})
+
+# GET /api/courses/<public_id>/
+@require_GET
+def course_detail_api_view(request, course_id=None):
+    """
+    One published course with its published / coming-soon lessons embedded.
+    """
+    course = services.get_publish_courses_values(
+        public_ids=[course_id],
+        fields=services.COURSE_DETAIL_VALUES_FIELDS
+    ).first()
+    if course is None:
+        return api_response({"detail": "Not found."}, status=404)
+    lessons = services.get_course_lessons_values([course["id"]])
+    return api_response(serialize_course(course, lessons[course["id"]]))
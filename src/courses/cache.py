@@ -0,0 +1,56 @@
+import helpers
+import time
+from django.conf import settings
+from django.core.cache import cache
+
+# How long rendered course fragments are kept (seconds)
+FRAGMENT_CACHE_TIMEOUT = getattr(settings, "COURSES_CACHE_TIMEOUT", 60 * 60)
+
+# Version scopes
+LIST_SCOPE = "list"
+
+# Fragment name of the 3-course snippet the home page shows
+COURSE_LIST_SNIPPET = "course_list_hx"
+
+def get_course_scope(course_id):
+    return f"course:{course_id}"
+
+def get_version_key(scope):
+    return f"courses:content-version:{scope}"
+
+# Returns the current content version for a scope (course list or one course)
+def get_content_version(scope=LIST_SCOPE):
+    # A timestamp (not a counter) so an evicted version key never
+    # maps back onto fragments rendered for an older version
+    return cache.get_or_set(get_version_key(scope), time.time_ns, None)
+
+# Invalidates every fragment rendered for the given scopes
+def bump_content_version(*scopes):
+    version = time.time_ns()
+    cache.set_many({get_version_key(scope): version for scope in scopes}, None)
+    return version
+
+def get_fragment_key(name, *vary_on):
+    parts = ":".join(str(part) for part in vary_on)
+    return f"courses:fragment:{name}:{parts}"
+
+# Returns a cached fragment, rendering and storing it on a miss
+def get_or_render_fragment(name, vary_on, render, timeout=FRAGMENT_CACHE_TIMEOUT):
+    key = get_fragment_key(name, *vary_on)
+    html = cache.get(key)
+    helpers.perf_count("cache_hit" if html is not None else "cache_miss")
+    if html is None:
+        html = render()
+        cache.set(key, html, timeout)
+    return html
+
+# Returns a fragment only if it is already cached (None otherwise)
+def get_cached_fragment(name, vary_on):
+    html = cache.get(get_fragment_key(name, *vary_on))
+    helpers.perf_count("cache_hit" if html is not None else "cache_miss")
+    return html
+
+# The course list snippet, if a previous request already rendered it for this version
+def get_cached_course_list_snippet():
+    content_version = get_content_version(LIST_SCOPE)
+    return get_cached_fragment(COURSE_LIST_SNIPPET, [content_version])
@@ -0,0 +1,63 @@
+import hashlib
+from asgiref.sync import sync_to_async
+from calendar import timegm
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+# Returns the most recent of the given datetimes (ignoring missing ones)
+def latest(*timestamps):
+    timestamps = [ts for ts in timestamps if ts is not None]
+    return max(timestamps) if timestamps else None
+
+# Session state every page renders (the navbar shows login / logout)
+def get_session_state(request):
+    return "email" if request.session.get('email_id') else "anon"
+
+# Same states, from an already resolved emails.access.EmailAccess
+def get_access_state(email_access):
+    return "email" if email_access.is_verified else "anon"
+
+def make_etag(last_modified, *vary_on):
+    parts = [last_modified.isoformat() if last_modified else ""]
+    parts += [str(part) for part in vary_on]
+    digest = hashlib.md5("|".join(parts).encode(), usedforsecurity=False).hexdigest()
+    return quote_etag(digest)
+
+def evaluate(request, last_modified, vary_on, session_state=None):
+    """
+    Returns (etag, last_modified_ts, not_modified_response).
+    The response is None when the client's copy is stale.
+    """
+    if session_state is None:
+        session_state = get_session_state(request)
+    etag = make_etag(last_modified, session_state, *vary_on)
+    last_modified_ts = timegm(last_modified.utctimetuple()) if last_modified else None
+    response = get_conditional_response(request, etag=etag, last_modified=last_modified_ts)
+    return etag, last_modified_ts, response
+
+def set_validators(response, etag, last_modified_ts):
+    if last_modified_ts and not response.has_header("Last-Modified"):
+        response.headers["Last-Modified"] = http_date(last_modified_ts)
+    response.headers.setdefault("ETag", etag)
+    return response
+
+# Answers If-None-Match / If-Modified-Since with a 304 before `render` is called
+def conditional_response(request, last_modified, vary_on, render, session_state=None):
+    """
+    `last_modified` is the validator's timestamp and `vary_on` any extra
+    state the rendered page depends on (session email state, HTMX, ...).
+    """
+    etag, last_modified_ts, response = evaluate(request, last_modified, vary_on, session_state)
+    if response is None:
+        response = render()
+    return set_validators(response, etag, last_modified_ts)
+
+# Async variant: the sync `render` (templates, lazy querysets) runs in one thread hop
+async def aconditional_response(request, last_modified, vary_on, render, session_state):
+    etag, last_modified_ts, response = evaluate(request, last_modified, vary_on, session_state)
+    if response is None:
+        response = await sync_to_async(render)()
+    return set_validators(response, etag, last_modified_ts)
+
+async def aget_session_state(request):
+    return "email" if await request.session.aget('email_id') else "anon"
@@ -0,0 +1,22 @@
+import sys
+from django.core.management.base import BaseCommand
+
+from courses import transfer
+
+
+class Command(BaseCommand):
+    help = "Write courses and their lessons to a JSON or CSV manifest that import_course reads."
+
+    def add_arguments(self, parser):
+        parser.add_argument("public_ids", nargs="*", help="Courses to export (default: all).")
+        parser.add_argument("--format", choices=["json", "csv"], default="json")
+        parser.add_argument("-o", "--output", help="Output file (default: stdout).")
+
+    def handle(self, *args, **options):
+        courses = transfer.export_courses(options["public_ids"] or None)
+        if options["output"]:
+            with open(options["output"], "w", newline="") as fh:
+                transfer.write_manifest(courses, fh, format=options["format"])
+            self.stderr.write(f"Exported {len(courses)} course(s) to {options['output']}")
+        else:
+            transfer.write_manifest(courses, self.stdout, format=options["format"])
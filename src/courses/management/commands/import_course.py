@@ -0,0 +1,58 @@
+import os
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.module_loading import import_string
+
+from courses import transfer
+
+
+class Command(BaseCommand):
+    help = (
+        "Create courses and lessons from a JSON or CSV manifest and upload their "
+        "media to Cloudinary. Interrupted imports resume from the progress file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("manifest", help="Path to a .json or .csv manifest.")
+        parser.add_argument("--workers", type=int, default=transfer.UPLOAD_WORKERS, help="Upload threads.")
+        parser.add_argument("--batch-size", type=int, default=transfer.BATCH_SIZE)
+        parser.add_argument(
+            "--progress",
+            help="Progress file (default: <manifest>.progress.json).",
+        )
+        parser.add_argument(
+            "--restart",
+            action="store_true",
+            help="Ignore an existing progress file and start over.",
+        )
+        parser.add_argument(
+            "--uploader",
+            default=transfer.MEDIA_UPLOADER,
+            help="Dotted path of the upload callable (source, **options).",
+        )
+
+    def handle(self, *args, **options):
+        manifest = options["manifest"]
+        try:
+            courses = transfer.read_manifest(manifest)
+        except (OSError, ValueError) as e:
+            raise CommandError(e)
+        progress_path = options["progress"] or f"{manifest}.progress.json"
+        if options["restart"] and os.path.exists(progress_path):
+            os.remove(progress_path)
+        result = transfer.import_courses(
+            courses,
+            base_dir=os.path.dirname(os.path.abspath(manifest)),
+            progress=transfer.ImportProgress(progress_path),
+            uploader=import_string(options["uploader"]),
+            max_workers=options["workers"],
+            batch_size=options["batch_size"],
+        )
+        self.stdout.write(
+            f"courses created={result.courses_created} lessons created={result.lessons_created} "
+            f"uploaded={result.uploaded} failed={len(result.failed)}"
+        )
+        for key, error in result.failed:
+            self.stderr.write(f"upload {key} failed: {error}")
+        if result.failed:
+            raise CommandError(f"{len(result.failed)} upload(s) failed; run the command again to retry them")
+        self.stdout.write(self.style.SUCCESS(f"Imported {len(courses)} course(s)"))
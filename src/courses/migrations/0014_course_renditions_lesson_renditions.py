@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:22
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0013_alter_course_public_id_alter_lesson_public_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='course',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='renditions',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
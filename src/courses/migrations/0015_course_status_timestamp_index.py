@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:43
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0014_course_renditions_lesson_renditions'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='course',
+            index=models.Index(fields=['status', 'timestamp', 'id'], name='courses_course_status_ts_idx'),
+        ),
+    ]
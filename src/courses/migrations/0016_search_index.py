@@ -0,0 +1,47 @@
+from django.db import OperationalError, migrations
+
+# Mirrors courses.search: rowid = id * 2 for courses, id * 2 + 1 for lessons,
+# and only visible rows (published courses, their published / coming-soon lessons)
+CREATE_SQL = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS courses_search USING fts5("
+    "title, body, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+)
+POPULATE_SQL = [
+    "INSERT INTO courses_search (rowid, title, body) "
+    "SELECT id * 2, title, COALESCE(description, '') FROM courses_course WHERE status = 'publish'",
+    "INSERT INTO courses_search (rowid, title, body) "
+    "SELECT l.id * 2 + 1, l.title, COALESCE(l.description, '') FROM courses_lesson l "
+    "JOIN courses_course c ON c.id = l.course_id "
+    "WHERE c.status = 'publish' AND l.status IN ('publish', 'soon')",
+]
+
+
+def create_search_index(apps, schema_editor):
+    # Other databases (or SQLite builds without FTS5) use the in-process index
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        try:
+            cursor.execute(CREATE_SQL)
+        except OperationalError:
+            return
+        for sql in POPULATE_SQL:
+            cursor.execute(sql)
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != "sqlite":
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS courses_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0015_course_status_timestamp_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0016_search_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['course', 'status', 'order'], name='courses_lesson_outline_idx'),
+        ),
+    ]
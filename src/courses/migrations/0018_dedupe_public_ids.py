@@ -0,0 +1,54 @@
+import secrets
+import time
+from django.db import migrations
+from django.db.models import Count, Q
+from django.utils.text import slugify
+
+# Frozen copy of courses.models.generate_public_id as of this migration;
+# later changes to the live function must not change what this one writes
+ALPHABET = "0123456789abcdefghjkmnpqrstvwxyz"
+SLUG_LENGTH = 100
+
+
+def encode_base32(value, length):
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, 32)
+        chars.append(ALPHABET[index])
+    return "".join(reversed(chars))
+
+
+def generate_public_id(obj):
+    unique_id = encode_base32(time.time_ns() // 1_000_000, 10) + encode_base32(secrets.randbits(40), 8)
+    slug = slugify(obj.title or "")[:SLUG_LENGTH].strip("-")
+    return f"{slug}-{unique_id}" if slug else unique_id
+
+
+def dedupe_public_ids(apps, schema_editor):
+    # The oldest row keeps a shared public_id; the others (and rows without
+    # one) get a fresh id, so 0019 can add the unique constraints
+    for model_name in ("Course", "Lesson"):
+        model = apps.get_model("courses", model_name)
+        duplicates = (
+            model.objects.exclude(public_id__isnull=True).exclude(public_id="")
+            .values("public_id").annotate(rows=Count("id")).filter(rows__gt=1)
+            .values_list("public_id", flat=True)
+        )
+        changed = []
+        for public_id in list(duplicates):
+            changed += list(model.objects.filter(public_id=public_id).order_by("id")[1:])
+        changed += list(model.objects.filter(Q(public_id__isnull=True) | Q(public_id="")))
+        for obj in changed:
+            obj.public_id = generate_public_id(obj)
+        model.objects.bulk_update(changed, ["public_id"], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0017_lesson_outline_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(dedupe_public_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.1.15 on 2026-10-18 09:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('courses', '0018_dedupe_public_ids'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='course',
+            name='public_id',
+            field=models.CharField(blank=True, max_length=130, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='lesson',
+            name='public_id',
+            field=models.CharField(blank=True, max_length=130, null=True, unique=True),
+        ),
+    ]
@@ -1,9 +1,12 @@
-import uuid
 import helpers
-from django.db import models
+import secrets
+import time
+from django.db import IntegrityError, models, transaction
 from django.utils.text import slugify
 from cloudinary.models import CloudinaryField
 
+from . import cache as courses_cache
+
 # Initialize Cloudinary configuration
 helpers.cloudinary_init()
 
@@ -22,15 +25,48 @@ class PublishStatus(models.TextChoices):
 def handle_upload(instance, filename):
     return f"{filename}"
 
+# Lowercase Crockford base32: URL-safe, no ambiguous characters
+PUBLIC_ID_ALPHABET = "0123456789abcdefghjkmnpqrstvwxyz"
+# Slug length kept so slug + suffix fit the public_id column
+PUBLIC_ID_SLUG_LENGTH = 100
+# Fresh ids tried when a save collides with an existing public_id
+PUBLIC_ID_ATTEMPTS = 3
+
+def encode_base32(value, length):
+    chars = []
+    for _ in range(length):
+        value, index = divmod(value, 32)
+        chars.append(PUBLIC_ID_ALPHABET[index])
+    return "".join(reversed(chars))
+
+# Compact, time-ordered unique suffix: 48-bit milliseconds + 40 random bits
+def generate_public_id_suffix():
+    timestamp = encode_base32(time.time_ns() // 1_000_000, 10)
+    return timestamp + encode_base32(secrets.randbits(40), 8)
+
 # Generate a unique public ID for a model instance
 def generate_public_id(instance, *args, **kwargs):
     title = instance.title
-    unique_id = str(uuid.uuid4()).replace("-", "")
+    unique_id = generate_public_id_suffix()
     if not title:
         return unique_id
-    slug = slugify(title)
-    unique_id_short = unique_id[:5]
-    return f"{slug}-{unique_id_short}"
+    slug = slugify(title)[:PUBLIC_ID_SLUG_LENGTH].strip("-")
+    return f"{slug}-{unique_id}" if slug else unique_id
+
+# Saves an instance, generating its public ID (again, on a collision) when missing
+def save_with_public_id(instance, save, *args, **kwargs):
+    if instance.public_id:
+        return save(*args, **kwargs)
+    for attempt in range(PUBLIC_ID_ATTEMPTS):
+        instance.public_id = generate_public_id(instance)
+        try:
+            # A savepoint, so a collision leaves an outer transaction usable
+            with transaction.atomic():
+                return save(*args, **kwargs)
+        except IntegrityError:
+            if attempt == PUBLIC_ID_ATTEMPTS - 1:
+                instance.public_id = None
+                raise
 
 # Generate a public ID prefix based on instance attributes
 def get_public_id_prefix(instance, *args, **kwargs):
@@ -47,11 +83,27 @@ def get_display_name(instance, *args, **kwargs):
         return instance.get_display_name()
     return getattr(instance, 'title', instance.__class__.__name__)
 
+# Recompute an instance's renditions and store them if they changed
+def save_renditions(instance, *scopes):
+    """
+    Runs after save(): media are only uploaded during it. post_save has
+    already bumped the content version of `scopes` by then, so a page
+    rendered in between would keep the old URLs: bump them again.
+    """
+    renditions = instance.build_renditions()
+    if renditions == instance.renditions:
+        return False
+    instance.renditions = renditions
+    # Queryset update so `updated` is not bumped a second time
+    instance.__class__.objects.filter(pk=instance.pk).update(renditions=renditions)
+    courses_cache.bump_content_version(*scopes)
+    return True
+
 # Course model
 class Course(models.Model):
     title = models.CharField(max_length=120)
     description = models.TextField(blank=True, null=True)
-    public_id = models.CharField(max_length=130, blank=True, null=True, db_index=True)
+    public_id = models.CharField(max_length=130, blank=True, null=True, unique=True)
     image = CloudinaryField(
         "image", 
         null=True, 
@@ -69,14 +121,24 @@ class Course(models.Model):
         choices=PublishStatus.choices,
         default=PublishStatus.DRAFT,
     )
+    # Precomputed Cloudinary URLs, rendition name -> URL
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
     timestamp = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            # Keyset pagination of the published catalogue on (timestamp, id)
+            models.Index(fields=["status", "timestamp", "id"], name="courses_course_status_ts_idx"),
+        ]
+
     def save(self, *args, **kwargs):
-        # Automatically generate a public ID before saving
-        if not self.public_id:
-            self.public_id = generate_public_id(self)
-        super().save(*args, **kwargs)
+        # Media stored before this save, whose memoized URLs go if replaced
+        previous_public_ids = helpers.get_stored_cloudinary_public_ids(self)
+        # Automatically generate a (unique) public ID before saving
+        save_with_public_id(self, super().save, *args, **kwargs)
+        helpers.invalidate_cloudinary_object(self, previous_public_ids)
+        save_renditions(self, courses_cache.LIST_SCOPE, courses_cache.get_course_scope(self.pk))
 
     def get_absolute_url(self):
         return self.path
@@ -85,15 +147,31 @@ class Course(models.Model):
     def path(self):
         return f"/courses/{self.public_id}"
 
+    def build_renditions(self):
+        if not self.image:
+            return {}
+        return {
+            "thumbnail": helpers.get_cloudinary_image_object(self, field_name='image', as_html=False, width=382),
+            "display": helpers.get_cloudinary_image_object(self, field_name='image', as_html=False, width=750),
+        }
+
     def get_display_name(self):
         return f"{self.title} - Course"
 
+    @property
+    def requires_email(self):
+        return self.access == AccessRequirement.EMAIL_REQUIRED
+
     def get_thumbnail(self):
+        if "thumbnail" in self.renditions:
+            return self.renditions["thumbnail"]
         if not self.image:
             return None
         return helpers.get_cloudinary_image_object(self, field_name='image', as_html=False, width=382)
 
     def get_display_image(self):
+        if "display" in self.renditions:
+            return self.renditions["display"]
         if not self.image:
             return None
         return helpers.get_cloudinary_image_object(self, field_name='image', as_html=False, width=750)
@@ -105,7 +183,7 @@ class Course(models.Model):
 # Lesson model
 class Lesson(models.Model):
     course = models.ForeignKey(Course, on_delete=models.CASCADE)
-    public_id = models.CharField(max_length=130, blank=True, null=True, db_index=True)
+    public_id = models.CharField(max_length=130, blank=True, null=True, unique=True)
     title = models.CharField(max_length=120)
     description = models.TextField(blank=True, null=True)
     thumbnail = CloudinaryField(
@@ -136,17 +214,25 @@ class Lesson(models.Model):
         choices=PublishStatus.choices,
         default=PublishStatus.PUBLISHED
     )
+    # Precomputed Cloudinary URLs, rendition name -> URL
+    renditions = models.JSONField(default=dict, blank=True, editable=False)
     timestamp = models.DateTimeField(auto_now_add=True)
     updated = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['order', '-updated']
+        indexes = [
+            # A course's visible lessons in order (course outline)
+            models.Index(fields=["course", "status", "order"], name="courses_lesson_outline_idx"),
+        ]
 
     def save(self, *args, **kwargs):
-        # Automatically generate a public ID before saving
-        if not self.public_id:
-            self.public_id = generate_public_id(self)
-        super().save(*args, **kwargs)
+        # Media stored before this save, whose memoized URLs go if replaced
+        previous_public_ids = helpers.get_stored_cloudinary_public_ids(self)
+        # Automatically generate a (unique) public ID before saving
+        save_with_public_id(self, super().save, *args, **kwargs)
+        helpers.invalidate_cloudinary_object(self, previous_public_ids)
+        save_renditions(self, courses_cache.get_course_scope(self.course_id))
 
     def get_absolute_url(self):
         return self.path
@@ -158,7 +244,7 @@ class Lesson(models.Model):
 
     @property
     def requires_email(self):
-        return self.course.access == AccessRequirement.EMAIL_REQUIRED
+        return self.course.requires_email
 
     def get_display_name(self):
         return f"{self.title} - {self.course.get_display_name()}"
@@ -171,7 +257,19 @@ class Lesson(models.Model):
     def has_video(self):
         return self.video is not None
 
+    def build_renditions(self):
+        renditions = {}
+        thumbnail_url = self.build_thumbnail()
+        if thumbnail_url:
+            renditions["thumbnail"] = thumbnail_url
+        return renditions
+
     def get_thumbnail(self):
+        if "thumbnail" in self.renditions:
+            return self.renditions["thumbnail"]
+        return self.build_thumbnail()
+
+    def build_thumbnail(self):
         width = 382
         if self.thumbnail:
             return helpers.get_cloudinary_image_object(self, field_name='thumbnail', format='jpg', as_html=False, width=width)
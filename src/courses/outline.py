@@ -0,0 +1,73 @@
+import helpers
+from django.core.cache import cache
+
+from . import cache as courses_cache
+from .services import LESSON_LIST_FIELDS, VISIBLE_LESSON_STATUSES
+
+# How long a course outline is kept; a new content version replaces it sooner
+OUTLINE_CACHE_TIMEOUT = courses_cache.FRAGMENT_CACHE_TIMEOUT
+
+# One lesson row of a course page, with everything the template needs precomputed
+class OutlineEntry:
+    __slots__ = (
+        "public_id", "title", "path", "thumbnail_url",
+        "is_coming_soon", "can_preview", "requires_email",
+    )
+
+    def __init__(self, public_id, title, path, thumbnail_url, is_coming_soon, can_preview, requires_email):
+        self.public_id = public_id
+        self.title = title
+        self.path = path
+        self.thumbnail_url = thumbnail_url
+        self.is_coming_soon = is_coming_soon
+        self.can_preview = can_preview
+        self.requires_email = requires_email
+
+    # Same accessors as Lesson, so the shared list snippets render entries too
+    def get_absolute_url(self):
+        return self.path
+
+    def get_thumbnail(self):
+        return self.thumbnail_url
+
+    @classmethod
+    def from_lesson(cls, lesson):
+        return cls(
+            lesson.public_id,
+            lesson.title,
+            lesson.path,
+            lesson.get_thumbnail(),
+            lesson.is_coming_soon,
+            lesson.can_preview,
+            lesson.requires_email,
+        )
+
+def get_outline_key(course_id, version):
+    return f"courses:outline:{course_id}:{version}"
+
+# Builds the outline of a published course in one query
+def build_course_outline(course_obj):
+    if not course_obj.is_published:
+        return []
+    # course_obj is already known to be published, so no join on the course;
+    # (course, status, order) is indexed and lesson.course is course_obj itself
+    lessons = course_obj.lesson_set.filter(
+        status__in=VISIBLE_LESSON_STATUSES
+    ).only(*LESSON_LIST_FIELDS)  # Lesson.Meta.ordering: order, -updated
+    return [OutlineEntry.from_lesson(lesson) for lesson in lessons]
+
+# Returns the course's outline, cached per course content version
+def get_course_outline(course_obj, version=None):
+    """
+    The version is bumped by every lesson (and course) save / delete, so
+    a changed lesson is never served from an older outline.
+    """
+    if version is None:
+        version = courses_cache.get_content_version(courses_cache.get_course_scope(course_obj.id))
+    key = get_outline_key(course_obj.id, version)
+    outline = cache.get(key)
+    helpers.perf_count("cache_hit" if outline is not None else "cache_miss")
+    if outline is None:
+        outline = build_course_outline(course_obj)
+        cache.set(key, outline, OUTLINE_CACHE_TIMEOUT)
+    return outline
@@ -0,0 +1,58 @@
+import base64
+import binascii
+from datetime import datetime
+from functools import cached_property
+from django.db.models import Q
+
+# Opaque cursor for the (timestamp, id) keyset of the last row on a page
+def encode_cursor(obj):
+    raw = f"{obj.timestamp.isoformat()}|{obj.pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+def decode_cursor(cursor):
+    """
+    Returns (timestamp, id). Raises ValueError for anything that is not
+    a cursor produced by `encode_cursor`.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        timestamp, pk = base64.urlsafe_b64decode(padded.encode()).decode().split("|")
+        return datetime.fromisoformat(timestamp), int(pk)
+    except (TypeError, UnicodeDecodeError, binascii.Error) as e:
+        raise ValueError(f"Invalid cursor: {cursor!r}") from e
+
+# One page of a newest-first (timestamp, id) keyset, evaluated on first use
+class KeysetPage:
+    """
+    Every page is a single range scan from the cursor, so fetching page
+    1000 costs the same as page 1. Lazy, so a cached fragment that never
+    reads the page never queries it.
+    """
+
+    def __init__(self, queryset, cursor=None, page_size=12):
+        self.queryset = queryset.order_by("-timestamp", "-id")
+        self.cursor = cursor
+        self.page_size = page_size
+        if cursor:
+            timestamp, pk = decode_cursor(cursor)
+            self.queryset = self.queryset.filter(
+                Q(timestamp__lt=timestamp) | Q(timestamp=timestamp, id__lt=pk)
+            )
+
+    @cached_property
+    def _rows(self):
+        # One extra row tells whether another page follows
+        return list(self.queryset[:self.page_size + 1])
+
+    @property
+    def items(self):
+        return self._rows[:self.page_size]
+
+    @property
+    def next_cursor(self):
+        if len(self._rows) <= self.page_size:
+            return None
+        return encode_cursor(self._rows[self.page_size - 1])
+
+    def __iter__(self):
+        return iter(self.items)
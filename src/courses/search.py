@@ -0,0 +1,443 @@
+import heapq
+import math
+import re
+import threading
+import unicodedata
+from bisect import bisect_left
+from collections import defaultdict
+from django.conf import settings
+from django.db import OperationalError, connection, transaction
+
+from .models import Course, Lesson, PublishStatus
+from .services import VISIBLE_LESSON_STATUSES
+
+# "auto" uses the SQLite FTS5 table when it exists, else the in-process index
+SEARCH_BACKEND = getattr(settings, "COURSES_SEARCH_BACKEND", "auto")
+SEARCH_RESULTS_LIMIT = 10
+# Shorter last words are matched exactly, not as a prefix of every term
+MIN_PREFIX_LENGTH = 3
+# Words matching more documents than this are too common to rank on within the
+# latency budget (bm25() costs microseconds per matching row); a query made only
+# of such words returns title matches first, unranked
+MAX_RANKED_MATCHES = 1000
+# Title matches outrank description matches
+TITLE_WEIGHT = 5.0
+BODY_WEIGHT = 1.0
+
+FTS_TABLE = "courses_search"
+COURSE = "course"
+LESSON = "lesson"
+
+TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+# Case and accent folding, like the FTS5 table's remove_diacritics: "Café" -> "cafe"
+def normalize(text):
+    decomposed = unicodedata.normalize("NFKD", (text or "").lower())
+    return "".join(char for char in decomposed if not unicodedata.combining(char))
+
+def tokenize(text):
+    return TOKEN_RE.findall(normalize(text))
+
+def is_course_visible(course):
+    return course.status == PublishStatus.PUBLISHED
+
+def is_lesson_visible(lesson, course):
+    return is_course_visible(course) and lesson.status in VISIBLE_LESSON_STATUSES
+
+# SQLite FTS5 table created by migration 0016; rowids encode (kind, id)
+class FTS5Backend:
+    name = "fts5"
+
+    @staticmethod
+    def rowid(kind, obj_id):
+        return obj_id * 2 + (1 if kind == LESSON else 0)
+
+    @staticmethod
+    def from_rowid(rowid):
+        return (LESSON if rowid % 2 else COURSE), rowid // 2
+
+    def index(self, kind, obj_id, title, body):
+        rowid = self.rowid(kind, obj_id)
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid = %s", [rowid])
+            cursor.execute(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, body) VALUES (%s, %s, %s)",
+                [rowid, title or "", body or ""],
+            )
+
+    def contains(self, kind, obj_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT 1 FROM {FTS_TABLE} WHERE rowid = %s", [self.rowid(kind, obj_id)])
+            return cursor.fetchone() is not None
+
+    def remove(self, kind, obj_ids):
+        rowids = [self.rowid(kind, obj_id) for obj_id in obj_ids]
+        if not rowids:
+            return
+        placeholders = ", ".join(["%s"] * len(rowids))
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE} WHERE rowid IN ({placeholders})", rowids)
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {FTS_TABLE}")
+
+    def load(self, kind, rows):
+        # Bulk insert after clear(): rows are (id, title, body)
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                f"INSERT INTO {FTS_TABLE} (rowid, title, body) VALUES (%s, %s, %s)",
+                [(self.rowid(kind, obj_id), title or "", body or "") for obj_id, title, body in rows],
+            )
+
+    def loaded(self):
+        # Merge the index segments the bulk load left behind
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE} ({FTS_TABLE}) VALUES ('optimize')")
+
+    def query(self, terms, limit):
+        # Every term must match; the last one is a prefix (search-as-you-type)
+        terms = list(dict.fromkeys(terms))
+        *exact, prefix = terms
+        if len(prefix) < MIN_PREFIX_LENGTH:
+            exact, prefix = terms, None
+        phrases = {term: f'"{term}"' for term in exact}
+        if prefix:
+            phrases[prefix] = f'"{prefix}"*'
+        with connection.cursor() as cursor:
+            common = [term for term, phrase in phrases.items() if self._is_common(cursor, phrase)]
+            rare = " ".join(phrase for term, phrase in phrases.items() if term not in common)
+            if not rare:
+                return self._unranked(cursor, " ".join(phrases.values()), limit)
+            # Rank on the rare words only; very common ones would make bm25()
+            # score most of the index, so they are checked on the stored text
+            cursor.execute(
+                f"SELECT rowid, bm25({FTS_TABLE}, %s, %s) AS score FROM {FTS_TABLE} "
+                f"WHERE {FTS_TABLE} MATCH %s ORDER BY score" + ("" if common else " LIMIT %s"),
+                [TITLE_WEIGHT, BODY_WEIGHT, rare] + ([] if common else [limit]),
+            )
+            # bm25() is lower-is-better
+            ranked = [(rowid, -score) for rowid, score in cursor.fetchall()]
+            if common:
+                ranked = self._containing(cursor, ranked, common, prefix, limit)
+            return [(*self.from_rowid(rowid), score) for rowid, score in ranked]
+
+    def _is_common(self, cursor, phrase):
+        # Stops counting at MAX_RANKED_MATCHES + 1, so common words stay cheap
+        cursor.execute(
+            f"SELECT COUNT(*) FROM (SELECT 1 FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT %s)",
+            [phrase, MAX_RANKED_MATCHES + 1],
+        )
+        return cursor.fetchone()[0] > MAX_RANKED_MATCHES
+
+    def _containing(self, cursor, ranked, terms, prefix, limit):
+        # Keeps ranked rows whose text has every term, fetching text a batch at a time
+        results = []
+        batch_size = limit * 2
+        for start in range(0, len(ranked), batch_size):
+            batch = ranked[start:start + batch_size]
+            placeholders = ", ".join(["%s"] * len(batch))
+            cursor.execute(
+                f"SELECT rowid, title, body FROM {FTS_TABLE} WHERE rowid IN ({placeholders})",
+                [rowid for rowid, _ in batch],
+            )
+            texts = {rowid: f"{title} {body}" for rowid, title, body in cursor.fetchall()}
+            for rowid, score in batch:
+                tokens = set(tokenize(texts.get(rowid)))
+                if all(
+                    any(token.startswith(term) for token in tokens) if term == prefix else term in tokens
+                    for term in terms
+                ):
+                    results.append((rowid, score))
+                    if len(results) == limit:
+                        return results
+        return results
+
+    def _unranked(self, cursor, match, limit):
+        # Too broad to rank in budget: title hits first, then any, in index order
+        rowids = []
+        for expression in (f"{{title}} : ({match})", match):
+            cursor.execute(
+                f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s LIMIT %s",
+                [expression, limit],
+            )
+            rowids += [rowid for (rowid,) in cursor.fetchall() if rowid not in rowids]
+            if len(rowids) >= limit:
+                break
+        return [(*self.from_rowid(rowid), 0.0) for rowid in rowids[:limit]]
+
+# Fallback for databases without FTS5: an inverted index held in this process
+class MemoryBackend:
+    """
+    Built from the database on first use, then kept current by the model
+    signals. Each worker process holds (and updates) its own copy.
+    """
+    name = "memory"
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.built = False
+        self.postings = defaultdict(dict)  # term -> {doc: weight}
+        self.documents = {}  # doc -> terms
+        self._vocabulary = None  # sorted terms, for prefix lookups
+        self._ranked = {}  # term -> docs by descending weight, built on demand
+
+    def index(self, kind, obj_id, title, body):
+        doc = (kind, obj_id)
+        weights = defaultdict(float)
+        for term in tokenize(title):
+            weights[term] += TITLE_WEIGHT
+        for term in tokenize(body):
+            weights[term] += BODY_WEIGHT
+        with self._lock:
+            self._remove(doc)
+            for term, weight in weights.items():
+                if term not in self.postings:
+                    self._vocabulary = None
+                self.postings[term][doc] = weight
+                self._ranked.pop(term, None)
+            self.documents[doc] = tuple(weights)
+
+    def contains(self, kind, obj_id):
+        return (kind, obj_id) in self.documents
+
+    def remove(self, kind, obj_ids):
+        with self._lock:
+            for obj_id in obj_ids:
+                self._remove((kind, obj_id))
+
+    def _remove(self, doc):
+        for term in self.documents.pop(doc, ()):
+            docs = self.postings[term]
+            docs.pop(doc, None)
+            self._ranked.pop(term, None)
+            if not docs:
+                del self.postings[term]
+                self._vocabulary = None
+
+    def clear(self):
+        with self._lock:
+            self.postings.clear()
+            self.documents.clear()
+            self._ranked.clear()
+            self._vocabulary = None
+
+    def load(self, kind, rows):
+        for obj_id, title, body in rows:
+            self.index(kind, obj_id, title, body)
+
+    def loaded(self):
+        self.built = True
+
+    def _prefix_terms(self, prefix):
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self.postings)
+        start = bisect_left(self._vocabulary, prefix)
+        for term in self._vocabulary[start:]:
+            if not term.startswith(prefix):
+                break
+            yield term
+
+    def _idf(self, term, total):
+        return math.log(1 + total / (1 + len(self.postings[term])))
+
+    def _ranked_docs(self, term, idf):
+        ranked = self._ranked.get(term)
+        if ranked is None:
+            ranked = sorted(self.postings[term].items(), key=lambda item: -item[1])
+            self._ranked[term] = ranked
+        return ((-idf * weight, doc) for doc, weight in ranked)
+
+    def _ranked_stream(self, group, total):
+        # Docs of a term group by descending score; a doc's first hit is its best
+        merged = heapq.merge(*(self._ranked_docs(term, self._idf(term, total)) for term in group))
+        seen = set()
+        for score, doc in merged:
+            if doc not in seen:
+                seen.add(doc)
+                yield doc, -score
+
+    def _group_score(self, doc, group, prefix, idfs):
+        if prefix is None:
+            (term,) = group
+            weight = self.postings[term].get(doc)
+            return None if weight is None else idfs[term] * weight
+        return max((
+            idfs[term] * self.postings[term][doc]
+            for term in self.documents[doc] if term.startswith(prefix)
+        ), default=None)
+
+    def query(self, terms, limit):
+        if not self.built:
+            rebuild_index(self)
+        terms = list(dict.fromkeys(terms))
+        with self._lock:
+            total = len(self.documents)
+            *exact, prefix = terms
+            if len(prefix) < MIN_PREFIX_LENGTH:
+                exact, prefix = terms, None
+            # One group of alternatives per query word: [term] or the prefix's expansions
+            groups = [([term], None) for term in exact]
+            if prefix:
+                groups.append((list(self._prefix_terms(prefix)), prefix))
+            if any(not group or any(term not in self.postings for term in group) for group, _ in groups):
+                return []
+            idfs = {term: self._idf(term, total) for group, _ in groups for term in group}
+            sizes = [sum(len(self.postings[term]) for term in group) for group, _ in groups]
+            rarest = sizes.index(min(sizes))
+            (group, group_prefix), others = groups[rarest], groups[:rarest] + groups[rarest + 1:]
+            if not others or sizes[rarest] > MAX_RANKED_MATCHES:
+                # Walk the rarest word's docs best-first and stop at `limit`
+                # (exact ranking for one word, title-first for broad queries)
+                candidates, bounded = self._ranked_stream(group, total), True
+            else:
+                candidates = (
+                    (doc, self._group_score(doc, group, group_prefix, idfs))
+                    for term in group for doc in self.postings[term]
+                )
+                bounded = False
+            scored, seen = [], set()
+            for doc, score in candidates:
+                if doc in seen:
+                    continue
+                seen.add(doc)
+                for other, other_prefix in others:
+                    other_score = self._group_score(doc, other, other_prefix, idfs)
+                    if other_score is None:
+                        break
+                    score += other_score
+                else:
+                    scored.append((score, doc))
+                    if bounded and len(scored) == limit:
+                        break
+            return [(*doc, score) for score, doc in heapq.nlargest(limit, scored)]
+
+_backend = None
+_memory_backend = MemoryBackend()
+
+def fts5_table_exists():
+    if connection.vendor != "sqlite":
+        return False
+    try:
+        return FTS_TABLE in connection.introspection.table_names()
+    except OperationalError:
+        return False
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        if SEARCH_BACKEND == "memory" or (SEARCH_BACKEND == "auto" and not fts5_table_exists()):
+            _backend = _memory_backend
+        else:
+            _backend = FTS5Backend()
+    return _backend
+
+def _writes_needed(backend):
+    # An unbuilt memory index is filled from the database on first search
+    return not isinstance(backend, MemoryBackend) or backend.built
+
+# Keeps the index in step with a saved course, and its lessons when needed
+def index_course(course, backend=None, with_lessons=None):
+    """
+    Lessons are only visible with their course, so they are re-indexed
+    when the course's visibility changed (or `with_lessons` asks for it,
+    e.g. after lessons were bulk created); other saves touch one row.
+    """
+    backend = backend or get_backend()
+    if not _writes_needed(backend):
+        return
+    visible_course = is_course_visible(course)
+    if with_lessons is None:
+        with_lessons = backend.contains(COURSE, course.pk) != visible_course
+    if visible_course:
+        backend.index(COURSE, course.pk, course.title, course.description)
+    else:
+        backend.remove(COURSE, [course.pk])
+    if not with_lessons:
+        return
+    visible, hidden = [], []
+    for lesson in course.lesson_set.only("id", "title", "description", "status"):
+        (visible if is_lesson_visible(lesson, course) else hidden).append(lesson)
+    for lesson in visible:
+        backend.index(LESSON, lesson.pk, lesson.title, lesson.description)
+    backend.remove(LESSON, [lesson.pk for lesson in hidden])
+
+def index_lesson(lesson, backend=None):
+    backend = backend or get_backend()
+    if not _writes_needed(backend):
+        return
+    if is_lesson_visible(lesson, lesson.course):
+        backend.index(LESSON, lesson.pk, lesson.title, lesson.description)
+    else:
+        backend.remove(LESSON, [lesson.pk])
+
+def remove_from_index(kind, obj_id, backend=None):
+    backend = backend or get_backend()
+    if _writes_needed(backend):
+        backend.remove(kind, [obj_id])
+
+# Re-indexes every visible course and lesson (after bulk loads)
+def rebuild_index(backend=None):
+    backend = backend or get_backend()
+    courses = Course.objects.filter(status=PublishStatus.PUBLISHED)
+    lessons = Lesson.objects.filter(
+        course__status=PublishStatus.PUBLISHED,
+        status__in=VISIBLE_LESSON_STATUSES,
+    )
+    with transaction.atomic():
+        backend.clear()
+        backend.load(COURSE, courses.values_list("id", "title", "description").iterator(chunk_size=2000))
+        backend.load(LESSON, lessons.values_list("id", "title", "description").iterator(chunk_size=2000))
+    backend.loaded()
+
+# Ranked courses and lessons matching `text`, re-checked against the visibility rules
+def search_content(text, limit=SEARCH_RESULTS_LIMIT, backend=None):
+    """
+    Returns dicts with kind, title, url, thumbnail and score, best first.
+    The index only holds visible objects; hits are re-filtered anyway so a
+    stale in-process index can never leak a draft.
+    """
+    terms = tokenize(text)
+    if not terms:
+        return []
+    backend = backend or get_backend()
+    # Over-fetch a little in case stale hits are filtered out below
+    hits = backend.query(terms, limit * 2)
+    # Primary-key lookups only: a join on course status lets SQLite pick a
+    # scan of every published course instead
+    lessons = {
+        row["id"]: row for row in Lesson.objects.filter(
+            id__in=[obj_id for kind, obj_id, _ in hits if kind == LESSON],
+            status__in=VISIBLE_LESSON_STATUSES,
+        ).order_by().values("id", "public_id", "title", "renditions", "course_id")
+    }
+    course_ids = {obj_id for kind, obj_id, _ in hits if kind == COURSE}
+    course_ids.update(row["course_id"] for row in lessons.values())
+    courses = {
+        row["id"]: row for row in Course.objects.filter(
+            id__in=course_ids, status=PublishStatus.PUBLISHED
+        ).order_by().values("id", "public_id", "title", "renditions")
+    }
+    results = []
+    for kind, obj_id, score in hits:
+        if kind == COURSE and obj_id in courses:
+            row = courses[obj_id]
+            results.append({
+                "kind": COURSE,
+                "title": row["title"],
+                "url": f"/courses/{row['public_id']}",
+                "thumbnail": row["renditions"].get("thumbnail"),
+                "score": score,
+            })
+        elif kind == LESSON and obj_id in lessons and lessons[obj_id]["course_id"] in courses:
+            row = lessons[obj_id]
+            course = courses[row["course_id"]]
+            results.append({
+                "kind": LESSON,
+                "title": row["title"],
+                "course_title": course["title"],
+                "url": f"/courses/{course['public_id']}/lessons/{row['public_id']}",
+                "thumbnail": row["renditions"].get("thumbnail"),
+                "score": score,
+            })
+    return results[:limit]
@@ -1,25 +1,89 @@
-from django.db.models import Q
+import logging
+from django.conf import settings
+from django.db.models import Count, Max, Q
 from .models import Course, Lesson, PublishStatus
+from .pagination import KeysetPage
+
+logger = logging.getLogger(__name__)
+
+# Courses per catalogue page ("load more" fetches the next one)
+COURSE_PAGE_SIZE = getattr(settings, "COURSES_PAGE_SIZE", 12)
+
+# Lesson statuses shown on course pages
+VISIBLE_LESSON_STATUSES = [PublishStatus.PUBLISHED, PublishStatus.COMING_SOON]
+
+# Column projections sized for what each view renders
+COURSE_LIST_FIELDS = ("id", "public_id", "title", "image", "renditions", "status", "timestamp")
+COURSE_DETAIL_FIELDS = COURSE_LIST_FIELDS + ("description", "access", "updated")
+LESSON_LIST_FIELDS = (
+    "id", "course", "public_id", "title", "status", "thumbnail", "video",
+    "renditions", "order", "can_preview", "updated"
+)
+LESSON_DETAIL_FIELDS = LESSON_LIST_FIELDS + (
+    "course__id", "course__public_id", "course__title", "course__access", "course__status",
+    "course__updated"
+)
+# values() projections for the JSON API (no model instances)
+COURSE_VALUES_FIELDS = ("id", "public_id", "title", "access", "renditions", "timestamp", "updated")
+COURSE_DETAIL_VALUES_FIELDS = COURSE_VALUES_FIELDS + ("description",)
+LESSON_VALUES_FIELDS = (
+    "course_id", "public_id", "title", "status", "order", "can_preview", "renditions", "updated"
+)
 
 # Retrieves all published courses
 def get_publish_courses():
-    return Course.objects.filter(status=PublishStatus.PUBLISHED)
+    return Course.objects.filter(status=PublishStatus.PUBLISHED).only(*COURSE_LIST_FIELDS)
+
+# Retrieves one newest-first page of published courses, starting after `cursor`
+def get_publish_courses_page(cursor=None, page_size=COURSE_PAGE_SIZE):
+    # Raises ValueError for a malformed cursor
+    return KeysetPage(get_publish_courses(), cursor=cursor, page_size=page_size)
+
+# Returns the latest `updated` and count of published courses in one query
+def get_publish_courses_validator():
+    return Course.objects.filter(status=PublishStatus.PUBLISHED).aggregate(
+        updated=Max("updated"),
+        count=Count("id"),
+    )
+
+async def aget_publish_courses_validator():
+    return await Course.objects.filter(status=PublishStatus.PUBLISHED).aaggregate(
+        updated=Max("updated"),
+        count=Count("id"),
+    )
+
+# Course detail queryset annotated with its visible lessons' validator
+def get_course_detail_queryset():
+    visible_lessons = Q(lesson__status__in=VISIBLE_LESSON_STATUSES)
+    return Course.objects.only(*COURSE_DETAIL_FIELDS).annotate(
+        lessons_updated=Max("lesson__updated", filter=visible_lessons),
+        lessons_count=Count("lesson", filter=visible_lessons),
+    ).filter(status=PublishStatus.PUBLISHED)  # Ensure the course is published
 
 # Retrieves the details of a specific course by its public_id
 def get_course_detail(course_id=None):
+    """
+    The course is annotated with `lessons_updated` / `lessons_count` over its
+    visible lessons so views can build a cache validator without another query.
+    """
     if course_id is None:  # Check if the course_id is provided
         return None
     obj = None
     try:
-        obj = Course.objects.get(
-            status=PublishStatus.PUBLISHED,  # Ensure the course is published
-            public_id=course_id             # Match the public_id
-        )
+        obj = get_course_detail_queryset().get(public_id=course_id)  # Match the public_id
     except Course.DoesNotExist:
         # Return None if no matching course is found
         pass
     return obj
 
+async def aget_course_detail(course_id=None):
+    if course_id is None:
+        return None
+    try:
+        return await get_course_detail_queryset().aget(public_id=course_id)
+    except Course.DoesNotExist:
+        return None
+
 # Retrieves the lessons of a given course that are published or coming soon
 def get_course_lessons(course_obj=None):
     lessons = Lesson.objects.none()  # Initialize an empty QuerySet
@@ -27,8 +91,8 @@ def get_course_lessons(course_obj=None):
         return lessons
     lessons = course_obj.lesson_set.filter(
         course__status=PublishStatus.PUBLISHED,  # Ensure the course is published
-        status__in=[PublishStatus.PUBLISHED, PublishStatus.COMING_SOON]  # Include lessons with appropriate statuses
-    )
+        status__in=VISIBLE_LESSON_STATUSES  # Include lessons with appropriate statuses
+    ).only(*LESSON_LIST_FIELDS)  # lesson.course is the already-loaded course_obj
     return lessons
 
 # Retrieves the details of a specific lesson by its public_id and associated course_id
@@ -37,14 +101,45 @@ def get_lesson_detail(course_id=None, lesson_id=None):
         return None
     obj = None
     try:
-        obj = Lesson.objects.get(
-            course__public_id=course_id,  # Match the course's public_id
-            course__status=PublishStatus.PUBLISHED,  # Ensure the course is published
-            status__in=[PublishStatus.PUBLISHED, PublishStatus.COMING_SOON],  # Include lessons with appropriate statuses
-            public_id=lesson_id  # Match the lesson's public_id
-        )
+        obj = get_lesson_detail_queryset(course_id, lesson_id).get()
     except Lesson.DoesNotExist as e:
         # Handle the case where no matching lesson is found
-        print("Lesson detail retrieval failed:", e)
-        pass
+        logger.debug("Lesson detail retrieval failed: %s", e)
     return obj
+
+async def aget_lesson_detail(course_id=None, lesson_id=None):
+    if lesson_id is None and course_id is None:
+        return None
+    try:
+        return await get_lesson_detail_queryset(course_id, lesson_id).aget()
+    except Lesson.DoesNotExist:
+        return None
+
+def get_lesson_detail_queryset(course_id, lesson_id):
+    # Preload the course: path, requires_email and get_display_name all use it
+    return Lesson.objects.select_related("course").only(*LESSON_DETAIL_FIELDS).filter(
+        course__public_id=course_id,  # Match the course's public_id
+        course__status=PublishStatus.PUBLISHED,  # Ensure the course is published
+        status__in=VISIBLE_LESSON_STATUSES,  # Include lessons with appropriate statuses
+        public_id=lesson_id  # Match the lesson's public_id
+    )
+
+# Published courses as dicts, newest first; optionally only the given public_ids
+def get_publish_courses_values(public_ids=None, fields=COURSE_VALUES_FIELDS):
+    queryset = Course.objects.filter(status=PublishStatus.PUBLISHED)
+    if public_ids is not None:
+        queryset = queryset.filter(public_id__in=public_ids)
+    return queryset.order_by("-timestamp", "-id").values(*fields)
+
+# Visible lessons of the given (published) course ids as dicts, grouped by course id
+def get_course_lessons_values(course_ids):
+    grouped = {course_id: [] for course_id in course_ids}
+    if not grouped:
+        return grouped
+    lessons = Lesson.objects.filter(
+        course_id__in=grouped,
+        status__in=VISIBLE_LESSON_STATUSES  # Include lessons with appropriate statuses
+    ).order_by("order", "-updated").values(*LESSON_VALUES_FIELDS)
+    for lesson in lessons:
+        grouped[lesson["course_id"]].append(lesson)
+    return grouped
@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from . import cache as courses_cache
+from . import search
+from .models import Course, Lesson
+
+# Course changes affect the course list and the course's own pages
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def course_content_changed(sender, instance, **kwargs):
+    courses_cache.bump_content_version(
+        courses_cache.LIST_SCOPE,
+        courses_cache.get_course_scope(instance.pk),
+    )
+
+# Lesson changes only affect their course's pages
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Lesson)
+def lesson_content_changed(sender, instance, **kwargs):
+    courses_cache.bump_content_version(
+        courses_cache.get_course_scope(instance.course_id),
+    )
+
+# Keep the search index in step with saved / deleted content
+@receiver(post_save, sender=Course)
+def course_search_index(sender, instance, **kwargs):
+    search.index_course(instance)
+
+@receiver(post_save, sender=Lesson)
+def lesson_search_index(sender, instance, **kwargs):
+    search.index_lesson(instance)
+
+@receiver(post_delete, sender=Course)
+def course_search_remove(sender, instance, **kwargs):
+    search.remove_from_index(search.COURSE, instance.pk)
+
+@receiver(post_delete, sender=Lesson)
+def lesson_search_remove(sender, instance, **kwargs):
+    search.remove_from_index(search.LESSON, instance.pk)
@@ -0,0 +1,10 @@
+from django import template
+
+register = template.Library()
+
+# {% if lesson|locked:email_access %}: no lookups, the access is resolved once per request
+@register.filter
+def locked(obj, email_access):
+    if not email_access:
+        return False
+    return not email_access.has_access(obj)
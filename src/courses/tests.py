@@ -1,3 +1,1211 @@
-from django.test import TestCase
+import cloudinary
+import helpers
+import io
+import json
+import logging
+import logging.config
+import os
+import re
+import tempfile
+import threading
+import unittest
+from unittest import mock
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase, override_settings
 
-# Create your tests here.
+from emails.models import Email, EmailVerificationEvent
+from perf import loadgen
+from perf import utils as perf_utils
+from . import cache as courses_cache
+from . import outline, search, services, transfer
+from .models import AccessRequirement, Course, Lesson, PublishStatus, generate_public_id
+
+
+class QueryBudgetTests(TestCase):
+    """
+    Query budgets for the public course views.
+    Raise these numbers only together with a reason in the commit.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(
+            title="Budget Course",
+            status=PublishStatus.PUBLISHED,
+            access=AccessRequirement.ANYONE,
+        )
+        cls.lessons = [
+            Lesson.objects.create(course=cls.course, title=f"Lesson {i}", order=i)
+            for i in range(5)
+        ]
+        cls.gated_course = Course.objects.create(
+            title="Gated Course",
+            status=PublishStatus.PUBLISHED,
+            access=AccessRequirement.EMAIL_REQUIRED,
+        )
+        cls.gated_lesson = Lesson.objects.create(course=cls.gated_course, title="Gated")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_course_detail_view_query_budget(self):
+        # course (with lesson validator annotations) + lessons
+        with self.assertNumQueries(2):
+            response = self.client.get(self.course.path + "/")
+        self.assertEqual(response.status_code, 200)
+        for lesson in self.lessons:
+            self.assertContains(response, lesson.path)
+
+    def test_lesson_detail_view_query_budget(self):
+        lesson = self.lessons[0]
+        # lesson joined with its course
+        with self.assertNumQueries(1):
+            response = self.client.get(lesson.path + "/")
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, lesson.title)
+
+    def test_gated_lesson_detail_view_query_budget(self):
+        email = Email.objects.create(email="budget@example.com")
+        session = self.client.session
+        session["email_id"] = f"{email.id}"
+        session.save()
+        self.client.get(self.gated_lesson.path + "/")  # validates the email, cached in the session
+        # lesson joined with its course (the cached_db session is read from the cache)
+        with self.assertNumQueries(1):
+            response = self.client.get(self.gated_lesson.path + "/")
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateNotUsed(response, "courses/email-required.html")
+
+    def test_unknown_lesson_is_404(self):
+        response = self.client.get(f"{self.course.path}/lessons/missing/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_cached_course_detail_view_query_budget(self):
+        self.client.get(self.course.path + "/")
+        # course only; the lesson list comes from the fragment cache
+        with self.assertNumQueries(1):
+            response = self.client.get(self.course.path + "/")
+        self.assertContains(response, self.lessons[0].path)
+
+
+class FragmentCacheTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.course = Course.objects.create(title="Cached", status=PublishStatus.PUBLISHED)
+        self.lesson = Lesson.objects.create(course=self.course, title="First lesson")
+
+    def test_course_list_is_served_from_cache(self):
+        self.client.get("/courses/")
+        # the validator aggregate only
+        with self.assertNumQueries(1):
+            response = self.client.get("/courses/")
+        self.assertContains(response, "Cached")
+        self.client.get("/courses/", headers={"HX-Request": "true"})
+        with self.assertNumQueries(1):
+            response = self.client.get("/courses/", headers={"HX-Request": "true"})
+        self.assertContains(response, "Cached")
+        self.assertIn("HX-Request", response["Vary"])
+
+    def test_course_save_invalidates_list(self):
+        self.client.get("/courses/")
+        self.client.get("/courses/", headers={"HX-Request": "true"})
+        self.course.title = "Renamed"
+        self.course.save()
+        self.assertContains(self.client.get("/courses/"), "Renamed")
+        self.assertContains(self.client.get("/courses/", headers={"HX-Request": "true"}), "Renamed")
+
+    def test_lesson_changes_invalidate_course_detail(self):
+        path = self.course.path + "/"
+        self.assertContains(self.client.get(path), "First lesson")
+        self.lesson.title = "Renamed lesson"
+        self.lesson.save()
+        self.assertContains(self.client.get(path), "Renamed lesson")
+        self.lesson.delete()
+        self.assertNotContains(self.client.get(path), "Renamed lesson")
+
+
+class CourseOutlineTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.course = Course.objects.create(title="Outlined", status=PublishStatus.PUBLISHED)
+        self.second = Lesson.objects.create(course=self.course, title="Second", order=2)
+        self.first = Lesson.objects.create(
+            course=self.course, title="First", order=1, status=PublishStatus.COMING_SOON
+        )
+        Lesson.objects.create(course=self.course, title="Draft", status=PublishStatus.DRAFT)
+
+    def test_outline_is_ordered_and_precomputed(self):
+        with self.assertNumQueries(1):
+            entries = outline.get_course_outline(self.course)
+        self.assertEqual([entry.title for entry in entries], ["First", "Second"])
+        self.assertEqual(entries[0].path, self.first.path)
+        self.assertTrue(entries[0].is_coming_soon)
+        self.assertTrue(entries[0].requires_email)
+        # served from the cache, no queries
+        with self.assertNumQueries(0):
+            self.assertEqual(len(outline.get_course_outline(self.course)), 2)
+
+    def test_lesson_save_and_delete_rebuild_outline(self):
+        outline.get_course_outline(self.course)
+        self.second.title = "Renamed"
+        self.second.save()
+        self.assertEqual(
+            [entry.title for entry in outline.get_course_outline(self.course)], ["First", "Renamed"]
+        )
+        self.first.delete()
+        self.assertEqual([entry.title for entry in outline.get_course_outline(self.course)], ["Renamed"])
+
+    def test_unpublished_course_has_no_outline(self):
+        self.course.status = PublishStatus.DRAFT
+        self.course.save()
+        with self.assertNumQueries(0):
+            self.assertEqual(outline.get_course_outline(self.course), [])
+
+
+@mock.patch.object(cloudinary.config(), "cloud_name", "demo")
+class CloudinaryUrlCacheTests(TestCase):
+
+    def setUp(self):
+        from helpers._cloudinary.cache import image_url_cache, video_url_cache
+        self.image_url_cache = image_url_cache
+        for url_cache in (image_url_cache, video_url_cache):
+            url_cache.clear()
+            self.addCleanup(url_cache.clear)
+
+    def image_key(self, public_id, version, width=100):
+        # (public_id, version, field_name, width, format, as_html)
+        return (public_id, version, "image", width, None, False)
+
+    def test_second_build_is_a_hit(self):
+        course = Course.objects.create(title="Cached Image", image="image/upload/v1/courses/a.jpg")
+        before = helpers.get_cloudinary_cache_stats()["image"]
+        url = helpers.get_cloudinary_image_object(course, field_name="image", width=100)
+        self.assertEqual(helpers.get_cloudinary_image_object(course, field_name="image", width=100), url)
+        self.assertIn("w_100", url)
+        stats = helpers.get_cloudinary_cache_stats()["image"]
+        self.assertEqual(stats["misses"] - before["misses"], 1)
+        self.assertEqual(stats["hits"] - before["hits"], 1)
+
+    def test_least_recently_used_entry_is_evicted(self):
+        from helpers._cloudinary.cache import LRUCache
+        lru = LRUCache(maxsize=2)
+        lru.set("a", 1)
+        lru.set("b", 2)
+        self.assertEqual(lru.get("a"), 1)
+        lru.set("c", 3)
+        self.assertIsNone(lru.get("b"))
+        self.assertEqual((lru.get("a"), lru.get("c")), (1, 3))
+        self.assertEqual(lru.stats()["size"], 2)
+
+    def test_replaced_asset_is_invalidated_on_save(self):
+        course = Course.objects.create(title="Replaced", image="image/upload/v1/courses/old.jpg")
+        old_url = helpers.get_cloudinary_image_object(course, field_name="image", width=100)
+        self.assertEqual(self.image_url_cache.get(self.image_key("courses/old", "1")), old_url)
+        # Saved again with the same asset: its entries are still valid
+        course = Course.objects.get(pk=course.pk)
+        course.title = "Renamed"
+        course.save()
+        self.assertEqual(self.image_url_cache.get(self.image_key("courses/old", "1")), old_url)
+        course.image = "image/upload/v2/courses/new.jpg"
+        course.save()
+        self.assertIsNone(self.image_url_cache.get(self.image_key("courses/old", "1")))
+        new_url = helpers.get_cloudinary_image_object(course, field_name="image", width=100)
+        self.assertIn("courses/new", new_url)
+
+    def test_signed_video_url_is_rebuilt_after_ttl(self):
+        from helpers._cloudinary.cache import SIGNED_URL_CACHE_TTL, SIGNED_URL_VALIDITY
+        self.assertLess(SIGNED_URL_CACHE_TTL, SIGNED_URL_VALIDITY)
+        course = Course.objects.create(title="Video Course")
+        lesson = Lesson.objects.create(course=course, title="Video", video="video/private/v1/lessons/a.mp4")
+        clock = mock.Mock(return_value=1000.0)
+
+        def build():
+            before = helpers.get_cloudinary_cache_stats()["video"]
+            url = helpers.get_cloudinary_video_object(lesson, width=640)
+            after = helpers.get_cloudinary_cache_stats()["video"]
+            return url, after["misses"] - before["misses"]
+
+        with mock.patch("helpers._cloudinary.cache.time.monotonic", clock):
+            url, built = build()
+            self.assertIn("s--", url)  # signed
+            self.assertEqual(built, 1)
+            clock.return_value = 1000.0 + SIGNED_URL_CACHE_TTL - 1
+            self.assertEqual(build(), (url, 0))
+            clock.return_value = 1000.0 + SIGNED_URL_CACHE_TTL
+            self.assertEqual(build()[1], 1)
+
+
+class RenditionsTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        patcher = mock.patch.object(cloudinary.config(), "cloud_name", "demo")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.course = Course.objects.create(
+            title="Rendered", status=PublishStatus.PUBLISHED, image="image/upload/v1/courses/r.jpg"
+        )
+        self.lesson = Lesson.objects.create(
+            course=self.course, title="Rendered Lesson", thumbnail="image/upload/v1/lessons/r.jpg"
+        )
+
+    def test_renditions_are_computed_on_save(self):
+        self.course.refresh_from_db()
+        self.lesson.refresh_from_db()
+        self.assertEqual(set(self.course.renditions), {"thumbnail", "display"})
+        self.assertIn("courses/r", self.course.renditions["thumbnail"])
+        self.assertEqual(set(self.lesson.renditions), {"thumbnail"})
+        self.lesson.thumbnail = None
+        self.lesson.save()
+        self.lesson.refresh_from_db()
+        self.assertEqual(self.lesson.renditions, {})
+
+    def test_version_is_bumped_after_renditions_are_stored(self):
+        bump = courses_cache.bump_content_version
+        stored = []
+
+        def record(*scopes):
+            stored.append(Course.objects.get(pk=self.course.pk).renditions.get("thumbnail", ""))
+            return bump(*scopes)
+
+        self.course.image = "image/upload/v2/courses/new.jpg"
+        with mock.patch("courses.cache.bump_content_version", side_effect=record):
+            self.course.save()
+        # The post_save bump still sees the old URL, the last one the new
+        self.assertIn("courses/r", stored[0])
+        self.assertIn("courses/new", stored[-1])
+        self.assertContains(self.client.get(self.course.path + "/"), "courses/new")
+
+    def test_backfill_renditions(self):
+        Course.objects.update(renditions={})
+        Lesson.objects.bulk_create([
+            Lesson(course=self.course, title=f"Bulk {i}", thumbnail=f"image/upload/v1/lessons/b{i}.jpg")
+            for i in range(3)
+        ])
+        Lesson.objects.filter(pk=self.lesson.pk).update(renditions={"thumbnail": "stale"})
+        version = courses_cache.get_content_version(courses_cache.get_course_scope(self.course.pk))
+        out = io.StringIO()
+        with mock.patch.object(Lesson.objects, "bulk_update", wraps=Lesson.objects.bulk_update) as bulk:
+            call_command("backfill_renditions", batch_size=2, stdout=out)
+        self.assertEqual([len(call.args[0]) for call in bulk.call_args_list], [2, 1])
+        self.assertIn("Course: updated 1 row(s)", out.getvalue())
+        self.assertIn("Lesson: updated 3 row(s)", out.getvalue())
+        self.assertFalse(Lesson.objects.filter(renditions={}).exists())
+        # Rows that already have renditions are only rebuilt with --force
+        self.assertEqual(Lesson.objects.get(pk=self.lesson.pk).renditions, {"thumbnail": "stale"})
+        self.assertNotEqual(
+            courses_cache.get_content_version(courses_cache.get_course_scope(self.course.pk)), version
+        )
+        call_command("backfill_renditions", force=True, stdout=io.StringIO())
+        self.assertIn("lessons/r", Lesson.objects.get(pk=self.lesson.pk).renditions["thumbnail"])
+
+
+class PublicIdTests(TestCase):
+
+    def test_ids_are_slugged_and_unique(self):
+        course = Course(title="Intro to Django!")
+        ids = {generate_public_id(course) for _ in range(1000)}
+        self.assertEqual(len(ids), 1000)
+        public_id = ids.pop()
+        self.assertRegex(public_id, r"^intro-to-django-[0-9a-z]{18}$")
+        self.assertRegex(generate_public_id(Course(title="")), r"^[0-9a-z]{18}$")
+
+    def test_save_retries_on_collision(self):
+        existing = Course.objects.create(title="Taken")
+        course = Course(title="Taken")
+        with mock.patch(
+            "courses.models.generate_public_id", side_effect=[existing.public_id, "taken-fresh"]
+        ):
+            course.save()
+        self.assertEqual(course.public_id, "taken-fresh")
+
+    def test_explicit_duplicate_is_rejected(self):
+        existing = Course.objects.create(title="Taken")
+        with self.assertRaises(IntegrityError):
+            Course.objects.create(title="Other", public_id=existing.public_id)
+
+
+class DedupePublicIdsMigrationTests(TransactionTestCase):
+    migrate_from = [("courses", "0017_lesson_outline_index")]
+    migrate_to = [("courses", "0019_unique_public_id")]
+
+    def migrate(self, targets):
+        executor = MigrationExecutor(connection)
+        executor.migrate(targets)
+        return executor.loader.project_state(targets).apps
+
+    def tearDown(self):
+        executor = MigrationExecutor(connection)
+        executor.migrate(executor.loader.graph.leaf_nodes())
+
+    def test_duplicate_and_empty_ids_are_replaced(self):
+        apps = self.migrate(self.migrate_from)
+        OldCourse = apps.get_model("courses", "Course")
+        OldLesson = apps.get_model("courses", "Lesson")
+        first = OldCourse.objects.create(title="Shared", public_id="shared")
+        second = OldCourse.objects.create(title="Shared", public_id="shared")
+        empty = OldCourse.objects.create(title="No Id", public_id="")
+        missing = OldCourse.objects.create(title="", public_id=None)
+        OldLesson.objects.create(course=first, title="One", public_id="lesson")
+        OldLesson.objects.create(course=first, title="Two", public_id="lesson")
+
+        apps = self.migrate(self.migrate_to)
+        NewCourse = apps.get_model("courses", "Course")
+        NewLesson = apps.get_model("courses", "Lesson")
+        ids = dict(NewCourse.objects.values_list("id", "public_id"))
+        self.assertEqual(ids[first.id], "shared")  # the oldest row keeps its id
+        self.assertRegex(ids[second.id], r"^shared-[0-9a-z]{18}$")
+        self.assertRegex(ids[empty.id], r"^no-id-[0-9a-z]{18}$")
+        self.assertRegex(ids[missing.id], r"^[0-9a-z]{18}$")
+        self.assertEqual(len(set(ids.values())), 4)
+        lesson_ids = list(NewLesson.objects.order_by("id").values_list("public_id", flat=True))
+        self.assertEqual(lesson_ids[0], "lesson")
+        self.assertRegex(lesson_ids[1], r"^two-[0-9a-z]{18}$")
+
+
+# Stands in for cloudinary.uploader.upload_resource in the import tests
+uploaded_sources = []
+uploaded_lock = threading.Lock()
+
+def fake_uploader(source, **options):
+    with uploaded_lock:
+        uploaded_sources.append(source)
+    public_id = os.path.splitext(os.path.basename(source))[0]
+    return f"{options['resource_type']}/{options['type']}/v1/{public_id}.jpg"
+
+def failing_video_uploader(source, **options):
+    if options["resource_type"] == "video":
+        raise ConnectionError("upload timed out")
+    return fake_uploader(source, **options)
+
+
+@mock.patch.object(cloudinary.config(), "cloud_name", "demo")
+class CourseTransferTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        uploaded_sources.clear()
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.manifest = os.path.join(self.tmp.name, "courses.json")
+        with open(self.manifest, "w") as fh:
+            json.dump({"courses": [{
+                "title": "Imported Course",
+                "status": PublishStatus.PUBLISHED,
+                "access": AccessRequirement.ANYONE,
+                "image": "cover.png",
+                "lessons": [
+                    {"title": "Intro", "order": 1, "thumbnail": "intro.png", "video": "intro.mp4"},
+                    {"title": "Next", "order": 2, "status": PublishStatus.COMING_SOON},
+                ],
+            }]}, fh)
+
+    def import_manifest(self, uploader="courses.tests.fake_uploader"):
+        call_command(
+            "import_course", self.manifest, uploader=uploader, workers=2, stdout=io.StringIO(), stderr=io.StringIO()
+        )
+
+    def test_import_creates_rows_and_uploads_media(self):
+        self.import_manifest()
+        course = Course.objects.get(title="Imported Course")
+        self.assertTrue(course.public_id.startswith("imported-course-"))
+        self.assertEqual(course.image.public_id, "cover")
+        self.assertIn("thumbnail", course.renditions)
+        intro, following = course.lesson_set.all()
+        self.assertEqual(intro.video.resource_type, "video")
+        self.assertEqual(intro.video.type, "private")
+        self.assertEqual(following.title, "Next")
+        self.assertEqual(sorted(map(os.path.basename, uploaded_sources)), ["cover.png", "intro.mp4", "intro.png"])
+        # bulk writes skip the signals; the import refreshes the caches itself
+        self.assertContains(self.client.get(course.path + "/"), intro.path)
+        self.assertEqual([result["title"] for result in search.search_content("intro")], ["Intro"])
+
+    def test_failed_uploads_resume(self):
+        with self.assertRaises(CommandError):
+            self.import_manifest(uploader="courses.tests.failing_video_uploader")
+        uploaded_sources.clear()
+        self.import_manifest()
+        # the rows and finished uploads were kept; only the video is uploaded again
+        self.assertEqual(Course.objects.filter(title="Imported Course").count(), 1)
+        self.assertEqual(Lesson.objects.filter(title="Intro").count(), 1)
+        self.assertEqual(list(map(os.path.basename, uploaded_sources)), ["intro.mp4"])
+        self.assertEqual(Lesson.objects.get(title="Intro").video.public_id, "intro")
+
+    def test_progress_is_saved_in_batches(self):
+        progress = transfer.ImportProgress(os.path.join(self.tmp.name, "progress.json"))
+        with mock.patch.object(transfer, "UPLOADS_PER_SAVE", 2):
+            progress.record_upload("0:image", "image/upload/v1/a.png")
+            self.assertFalse(os.path.exists(progress.path))
+            progress.record_upload("0.0:thumbnail", "image/upload/v1/b.png")
+            progress.record_upload("0.0:video", "video/private/v1/c.mp4")
+            self.assertEqual(len(transfer.ImportProgress(progress.path).uploads), 2)
+            progress.flush()
+        self.assertEqual(len(transfer.ImportProgress(progress.path).uploads), 3)
+
+    def test_generated_ids_skip_taken_ones(self):
+        Course.objects.create(title="Taken", public_id="taken")
+        ids = iter(["taken", "intro-id", "next-id", "imported-course-id"])
+        with mock.patch.object(transfer, "generate_public_id", side_effect=lambda obj: next(ids)) as generate:
+            self.import_manifest()
+        self.assertEqual([type(call.args[0]) for call in generate.call_args_list], [Course, Lesson, Lesson, Course])
+        course = Course.objects.get(title="Imported Course")
+        self.assertEqual(course.public_id, "imported-course-id")
+        self.assertEqual([lesson.public_id for lesson in course.lesson_set.all()], ["intro-id", "next-id"])
+
+    def test_create_is_retried_when_an_id_is_taken_meanwhile(self):
+        Course.objects.create(title="Taken", public_id="taken")
+        ids = iter(["taken", "intro-id", "next-id", "imported-course-id"])
+        taken_public_ids = transfer._taken_public_ids
+        checks = []
+
+        def racing_check(model, public_ids):
+            # The first check runs before the other writer's row exists
+            checks.append(model)
+            return set() if len(checks) <= 2 else taken_public_ids(model, public_ids)
+
+        with mock.patch.object(transfer, "generate_public_id", side_effect=lambda obj: next(ids)), \
+                mock.patch.object(transfer, "_taken_public_ids", side_effect=racing_check):
+            self.import_manifest()
+        self.assertEqual(Course.objects.get(title="Imported Course").public_id, "imported-course-id")
+        self.assertEqual(Lesson.objects.filter(course__public_id="imported-course-id").count(), 2)
+
+    def test_csv_export_round_trip(self):
+        self.import_manifest()
+        course = Course.objects.get(title="Imported Course")
+        exported = os.path.join(self.tmp.name, "export.csv")
+        call_command("export_course", course.public_id, format="csv", output=exported, stderr=io.StringIO())
+        Course.objects.all().delete()
+        uploaded_sources.clear()
+        self.manifest = exported
+        self.import_manifest()
+        course = Course.objects.get(public_id=course.public_id)
+        self.assertEqual(course.image.public_id, "cover")
+        self.assertEqual([lesson.title for lesson in course.lesson_set.all()], ["Intro", "Next"])
+        # stored media are linked, not uploaded again
+        self.assertEqual(uploaded_sources, [])
+
+    def test_invalid_manifest(self):
+        with open(self.manifest, "w") as fh:
+            json.dump({"courses": [{"description": "no title"}]}, fh)
+        with self.assertRaises(CommandError):
+            self.import_manifest()
+
+
+class KeysetPaginationTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.courses = [
+            Course.objects.create(title=f"Paged {i}", status=PublishStatus.PUBLISHED)
+            for i in range(7)
+        ]
+        # Ties on timestamp are broken by id
+        Course.objects.filter(id__in=[c.id for c in cls.courses[2:5]]).update(
+            timestamp=cls.courses[2].timestamp
+        )
+        Course.objects.create(title="Draft", status=PublishStatus.DRAFT)
+
+    def setUp(self):
+        cache.clear()
+
+    def test_pages_cover_catalogue_once_in_order(self):
+        expected = list(
+            Course.objects.filter(status=PublishStatus.PUBLISHED)
+            .order_by("-timestamp", "-id").values_list("id", flat=True)
+        )
+        seen, cursor = [], None
+        while True:
+            page = services.get_publish_courses_page(cursor=cursor, page_size=3)
+            seen += [course.id for course in page]
+            cursor = page.next_cursor
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_load_more_endpoint(self):
+        first = services.get_publish_courses_page(page_size=3)
+        cursor = first.next_cursor
+        # one range query from the cursor
+        with self.assertNumQueries(1):
+            response = self.client.get("/courses/hx/more/", {"cursor": cursor}, headers={"HX-Request": "true"})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, first.items[0].title)
+        self.assertContains(response, self.courses[0].title)
+        self.assertNotContains(response, "/courses/hx/more/")  # last page
+
+    def test_invalid_cursor_is_400(self):
+        response = self.client.get("/courses/hx/more/", {"cursor": "not-a-cursor"})
+        self.assertEqual(response.status_code, 400)
+
+
+class CourseApiTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(
+            title="Api Course",
+            status=PublishStatus.PUBLISHED,
+            access=AccessRequirement.EMAIL_REQUIRED,
+        )
+        cls.other = Course.objects.create(title="Other Course", status=PublishStatus.PUBLISHED)
+        cls.draft = Course.objects.create(title="Draft Course", status=PublishStatus.DRAFT)
+        cls.lesson = Lesson.objects.create(
+            course=cls.course, title="Visible", status=PublishStatus.PUBLISHED, order=1
+        )
+        cls.soon = Lesson.objects.create(
+            course=cls.course, title="Soon", status=PublishStatus.COMING_SOON, order=2
+        )
+        Lesson.objects.create(course=cls.course, title="Hidden", status=PublishStatus.DRAFT)
+
+    def test_list_streams_published_courses(self):
+        response = self.client.get("/api/courses/")
+        self.assertTrue(response.streaming)
+        data = json.loads(b"".join(response.streaming_content))
+        self.assertEqual(
+            [course["id"] for course in data["results"]],
+            [self.other.public_id, self.course.public_id]
+        )
+
+    def test_detail_embeds_visible_lessons(self):
+        # course + lessons
+        with self.assertNumQueries(2):
+            response = self.client.get(f"/api/courses/{self.course.public_id}/")
+        data = response.json()
+        self.assertTrue(data["requires_email"])
+        self.assertEqual([lesson["title"] for lesson in data["lessons"]], ["Visible", "Soon"])
+        self.assertEqual(data["lessons"][0]["url"], self.lesson.path)
+        self.assertTrue(data["lessons"][1]["coming_soon"])
+        self.assertIn("public", response["Cache-Control"])
+
+    def test_draft_course_is_404(self):
+        response = self.client.get(f"/api/courses/{self.draft.public_id}/")
+        self.assertEqual(response.status_code, 404)
+
+    def test_bulk_fetch_keeps_requested_order(self):
+        ids = ",".join([self.course.public_id, self.draft.public_id, "missing", self.other.public_id])
+        with self.assertNumQueries(2):
+            response = self.client.get("/api/courses/", {"ids": ids})
+        results = response.json()["results"]
+        self.assertEqual([course["id"] for course in results], [self.course.public_id, self.other.public_id])
+        self.assertEqual(len(results[0]["lessons"]), 2)
+        self.assertEqual(results[1]["lessons"], [])
+
+    def test_bulk_fetch_is_bounded(self):
+        ids = ",".join(f"course-{i}" for i in range(101))
+        self.assertEqual(self.client.get("/api/courses/", {"ids": ids}).status_code, 400)
+
+
+class SearchTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(
+            title="Django Performance",
+            description="Caching, queries and profiling.",
+            status=PublishStatus.PUBLISHED,
+        )
+        cls.lesson = Lesson.objects.create(
+            course=cls.course, title="Query budgets", description="Counting database queries."
+        )
+        cls.mention = Lesson.objects.create(
+            course=cls.course, title="Templates", description="Rendering without a query per row."
+        )
+        cls.draft = Lesson.objects.create(
+            course=cls.course, title="Query drafts", status=PublishStatus.DRAFT
+        )
+        cls.hidden_course = Course.objects.create(title="Secret queries", status=PublishStatus.DRAFT)
+
+    def assertSearch(self, text, expected, backend=None):
+        results = search.search_content(text, backend=backend)
+        self.assertEqual([result["title"] for result in results], expected)
+
+    def test_ranked_visible_results(self):
+        # Title matches first; drafts and unpublished courses never show
+        self.assertSearch("query", ["Query budgets", "Templates"])
+        self.assertSearch("django perf", ["Django Performance"])
+
+    def test_index_follows_saves(self):
+        self.draft.status = PublishStatus.PUBLISHED
+        self.draft.save()
+        self.assertSearch("drafts", ["Query drafts"])
+        self.course.status = PublishStatus.DRAFT
+        self.course.save()
+        self.assertSearch("query", [])
+        self.course.status = PublishStatus.PUBLISHED
+        self.course.save()
+        self.lesson.delete()
+        self.assertSearch("budgets", [])
+
+    def test_memory_backend_matches(self):
+        backend = search.MemoryBackend()
+        self.assertSearch("query", ["Query budgets", "Templates"], backend=backend)
+        self.assertSearch("django perf", ["Django Performance"], backend=backend)
+        search.index_lesson(self.draft, backend=backend)  # still a draft
+        self.assertSearch("drafts", [], backend=backend)
+
+    @mock.patch.object(search, "MAX_RANKED_MATCHES", 1)
+    def test_accents_are_folded_on_both_backends(self):
+        course = Course.objects.create(
+            title="Café Crème", description="Espresso basics.", status=PublishStatus.PUBLISHED
+        )
+        Lesson.objects.create(course=course, title="Cafe tips")
+        # "cafe" matches two rows: too common to rank, so it is re-checked on the text
+        for backend in (None, search.MemoryBackend()):
+            self.assertSearch("creme cafe", ["Café Crème"], backend=backend)
+            self.assertSearch("crème café", ["Café Crème"], backend=backend)
+
+    def test_course_save_reindexes_lessons_only_when_visibility_changes(self):
+        index = search.FTS5Backend.index
+        with mock.patch.object(search.FTS5Backend, "index", autospec=True, side_effect=index) as indexed:
+            self.course.title = "Django Performance Tuning"
+            self.course.save()
+            self.assertEqual([call.args[1] for call in indexed.call_args_list], [search.COURSE])
+            self.course.status = PublishStatus.DRAFT
+            self.course.save()
+            self.course.status = PublishStatus.PUBLISHED
+            self.course.save()
+        self.assertEqual(
+            [call.args[1] for call in indexed.call_args_list].count(search.LESSON), 2
+        )
+        self.assertSearch("tuning", ["Django Performance Tuning"])
+        self.assertSearch("query", ["Query budgets", "Templates"])
+
+    def test_search_fragment(self):
+        response = self.client.get("/courses/hx/search/", {"q": "budg"}, headers={"HX-Request": "true"})
+        self.assertContains(response, self.lesson.path)
+        self.assertNotContains(response, self.draft.title)
+
+
+class ConditionalGetTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        self.course = Course.objects.create(
+            title="Conditional",
+            status=PublishStatus.PUBLISHED,
+            access=AccessRequirement.ANYONE,
+        )
+        self.lesson = Lesson.objects.create(course=self.course, title="Lesson")
+
+    def assertNotModified(self, path, **headers):
+        response = self.client.get(path)
+        self.assertEqual(response.status_code, 200)
+        response = self.client.get(
+            path,
+            headers={"If-None-Match": response["ETag"], **headers}
+        )
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        return response
+
+    def test_pages_answer_if_none_match(self):
+        for path in ["/courses/", self.course.path + "/", self.lesson.path + "/"]:
+            with self.subTest(path=path):
+                self.assertNotModified(path)
+
+    def test_if_modified_since(self):
+        response = self.client.get(self.course.path + "/")
+        response = self.client.get(
+            self.course.path + "/",
+            headers={"If-Modified-Since": response["Last-Modified"]}
+        )
+        self.assertEqual(response.status_code, 304)
+
+    def test_lesson_change_updates_course_validator(self):
+        path = self.course.path + "/"
+        etag = self.client.get(path)["ETag"]
+        self.lesson.title = "Changed"
+        self.lesson.save()
+        response = self.client.get(path, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_validator_varies_on_session_email(self):
+        self.course.access = AccessRequirement.EMAIL_REQUIRED
+        self.course.save()
+        path = self.lesson.path + "/"
+        email = Email.objects.create(email="conditional@example.com")
+        session = self.client.session
+        session["email_id"] = f"{email.id}"
+        session.save()
+        etag = self.client.get(path)["ETag"]
+        self.assertEqual(self.client.get(path, headers={"If-None-Match": etag}).status_code, 304)
+        session = self.client.session
+        del session["email_id"]
+        session.save()
+        response = self.client.get(path, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, "courses/email-required.html")
+
+
+class EmailAccessTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(
+            title="Access Course",
+            status=PublishStatus.PUBLISHED,
+            access=AccessRequirement.EMAIL_REQUIRED,
+        )
+        cls.lesson = Lesson.objects.create(course=cls.course, title="Access Lesson")
+        cls.email = Email.objects.create(email="access@example.com")
+
+    def setUp(self):
+        cache.clear()
+
+    def login(self, email_id):
+        session = self.client.session
+        session["email_id"] = f"{email_id}"
+        session.save()
+
+    def test_email_is_checked_once_per_ttl(self):
+        self.login(self.email.id)
+        path = self.lesson.path + "/"
+        self.assertTemplateNotUsed(self.client.get(path), "courses/email-required.html")
+        Email.objects.filter(id=self.email.id).update(active=False)
+        # Still cached in the session
+        self.assertTemplateNotUsed(self.client.get(path), "courses/email-required.html")
+        with mock.patch("emails.access.ACCESS_CACHE_TTL", -1):
+            response = self.client.get(path)
+        self.assertTemplateUsed(response, "courses/email-required.html")
+        self.assertNotIn("email_id", self.client.session)
+
+    def test_unknown_email_is_dropped(self):
+        self.login(987654)
+        response = self.client.get(self.lesson.path + "/")
+        self.assertTemplateUsed(response, "courses/email-required.html")
+        self.assertNotIn("email_id", self.client.session)
+
+    def test_next_url_survives_verification_without_session(self):
+        path = self.lesson.path + "/"
+        self.client.get(path)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, self.client.cookies)
+        event = EmailVerificationEvent.objects.create(parent=self.email, email=self.email.email)
+        response = self.client.get(f"/verify/{event.token}/")
+        self.assertRedirects(response, path, fetch_redirect_response=False)
+        self.assertEqual(self.client.session["email_id"], f"{self.email.id}")
+
+    def test_course_detail_marks_locked_lessons(self):
+        path = self.course.path + "/"
+        self.assertContains(self.client.get(path), "Locked")
+        self.login(self.email.id)
+        self.assertNotContains(self.client.get(path), "Locked")
+
+
+# HTMX requests a page fires on its own once loaded (hx-trigger load / revealed)
+FOLLOW_UP_RE = re.compile(r'hx-get="([^"]+)"\s+hx-trigger="[^"]*\b(?:load|revealed)\b')
+
+class InlineFragmentTests(TestCase):
+    """
+    Requests per page view: the page itself plus its follow-up HTMX loads.
+    Before fragments were inlined: home 2, login 2 (3 when logged in),
+    email-required 2.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(
+            title="Inline Course",
+            status=PublishStatus.PUBLISHED,
+            access=AccessRequirement.EMAIL_REQUIRED,
+        )
+        cls.lesson = Lesson.objects.create(course=cls.course, title="Inline lesson")
+        cls.email = Email.objects.create(email="inline@example.com")
+
+    def setUp(self):
+        cache.clear()
+
+    def requests_per_view(self, response):
+        return 1 + len(FOLLOW_UP_RE.findall(response.content.decode()))
+
+    def test_login_page_inlines_form(self):
+        response = self.client.get("/login/")
+        self.assertContains(response, 'hx-post="/hx/login/"')
+        self.assertEqual(self.requests_per_view(response), 1)
+
+    def test_logout_page_inlines_button(self):
+        session = self.client.session
+        session["email_id"] = f"{self.email.id}"
+        session.save()
+        response = self.client.get("/logout/")
+        self.assertContains(response, 'hx-post="/hx/logout/"')
+        self.assertEqual(self.requests_per_view(response), 1)
+
+    def test_email_required_page_inlines_form(self):
+        response = self.client.get(self.lesson.path + "/")
+        self.assertContains(response, 'hx-post="/hx/login/"')
+        self.assertEqual(self.requests_per_view(response), 1)
+
+    def test_home_inlines_cached_course_list(self):
+        response = self.client.get("/")
+        # cold cache: the course list still loads lazily, below the fold
+        self.assertEqual(FOLLOW_UP_RE.findall(response.content.decode()), ["/courses/"])
+        self.client.get("/courses/", headers={"HX-Request": "true"})
+        response = self.client.get("/")
+        self.assertContains(response, self.course.path)
+        self.assertEqual(self.requests_per_view(response), 1)
+
+
+@override_settings(PERF_SERVER_TIMING=True)
+class PerformanceMiddlewareTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(
+            title="Timed Course",
+            status=PublishStatus.PUBLISHED,
+            access=AccessRequirement.ANYONE,
+        )
+        Lesson.objects.create(course=cls.course, title="Timed lesson")
+
+    def setUp(self):
+        cache.clear()
+
+    def test_server_timing_and_log_line(self):
+        with self.assertLogs("helpers.perf", "DEBUG") as logs:
+            response = self.client.get(self.course.path + "/")
+        timing = response["Server-Timing"]
+        self.assertIn('db;dur=', timing)
+        self.assertIn('desc="2 queries"', timing)
+        self.assertIn("template;dur=", timing)
+        self.assertIn("total;dur=", timing)
+        self.assertIn("db_queries=2", logs.output[0])
+        self.assertIn(f"path={self.course.path}/ status=200", logs.output[0])
+
+    def test_cache_hits_are_reported(self):
+        headers = {"HX-Request": "true"}
+        self.assertIn('cache;desc="0 hits, 1 misses"', self.client.get("/courses/", headers=headers)["Server-Timing"])
+        self.assertIn('cache;desc="1 hits, 0 misses"', self.client.get("/courses/", headers=headers)["Server-Timing"])
+
+    @override_settings(PERF_SERVER_TIMING=False)
+    def test_header_can_be_disabled(self):
+        self.assertNotIn("Server-Timing", self.client.get("/courses/"))
+
+    @override_settings(ROOT_URLCONF="perf.urls_async")
+    async def test_async_views_are_measured(self):
+        response = await self.async_client.get(self.course.path + "/")
+        self.assertIn('desc="2 queries"', response["Server-Timing"])
+
+    def test_sample_filter(self):
+        never = helpers.SampleFilter(rate=0)
+        record = logging.LogRecord("courses", logging.INFO, __file__, 1, "msg", None, None)
+        self.assertFalse(never.filter(record))
+        record.levelno = logging.WARNING
+        self.assertTrue(never.filter(record))
+        self.assertTrue(helpers.SampleFilter(rate=1).filter(record))
+
+    def test_queued_handler_writes_from_background_thread(self):
+        stream = io.StringIO()
+        handler = helpers.QueuedStreamHandler(stream)
+        record = logging.LogRecord("helpers.perf", logging.DEBUG, __file__, 1, "path=%s", ("/",), None)
+        handler.handle(record)
+        handler.close()  # drains the queue
+        self.assertEqual(stream.getvalue(), "path=/\n")
+
+    def test_no_log_line_above_debug(self):
+        perf_logger = logging.getLogger("helpers.perf")
+        self.addCleanup(perf_logger.setLevel, perf_logger.level)
+        perf_logger.setLevel(logging.INFO)
+        with mock.patch("helpers._perf.middleware.logger.debug") as debug:
+            self.client.get(self.course.path + "/")
+        debug.assert_not_called()
+
+
+class MetricsTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(title="Metered Course", status=PublishStatus.PUBLISHED)
+
+    def setUp(self):
+        cache.clear()
+
+    def sample(self, text, line_prefix):
+        for line in text.splitlines():
+            if line.startswith(line_prefix + " "):
+                return float(line.rsplit(" ", 1)[1])
+        return 0.0
+
+    def scrape(self):
+        response = self.client.get("/metrics")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/plain; version=0.0.4"))
+        return response.content.decode()
+
+    def test_requests_are_counted_per_url_pattern(self):
+        route = 'route="/courses/<slug:course_id>/"'
+        before = self.scrape()
+        self.client.get(self.course.path + "/")
+        self.client.get("/courses/missing-course/")
+        text = self.scrape()
+        for status in (200, 404):
+            line = f'http_requests_total{{{route},method="GET",status="{status}"}}'
+            self.assertEqual(self.sample(text, line) - self.sample(before, line), 1)
+        count = f"http_request_duration_seconds_count{{{route},method=\"GET\"}}"
+        self.assertEqual(self.sample(text, count) - self.sample(before, count), 2)
+        self.assertIn(f'http_request_db_queries_bucket{{{route},le="+Inf"}}', text)
+        self.assertIn("# TYPE http_request_duration_seconds histogram", text)
+
+    def test_verify_token_outcomes(self):
+        line = 'emails_verify_token_total{outcome="invalid"}'
+        before = self.sample(self.scrape(), line)
+        self.client.get("/verify/00000000-0000-4000-8000-000000000000/")
+        self.assertEqual(self.sample(self.scrape(), line) - before, 1)
+
+    @mock.patch("course.views.METRICS_AUTH_TOKEN", "secret")
+    def test_auth_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        response = self.client.get("/metrics", headers={"Authorization": "Bearer secret"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_multiprocess_snapshots_are_summed(self):
+        from helpers._metrics.registry import Registry
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        worker = Registry()
+        worker.counter("jobs_total", "Jobs.", ("kind",)).inc("a", amount=2)
+        worker.histogram("job_seconds", "Job time.", buckets=(1,)).observe(0.5)
+        with mock.patch("os.getpid", return_value=1):
+            helpers.MultiProcessStore(tmp.name, worker).flush()
+        local = Registry()
+        local.counter("jobs_total", "Jobs.", ("kind",)).inc("a")
+        local.histogram("job_seconds", "Job time.", buckets=(1,)).observe(2)
+        text = helpers.render_metrics(helpers.MultiProcessStore(tmp.name, local))
+        self.assertIn('jobs_total{kind="a"} 3', text)
+        self.assertIn('job_seconds_bucket{le="1"} 1', text)
+        self.assertIn('job_seconds_bucket{le="+Inf"} 2', text)
+        self.assertIn("job_seconds_sum 2.5", text)
+
+    def flush_as(self, directory, pid, jobs):
+        from helpers._metrics.registry import Registry
+        registry = Registry()
+        registry.counter("jobs_total", "Jobs.").inc(amount=jobs)
+        with mock.patch("os.getpid", return_value=pid):
+            helpers.MultiProcessStore(directory, registry).flush()
+
+    def test_exited_process_files_are_folded(self):
+        from helpers._metrics.registry import Registry
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        # Above the Linux pid limit: never a running process
+        self.flush_as(tmp.name, 4_194_305, jobs=2)
+        self.flush_as(tmp.name, 4_194_306, jobs=3)
+        self.flush_as(tmp.name, 1, jobs=4)
+        store = helpers.MultiProcessStore(tmp.name, Registry())
+        for _ in range(2):
+            self.assertIn("jobs_total 9", helpers.render_metrics(store))
+        # Left: the live worker, this process and the aggregate
+        files = sorted(name.split("-")[1] for name in os.listdir(tmp.name) if name.endswith(".json"))
+        self.assertEqual(files, sorted(["1", str(os.getpid()), "aggregate.json"]))
+
+    def test_reused_pid_keeps_both_counts(self):
+        from helpers._metrics.registry import Registry
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.flush_as(tmp.name, 1, jobs=2)
+        self.flush_as(tmp.name, 1, jobs=5)
+        store = helpers.MultiProcessStore(tmp.name, Registry())
+        self.assertIn("jobs_total 7", helpers.render_metrics(store))
+        self.flush_as(tmp.name, 1, jobs=1)
+        self.assertIn("jobs_total 8", helpers.render_metrics(store))
+
+
+@override_settings(ROOT_URLCONF="perf.urls_async")
+class AsyncViewTests(TestCase):
+    """The async views answer exactly like their sync counterparts."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.course = Course.objects.create(
+            title="Async Course",
+            status=PublishStatus.PUBLISHED,
+            access=AccessRequirement.ANYONE,
+        )
+        cls.lesson = Lesson.objects.create(course=cls.course, title="Async Lesson")
+        cls.gated_course = Course.objects.create(
+            title="Async Gated",
+            status=PublishStatus.PUBLISHED,
+            access=AccessRequirement.EMAIL_REQUIRED,
+        )
+        cls.gated_lesson = Lesson.objects.create(course=cls.gated_course, title="Gated")
+
+    def setUp(self):
+        cache.clear()
+
+    async def test_pages_match_sync_views(self):
+        for path in ("/courses/", self.course.path + "/", self.lesson.path + "/"):
+            response = await self.async_client.get(path)
+            self.assertEqual(response.status_code, 200)
+            with self.settings(ROOT_URLCONF="perf.urls_sync"):
+                sync_response = await self.async_client.get(path)
+            self.assertEqual(response["ETag"], sync_response["ETag"])
+            response = await self.async_client.get(path, headers={"If-None-Match": response["ETag"]})
+            self.assertEqual(response.status_code, 304)
+
+    async def test_unknown_course_is_404(self):
+        response = await self.async_client.get("/courses/does-not-exist/")
+        self.assertEqual(response.status_code, 404)
+
+    async def test_gated_lesson_stores_next_url(self):
+        path = self.gated_lesson.path + "/"
+        response = await self.async_client.get(path)
+        self.assertTemplateUsed(response, "courses/email-required.html")
+        self.assertEqual(response.cookies["next_url"].value.split(":")[0], path)
+        self.assertNotIn(settings.SESSION_COOKIE_NAME, response.cookies)
+
+
+class PerfToolsTests(TestCase):
+    """The statistics and load plans behind bench_suite and load_test."""
+
+    def test_percentile(self):
+        samples = [float(i) for i in range(1, 101)]
+        self.assertEqual(perf_utils.percentile([], 50), 0.0)
+        self.assertEqual(perf_utils.percentile([3.0], 99), 3.0)
+        self.assertEqual(
+            [perf_utils.percentile(samples, pct) for pct in (0, 50, 95, 99, 100)], [1, 50, 95, 99, 100]
+        )
+
+    def test_compare_results(self):
+        baseline = {
+            "slower": {"p50_ms": 10.0},
+            "noise": {"p50_ms": 0.01},
+            "faster": {"p50_ms": 10.0},
+            "zero": {"p50_ms": 0.0},
+            "removed": {"p50_ms": 1.0},
+        }
+        results = {
+            "slower": {"p50_ms": 13.0},
+            "noise": {"p50_ms": 0.03},  # +200%, but below min_delta_ms
+            "faster": {"p50_ms": 5.0},
+            "zero": {"p50_ms": 1.0},
+            "added": {"p50_ms": 1.0},
+        }
+        rows = {row[0]: row[1:] for row in perf_utils.compare_results(results, baseline, threshold=0.2)}
+        self.assertEqual(set(rows), {"slower", "noise", "faster", "zero"})
+        self.assertEqual(rows["slower"], (10.0, 13.0, 0.3, True))
+        self.assertFalse(rows["noise"][3])
+        self.assertEqual(rows["faster"], (10.0, 5.0, -0.5, False))
+        self.assertEqual(rows["zero"], (0.0, 1.0, 0.0, False))
+        rows = perf_utils.compare_results(results, baseline, threshold=0.5)
+        self.assertFalse(any(regressed for *_, regressed in rows))
+
+    def test_load_baseline(self):
+        self.assertIsNone(perf_utils.load_baseline(None))
+        with tempfile.NamedTemporaryFile("w", suffix=".json") as fh:
+            json.dump({"results": {"home": {"p95_ms": 1.0}}}, fh)
+            fh.flush()
+            self.assertEqual(perf_utils.load_baseline(fh.name), {"home": {"p95_ms": 1.0}})
+            fh.seek(0)
+            fh.write("[]")
+            fh.truncate()
+            fh.flush()
+            with self.assertRaises(CommandError):
+                perf_utils.load_baseline(fh.name)
+
+    def test_parse_mix(self):
+        self.assertEqual(loadgen.parse_mix("home=20, verify=2.5"), {"home": 20.0, "verify": 2.5})
+        with self.assertRaises(ValueError):
+            loadgen.parse_mix("home=20,admin=1")
+        with self.assertRaises(ValueError):
+            loadgen.parse_mix("home=lots")
+
+    def test_schedule_is_deterministic_and_uses_each_token_once(self):
+        def make_plan():
+            return loadgen.RoutePlan(
+                ["/courses/a", "/courses/b"], ["/courses/a/lessons/x"], [], ["t1", "t2", "t3"],
+                mix={"course_detail": 1, "lesson": 1, "lesson_gated": 5, "verify": 5}, seed=7,
+            )
+        plan = make_plan()
+        schedule = plan.schedule(200)
+        self.assertEqual(schedule, make_plan().schedule(200))
+        # No gated lessons: the route is left out of the mix
+        self.assertNotIn("lesson_gated", plan.mix)
+        verify = [path for name, path in schedule if name == "verify"]
+        self.assertEqual(sorted(verify), ["/verify/t1/", "/verify/t2/", "/verify/t3/"])
+        # Verify draws beyond the tokens are dropped, not repeated
+        self.assertLess(len(schedule), 200)
+        self.assertEqual(
+            {path for name, path in schedule if name == "course_detail"}, {"/courses/a/", "/courses/b/"}
+        )
+
+
+class SeedPerfDataTests(TestCase):
+    options = {"courses": 3, "lessons_per_course": 2, "emails": 5, "events": 20, "skip_index": True}
+
+    def test_refuses_without_debug(self):
+        with self.assertRaisesMessage(CommandError, "--yes"):
+            call_command("seed_perf_data", stdout=io.StringIO(), **self.options)
+        self.assertFalse(Course.objects.exists())
+
+    def test_clear_keeps_real_rows(self):
+        # A real course whose slug starts like the seeded ones
+        course = Course.objects.create(title="Perf Tuning")
+        Lesson.objects.create(course=course, title="Perf Lesson")
+        email = Email.objects.create(email="someone@example.com")
+        EmailVerificationEvent.objects.create(parent=email, email=email.email)
+        for clear in (False, True):
+            call_command("seed_perf_data", yes=True, clear=clear, stdout=io.StringIO(), **self.options)
+            self.assertEqual(Course.objects.count(), 4)
+            self.assertEqual(Lesson.objects.count(), 7)
+            self.assertEqual(EmailVerificationEvent.objects.count(), 21)
+        with self.assertRaisesMessage(CommandError, "--clear"):
+            call_command("seed_perf_data", yes=True, stdout=io.StringIO(), **self.options)
+        from perf import seeding
+        seeding.clear_seeded_data()
+        self.assertEqual(list(Course.objects.all()), [course])
+        self.assertEqual(Lesson.objects.count(), 1)
+        self.assertEqual(list(Email.objects.all()), [email])
+        self.assertEqual(EmailVerificationEvent.objects.count(), 1)
+
+
+class LoadTestCommandTests(TransactionTestCase):
+    """load_test against the in-process server (TransactionTestCase: its threads read the rows)."""
+
+    def setUp(self):
+        course = Course.objects.create(
+            title="Load Course",
+            status=PublishStatus.PUBLISHED,
+            access=AccessRequirement.ANYONE,
+        )
+        Lesson.objects.create(course=course, title="Load Lesson", status=PublishStatus.PUBLISHED)
+        # The server re-applies LOGGING: restore the project's once done
+        self.addCleanup(lambda: logging.config.dictConfig(settings.LOGGING))
+
+    @unittest.skipIf(loadgen.uvicorn is None, "uvicorn is not installed")
+    @override_settings(ROOT_URLCONF="perf.urls_async", ALLOWED_HOSTS=["127.0.0.1"])
+    def test_asgi_server_serves_async_views(self):
+        course = Course.objects.get()
+        server = loadgen.LocalAsgiServer()
+        with server, loadgen.muted_perf_log():
+            elapsed, results = loadgen.run_load(
+                server.url, [("course_detail", course.path + "/"), ("courses_hx", "/courses/")], 2
+            )
+        self.assertEqual(loadgen.build_report(elapsed, results)[0]["errors"], 0)
+
+    def test_url_is_refused_without_debug(self):
+        with self.assertRaisesMessage(CommandError, "--yes"):
+            call_command("load_test", url="http://127.0.0.1:9", stdout=io.StringIO())
+        self.assertFalse(EmailVerificationEvent.objects.exists())
+
+    def test_report_has_no_per_request_log_lines(self):
+        # Per-request lines on, written straight to the captured stderr
+        logging_config = {
+            **settings.LOGGING,
+            "handlers": {"perf": {"class": "logging.StreamHandler", "stream": "ext://sys.stderr"}},
+            "loggers": {"helpers.perf": {"handlers": ["perf"], "level": "DEBUG", "propagate": False}},
+        }
+        out, err = io.StringIO(), io.StringIO()
+        with (
+            override_settings(LOGGING=logging_config),
+            # The test database already is a throwaway one
+            mock.patch("perf.management.commands.load_test.benchmark_database", mock.MagicMock()),
+            mock.patch("sys.stderr", err),
+        ):
+            call_command("load_test", requests=20, concurrency=2, warmup=0, stdout=out, stderr=err)
+        self.assertIn("20 requests", out.getvalue())
+        self.assertNotIn("method=", out.getvalue() + err.getvalue())
@@ -0,0 +1,391 @@
+import csv
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils.module_loading import import_string
+
+from . import cache as courses_cache
+from . import search
+from .models import (
+    PUBLIC_ID_ATTEMPTS,
+    AccessRequirement,
+    Course,
+    Lesson,
+    PublishStatus,
+    generate_public_id,
+)
+
+# Callable(source, **upload_options) -> CloudinaryResource (or its stored string)
+MEDIA_UPLOADER = getattr(settings, "COURSES_MEDIA_UPLOADER", "cloudinary.uploader.upload_resource")
+UPLOAD_WORKERS = 4
+BATCH_SIZE = 500
+# Finished uploads recorded between two writes of the progress file
+UPLOADS_PER_SAVE = 25
+
+# Manifest media values with this prefix are already in Cloudinary (stored as-is)
+STORED_MEDIA_PREFIX = "cloudinary:"
+
+COURSE_FIELDS = ("public_id", "title", "description", "access", "status")
+LESSON_FIELDS = ("public_id", "title", "description", "order", "can_preview", "status")
+MEDIA_FIELDS = {Course: ("image",), Lesson: ("thumbnail", "video")}
+# Flat CSV layout: one row per lesson; a course without lessons has empty lesson columns
+CSV_COURSE_COLUMNS = [f"course_{name}" for name in COURSE_FIELDS + MEDIA_FIELDS[Course]]
+CSV_LESSON_COLUMNS = [f"lesson_{name}" for name in LESSON_FIELDS + MEDIA_FIELDS[Lesson]]
+CSV_COLUMNS = CSV_COURSE_COLUMNS + CSV_LESSON_COLUMNS
+
+
+# Manifests
+
+def read_manifest(path):
+    """
+    Returns a list of course dicts, each with a `lessons` list.
+    JSON manifests are {"courses": [...]}; `.csv` files use CSV_COLUMNS.
+    Raises ValueError for an unreadable manifest.
+    """
+    with open(path, newline="") as fh:
+        if path.endswith(".csv"):
+            courses = _courses_from_rows(csv.DictReader(fh))
+        else:
+            try:
+                courses = json.load(fh).get("courses")
+            except (json.JSONDecodeError, AttributeError) as e:
+                raise ValueError(f"{path}: not a course manifest ({e})")
+    if not isinstance(courses, list):
+        raise ValueError(f"{path}: expected a list of courses")
+    for index, course in enumerate(courses):
+        if not course.get("title"):
+            raise ValueError(f"{path}: course {index} has no title")
+        for lesson_index, lesson in enumerate(course.setdefault("lessons", [])):
+            if not lesson.get("title"):
+                raise ValueError(f"{path}: course {index} lesson {lesson_index} has no title")
+    return courses
+
+def _courses_from_rows(rows):
+    courses = {}
+    for row in rows:
+        course_row = {name[len("course_"):]: row.get(name) or "" for name in CSV_COURSE_COLUMNS}
+        key = course_row["public_id"] or course_row["title"]
+        course = courses.setdefault(key, {**course_row, "lessons": []})
+        if row.get("lesson_title"):
+            lesson = {name[len("lesson_"):]: row.get(name) or "" for name in CSV_LESSON_COLUMNS}
+            lesson["order"] = int(lesson["order"] or 0)
+            lesson["can_preview"] = lesson["can_preview"].lower() in ("1", "true", "yes")
+            course["lessons"].append(lesson)
+    return list(courses.values())
+
+def write_manifest(courses, fh, format="json"):
+    if format == "csv":
+        writer = csv.DictWriter(fh, fieldnames=CSV_COLUMNS)
+        writer.writeheader()
+        for course in courses:
+            course_row = {f"course_{name}": course.get(name) or "" for name in COURSE_FIELDS + MEDIA_FIELDS[Course]}
+            for lesson in course["lessons"] or [{}]:
+                lesson_row = {
+                    f"lesson_{name}": lesson.get(name, "") for name in LESSON_FIELDS + MEDIA_FIELDS[Lesson]
+                }
+                writer.writerow({**course_row, **lesson_row})
+    else:
+        json.dump({"courses": courses}, fh, indent=2)
+        fh.write("\n")
+
+
+# Export
+
+def _stored_media(obj, field_name):
+    value = obj._meta.get_field(field_name).value_to_string(obj)
+    return f"{STORED_MEDIA_PREFIX}{value}" if value else ""
+
+# Courses (all, or the given public_ids) with their lessons, as manifest dicts
+def export_courses(public_ids=None):
+    """
+    Two queries. Media are exported as their stored Cloudinary values, so
+    importing the manifest again links the same assets without uploading.
+    """
+    courses = Course.objects.order_by("id")
+    if public_ids:
+        courses = courses.filter(public_id__in=public_ids)
+    exported = {}
+    for course in courses:
+        exported[course.id] = {
+            **{name: getattr(course, name) for name in COURSE_FIELDS},
+            **{name: _stored_media(course, name) for name in MEDIA_FIELDS[Course]},
+            "lessons": [],
+        }
+    for lesson in Lesson.objects.filter(course_id__in=exported).order_by("course_id", "order", "id"):
+        exported[lesson.course_id]["lessons"].append({
+            **{name: getattr(lesson, name) for name in LESSON_FIELDS},
+            **{name: _stored_media(lesson, name) for name in MEDIA_FIELDS[Lesson]},
+        })
+    return list(exported.values())
+
+
+# Import
+
+class ImportProgress:
+    """
+    What an import has done so far, saved as JSON next to the manifest:
+    the public_id given to every manifest entry and every finished upload.
+    A re-run with the same progress file skips both. Uploads are written
+    out every UPLOADS_PER_SAVE, and by flush() once the uploads stop.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self.public_ids = {}  # manifest key -> public_id
+        self.uploads = {}  # "<manifest key>:<field>" -> stored Cloudinary value
+        self._lock = threading.Lock()
+        self._unsaved = 0
+        if path and os.path.exists(path):
+            with open(path) as fh:
+                data = json.load(fh)
+            self.public_ids = data.get("public_ids", {})
+            self.uploads = data.get("uploads", {})
+
+    def record_upload(self, key, value):
+        with self._lock:
+            self.uploads[key] = value
+            self._unsaved += 1
+            if self._unsaved >= UPLOADS_PER_SAVE:
+                self.save()
+
+    def flush(self):
+        with self._lock:
+            if self._unsaved:
+                self.save()
+
+    def save(self):
+        if not self.path:
+            return
+        # Written to a temporary file first, so an interrupted run never leaves half a file
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as fh:
+            json.dump({"public_ids": self.public_ids, "uploads": self.uploads}, fh)
+        os.replace(tmp_path, self.path)
+        self._unsaved = 0
+
+class ImportResult:
+    __slots__ = ("courses_created", "lessons_created", "uploaded", "failed")
+
+    def __init__(self):
+        self.courses_created = 0
+        self.lessons_created = 0
+        self.uploaded = 0
+        self.failed = []  # (upload key, error)
+
+def _assign_public_ids(courses, progress):
+    """
+    Every entry keeps the id it got on the first run, so a resumed import
+    finds the rows it already created. Returns the (model, entry) pairs
+    whose id was generated by this run.
+    """
+    for index, course in enumerate(courses):
+        course["_key"] = f"{index}"
+        for lesson_index, lesson in enumerate(course["lessons"]):
+            lesson["_key"] = f"{index}.{lesson_index}"
+    entries = [(Course, course) for course in courses]
+    entries += [(Lesson, lesson) for course in courses for lesson in course["lessons"]]
+    generated = []
+    for model, entry in entries:
+        public_id = entry.get("public_id") or progress.public_ids.get(entry["_key"])
+        if public_id:
+            entry["public_id"] = progress.public_ids[entry["_key"]] = public_id
+        else:
+            generated.append((model, entry))
+    _generate_public_ids(generated, generated, progress)
+    return generated
+
+# Public ids among `public_ids` already used by a `model` row
+def _taken_public_ids(model, public_ids, batch_size=BATCH_SIZE):
+    taken = set()
+    for offset in range(0, len(public_ids), batch_size):
+        batch = public_ids[offset:offset + batch_size]
+        taken.update(model.objects.filter(public_id__in=batch).values_list("public_id", flat=True))
+    return taken
+
+def _generate_public_ids(pending, generated, progress):
+    """
+    Gives the `pending` entries fresh public ids, then generates again for
+    any of `generated` whose id an existing row or another entry already
+    has, like save_with_public_id() does on a collision.
+    """
+    for attempt in range(PUBLIC_ID_ATTEMPTS):
+        for model, entry in pending:
+            entry["public_id"] = progress.public_ids[entry["_key"]] = generate_public_id(
+                model(title=entry["title"])
+            )
+        pending = []
+        for model in (Course, Lesson):
+            seen = set()
+            entries = [(entry_model, entry) for entry_model, entry in generated if entry_model is model]
+            taken = _taken_public_ids(model, [entry["public_id"] for _, entry in entries])
+            for entry_model, entry in entries:
+                if entry["public_id"] in taken or entry["public_id"] in seen:
+                    pending.append((entry_model, entry))
+                seen.add(entry["public_id"])
+        if not pending:
+            break
+    else:
+        raise IntegrityError(f"No unique public_id for {len(pending)} manifest entries")
+    progress.save()
+
+def _create_rows(courses, new_keys=(), batch_size=BATCH_SIZE):
+    """
+    bulk_create()s the courses and lessons that do not exist yet (matched on
+    public_id). Entries in `new_keys` got their id from this run and are
+    always created: a row with that id belongs to someone else, and the
+    IntegrityError says so. Returns ({course key: Course}, {lesson key:
+    Lesson}, created counts).
+    """
+    existing = {
+        course.public_id: course
+        for course in Course.objects.filter(public_id__in=[
+            course["public_id"] for course in courses if course["_key"] not in new_keys
+        ])
+    }
+    new_courses = [
+        Course(
+            public_id=course["public_id"],
+            title=course["title"],
+            description=course.get("description") or "",
+            access=course.get("access") or AccessRequirement.EMAIL_REQUIRED,
+            status=course.get("status") or PublishStatus.DRAFT,
+        )
+        for course in courses if course["public_id"] not in existing
+    ]
+    Course.objects.bulk_create(new_courses, batch_size=batch_size)
+    existing.update((course.public_id, course) for course in new_courses)
+    course_objs = {course["_key"]: existing[course["public_id"]] for course in courses}
+
+    existing_lessons = {
+        (lesson.course_id, lesson.public_id): lesson
+        for lesson in Lesson.objects.filter(course_id__in=[course.id for course in course_objs.values()])
+    }
+    lesson_objs = {}
+    new_lessons = []
+    for course in courses:
+        course_obj = course_objs[course["_key"]]
+        for lesson in course["lessons"]:
+            lesson_obj = existing_lessons.get((course_obj.id, lesson["public_id"]))
+            if lesson_obj is None:
+                lesson_obj = Lesson(
+                    course=course_obj,
+                    public_id=lesson["public_id"],
+                    title=lesson["title"],
+                    description=lesson.get("description") or "",
+                    order=lesson.get("order") or 0,
+                    can_preview=bool(lesson.get("can_preview")),
+                    status=lesson.get("status") or PublishStatus.PUBLISHED,
+                )
+                new_lessons.append(lesson_obj)
+            lesson_obj.course = course_obj  # path / prefixes without a query
+            lesson_objs[lesson["_key"]] = lesson_obj
+    Lesson.objects.bulk_create(new_lessons, batch_size=batch_size)
+    return course_objs, lesson_objs, len(new_courses), len(new_lessons)
+
+def get_upload_options(obj, field_name):
+    # The options CloudinaryField.pre_save() would upload with
+    field = obj._meta.get_field(field_name)
+    options = {"type": field.type, "resource_type": field.resource_type}
+    options.update({key: val(obj) if callable(val) else val for key, val in field.options.items()})
+    return options
+
+def _resolve_source(source, base_dir):
+    if "://" in source or os.path.isabs(source):
+        return source
+    return os.path.join(base_dir, source)
+
+def _upload(uploader, obj, field_name, source):
+    resource = uploader(source, **get_upload_options(obj, field_name))
+    return obj._meta.get_field(field_name).get_prep_value(resource)
+
+def _upload_media(tasks, progress, uploader, max_workers, result):
+    # tasks: (upload key, obj, field_name, source); finished uploads are saved
+    # to the progress file as they complete
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(_upload, uploader, obj, field_name, source): key
+            for key, obj, field_name, source in tasks
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                progress.record_upload(key, future.result())
+                result.uploaded += 1
+            except Exception as e:
+                result.failed.append((key, e))
+
+def _apply_media(entries, progress, batch_size=BATCH_SIZE):
+    # entries: (manifest entry, obj); sets uploaded / stored media and renditions
+    changed = {Course: [], Lesson: []}
+    for entry, obj in entries:
+        model = obj.__class__
+        touched = False
+        for field_name in MEDIA_FIELDS[model]:
+            value = progress.uploads.get(f"{entry['_key']}:{field_name}")
+            source = entry.get(field_name) or ""
+            if value is None and source.startswith(STORED_MEDIA_PREFIX):
+                value = source[len(STORED_MEDIA_PREFIX):]
+            if value:
+                setattr(obj, field_name, obj._meta.get_field(field_name).to_python(value))
+                touched = True
+        if touched:
+            obj.renditions = obj.build_renditions()
+            changed[model].append(obj)
+    for model, objs in changed.items():
+        if objs:
+            model.objects.bulk_update(objs, [*MEDIA_FIELDS[model], "renditions"], batch_size=batch_size)
+
+# Creates the manifest's courses and lessons and uploads their media
+def import_courses(courses, base_dir=".", progress=None, uploader=None,
+                   max_workers=UPLOAD_WORKERS, batch_size=BATCH_SIZE):
+    """
+    Rows are bulk_create()d (public_ids generated up front, no per-row
+    save()), then media are uploaded concurrently on `max_workers` threads.
+    Uploads that fail are reported in the result and retried by the next
+    run with the same progress file. Bulk writes skip the model signals,
+    so the course caches and the search index are refreshed here.
+    """
+    progress = progress or ImportProgress()
+    uploader = uploader or import_string(MEDIA_UPLOADER)
+    result = ImportResult()
+    generated = _assign_public_ids(courses, progress)
+    new_keys = {entry["_key"] for _, entry in generated}
+    for attempt in range(PUBLIC_ID_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                course_objs, lesson_objs, result.courses_created, result.lessons_created = _create_rows(
+                    courses, new_keys, batch_size=batch_size
+                )
+            break
+        except IntegrityError:
+            # Another writer took a generated id since it was checked
+            if not generated or attempt == PUBLIC_ID_ATTEMPTS - 1:
+                raise
+            _generate_public_ids([], generated, progress)
+
+    entries = [(course, course_objs[course["_key"]]) for course in courses]
+    entries += [(lesson, lesson_objs[lesson["_key"]]) for course in courses for lesson in course["lessons"]]
+    tasks = []
+    for entry, obj in entries:
+        for field_name in MEDIA_FIELDS[obj.__class__]:
+            source = entry.get(field_name) or ""
+            key = f"{entry['_key']}:{field_name}"
+            if source and not source.startswith(STORED_MEDIA_PREFIX) and key not in progress.uploads:
+                tasks.append((key, obj, field_name, _resolve_source(source, base_dir)))
+    try:
+        _upload_media(tasks, progress, uploader, max_workers, result)
+    finally:
+        progress.flush()
+
+    with transaction.atomic():
+        _apply_media(entries, progress, batch_size=batch_size)
+    courses_cache.bump_content_version(
+        courses_cache.LIST_SCOPE,
+        *[courses_cache.get_course_scope(course.id) for course in course_objs.values()],
+    )
+    for course in course_objs.values():
+        search.index_course(course, with_lessons=True)
+    return result
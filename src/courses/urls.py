@@ -1,10 +1,24 @@
+from django.conf import settings
 from django.urls import path
 
 from . import views
 
-# Define URL patterns for the app
-urlpatterns = [
+sync_urlpatterns = [
+    path("hx/more/", views.course_list_more_view),  # before the slug patterns
+    path("hx/search/", views.course_search_view),
     path("<slug:course_id>/lessons/<slug:lesson_id>/", views.lesson_detail_view),
     path("<slug:course_id>/", views.course_detail_view),
     path("", views.course_list_view),
-]
\ No newline at end of file
+]
+
+# Native async views, for deployments served through course/asgi.py
+async_urlpatterns = [
+    path("hx/more/", views.course_list_more_view),
+    path("hx/search/", views.course_search_view),
+    path("<slug:course_id>/lessons/<slug:lesson_id>/", views.alesson_detail_view),
+    path("<slug:course_id>/", views.acourse_detail_view),
+    path("", views.acourse_list_view),
+]
+
+# Define URL patterns for the app
+urlpatterns = async_urlpatterns if settings.COURSES_ASYNC_VIEWS else sync_urlpatterns
@@ -1,41 +1,133 @@
 import helpers
-from django.http import Http404, JsonResponse
+import logging
+from functools import partial
+from asgiref.sync import sync_to_async
+from django.core.exceptions import BadRequest
+from django.http import Http404, HttpResponse, JsonResponse
 from django.shortcuts import render, redirect
+from django.template.loader import render_to_string
+from django.utils.cache import patch_vary_headers
+from emails.access import aget_email_access, get_email_access, set_next_url
+from emails.forms import get_login_form_context
 
-from . import services
+from . import cache as courses_cache
+from . import outline, search, services
+from .conditional import (
+    aconditional_response,
+    aget_session_state,
+    conditional_response,
+    get_access_state,
+    latest,
+)
+
+logger = logging.getLogger(__name__)
 
 # View for listing courses
 def course_list_view(request):
     """
     Fetch and display a list of published courses.
     Uses different templates based on whether the request is a standard or an HTMX request.
+    Answers conditional requests with a 304 using the latest course update.
     """
-    queryset = services.get_publish_courses()  # Retrieve all published courses
+    validator = services.get_publish_courses_validator()  # One aggregate query
+    response = conditional_response(
+        request,
+        validator['updated'],
+        [validator['count'], bool(request.htmx)],
+        lambda: render_course_list(request)
+    )
+    patch_vary_headers(response, ("HX-Request",))
+    return response
+
+# Renders the course list page or its HTMX snippet
+def render_course_list(request):
+    content_version = courses_cache.get_content_version(courses_cache.LIST_SCOPE)
     context = {
-        "object_list": queryset  # Add the course list to the context
+        "page": services.get_publish_courses_page(),  # First page of published courses (lazy)
+        "content_version": content_version,
+        "fragment_cache_timeout": courses_cache.FRAGMENT_CACHE_TIMEOUT,
     }
     template_name = "courses/list.html"  # Default template for standard requests
     if request.htmx:
         # HTMX requests use a snippet template and limit the displayed courses
         template_name = "courses/snippets/list-display.html"
-        context['queryset'] = queryset[:3]  # Limit to the first 3 courses
+        context['queryset'] = services.get_publish_courses_page(page_size=3)  # The 3 newest courses
+        html = courses_cache.get_or_render_fragment(
+            courses_cache.COURSE_LIST_SNIPPET,
+            [content_version],
+            lambda: render_to_string(template_name, context, request=request)
+        )
+        return HttpResponse(html)
+    # The page body is fragment-cached in the template itself
     return render(request, template_name, context)
 
+# HTMX "load more" fragment for the course catalogue
+def course_list_more_view(request):
+    """
+    Returns the course cards after `?cursor=` and, when more remain, the
+    element that loads the next page once it scrolls into view.
+    Every page is one indexed range query, however deep the cursor.
+    """
+    cursor = request.GET.get("cursor") or None
+    try:
+        page = services.get_publish_courses_page(cursor=cursor)
+    except ValueError:
+        raise BadRequest("Invalid cursor")
+    content_version = courses_cache.get_content_version(courses_cache.LIST_SCOPE)
+    html = courses_cache.get_or_render_fragment(
+        "course_list_more",
+        [content_version, cursor],
+        lambda: render_to_string(
+            "courses/snippets/list-items.html",
+            {"queryset": page.items, "next_cursor": page.next_cursor},
+            request=request
+        )
+    )
+    return HttpResponse(html)
+
+# HTMX search-as-you-type fragment over courses and lessons
+def course_search_view(request):
+    """
+    Ranked courses and lessons matching `?q=` (the last word as a prefix).
+    Only content the catalogue shows is searchable.
+    """
+    query = request.GET.get("q", "").strip()[:100]
+    context = {
+        "query": query,
+        "results": search.search_content(query) if query else [],
+    }
+    return render(request, "courses/snippets/search-results.html", context)
+
 # View for displaying course details
 def course_detail_view(request, course_id=None, *args, **kwargs):
     """
     Fetch and display details of a specific course along with its lessons.
     Raises a 404 error if the course is not found.
+    Answers conditional requests with a 304 using the course and lesson updates.
     """
     course_obj = services.get_course_detail(course_id=course_id)  # Fetch the course details
     if course_obj is None:
         raise Http404  # Raise a 404 error if the course does not exist
-    lessons_queryset = services.get_course_lessons(course_obj)  # Fetch the lessons for the course
+    email_access = get_email_access(request)  # Lessons show as locked / unlocked
+    return conditional_response(
+        request,
+        latest(course_obj.updated, course_obj.lessons_updated),
+        [course_obj.lessons_count],
+        lambda: render_course_detail(request, course_obj),
+        get_access_state(email_access),
+    )
+
+# Renders the course detail page
+def render_course_detail(request, course_obj):
+    content_version = courses_cache.get_content_version(courses_cache.get_course_scope(course_obj.id))
     context = {
         "object": course_obj,  # Add the course object to the context
-        "lessons_queryset": lessons_queryset,  # Add the lessons to the context
+        # Cached lesson outline; a callable, so a fragment cache hit never loads it
+        "lessons_outline": partial(outline.get_course_outline, course_obj, content_version),
+        "email_access": get_email_access(request),  # Resolved once, used per lesson by the snippet
+        "content_version": content_version,
+        "fragment_cache_timeout": courses_cache.FRAGMENT_CACHE_TIMEOUT,
     }
-    # return JsonResponse({"data": course_obj.id, 'lesson_ids': [x.path for x in lessons_queryset] })
     return render(request, "courses/detail.html", context)
 
 # View for displaying lesson details
@@ -45,7 +137,7 @@ def lesson_detail_view(request, course_id=None, lesson_id=None, *args, **kwargs)
     Checks if email is required to access the lesson and redirects if necessary.
     Handles cases where the lesson is not published or has no video.
     """
-    print(course_id, lesson_id)
+    logger.debug("Lesson detail: course=%s lesson=%s", course_id, lesson_id)
     lesson_obj = services.get_lesson_detail(
         course_id=course_id,
         lesson_id=lesson_id
@@ -53,13 +145,24 @@ def lesson_detail_view(request, course_id=None, lesson_id=None, *args, **kwargs)
     if lesson_obj is None:
         raise Http404  # Raise a 404 error if the lesson does not exist
     
-    # Check if email access is required for the lesson
-    email_id_exists = request.session.get('email_id')
-    if lesson_obj.requires_email and not email_id_exists:
-        print(request.path)
-        request.session['next_url'] = request.path  # Store the current path for redirection
-        return render(request, "courses/email-required.html", {})  # Render the email-required template
-    
+    # Check if email access is required for the lesson (validated, cached in the session)
+    email_access = get_email_access(request)
+    if not email_access.has_access(lesson_obj):
+        logger.debug("Email required for %s", request.path)
+        # Render the email-required template, with the login form inline
+        response = render(request, "courses/email-required.html", get_login_form_context(True))
+        return set_next_url(response, request.path)  # Store the current path for redirection (no session write)
+
+    return conditional_response(
+        request,
+        latest(lesson_obj.updated, lesson_obj.course.updated),
+        [],
+        lambda: render_lesson_detail(request, lesson_obj),
+        get_access_state(email_access),
+    )
+
+# Renders the lesson page (video embed or coming soon)
+def render_lesson_detail(request, lesson_obj):
     # Default template for lessons that are coming soon
     template_name = "courses/lesson-coming-soon.html"
     context = {
@@ -81,3 +184,57 @@ def lesson_detail_view(request, course_id=None, lesson_id=None, *args, **kwargs)
         context['video_embed'] = video_embed_html  # Add the video embed HTML to the context
     
     return render(request, template_name, context)
+
+
+# Async counterparts of the views above, served when COURSES_ASYNC_VIEWS is on.
+# Queries run on the async ORM; the sync remainder (cache lookups, Cloudinary
+# URLs, template rendering) is offloaded once per request through the same
+# render_* helpers, instead of one thread hop per call.
+
+async def acourse_list_view(request):
+    validator = await services.aget_publish_courses_validator()
+    response = await aconditional_response(
+        request,
+        validator['updated'],
+        [validator['count'], bool(request.htmx)],
+        lambda: render_course_list(request),
+        await aget_session_state(request),
+    )
+    patch_vary_headers(response, ("HX-Request",))
+    return response
+
+async def acourse_detail_view(request, course_id=None, *args, **kwargs):
+    course_obj = await services.aget_course_detail(course_id=course_id)
+    if course_obj is None:
+        raise Http404
+    email_access = await aget_email_access(request)
+    return await aconditional_response(
+        request,
+        latest(course_obj.updated, course_obj.lessons_updated),
+        [course_obj.lessons_count],
+        lambda: render_course_detail(request, course_obj),
+        get_access_state(email_access),
+    )
+
+async def alesson_detail_view(request, course_id=None, lesson_id=None, *args, **kwargs):
+    lesson_obj = await services.aget_lesson_detail(
+        course_id=course_id,
+        lesson_id=lesson_id
+    )
+    if lesson_obj is None:
+        raise Http404
+
+    email_access = await aget_email_access(request)
+    if not email_access.has_access(lesson_obj):
+        response = await sync_to_async(render)(
+            request, "courses/email-required.html", get_login_form_context(True)
+        )
+        return set_next_url(response, request.path)
+
+    return await aconditional_response(
+        request,
+        latest(lesson_obj.updated, lesson_obj.course.updated),
+        [],
+        lambda: render_lesson_detail(request, lesson_obj),
+        get_access_state(email_access),
+    )
@@ -0,0 +1,136 @@
+import time
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Email
+
+# Signed cookie carrying the page to return to after verification
+NEXT_URL_COOKIE = "next_url"
+NEXT_URL_SALT = "emails.next_url"
+NEXT_URL_MAX_AGE = 60 * 60 * 24
+
+# Session key holding the last validation of the session's email
+SESSION_KEY = "email_access"
+# Seconds before the session's email is checked against the database again
+ACCESS_CACHE_TTL = getattr(settings, "EMAIL_ACCESS_CACHE_TTL", 5 * 60)
+
+# Result of resolving the session's email, shared by every gate in a request
+class EmailAccess:
+    __slots__ = ("email_id", "active", "verified_at")
+
+    def __init__(self, email_id=None, active=False, verified_at=None):
+        self.email_id = email_id
+        self.active = active
+        self.verified_at = verified_at
+
+    @property
+    def is_verified(self):
+        return bool(self.email_id and self.active)
+
+    def has_access(self, obj):
+        """
+        `obj` is a course or a lesson; only email-gated content needs
+        a verified, active email. No queries.
+        """
+        return not obj.requires_email or self.is_verified
+
+    def as_session_data(self, checked_at):
+        return {
+            "id": self.email_id,
+            "active": self.active,
+            "verified_at": self.verified_at,
+            "checked_at": checked_at,
+        }
+
+ANONYMOUS = EmailAccess()
+
+def _from_cache(email_id, data):
+    if not data or data.get("id") != email_id:
+        return None
+    if time.time() - data.get("checked_at", 0) > ACCESS_CACHE_TTL:
+        return None
+    return EmailAccess(email_id, data["active"], data.get("verified_at"))
+
+def _revalidated(email_id, active, data):
+    verified_at = data.get("verified_at") if data and data.get("id") == email_id else None
+    return EmailAccess(email_id, bool(active), verified_at)
+
+# Validates the session's email at most once per ACCESS_CACHE_TTL
+def get_email_access(request):
+    """
+    Returns the request's EmailAccess. The session's `email_id` is checked
+    against `Email.active` and the outcome cached in the session; an unknown
+    or deactivated email is dropped from the session.
+    """
+    access = getattr(request, "_email_access", None)
+    if access is not None:
+        return access
+    email_id = request.session.get('email_id')
+    if not email_id:
+        access = ANONYMOUS
+    else:
+        data = request.session.get(SESSION_KEY)
+        access = _from_cache(email_id, data)
+        if access is None:
+            active = Email.objects.filter(id=email_id).values_list("active", flat=True).first()
+            access = _revalidated(email_id, active, data)
+            if access.active:
+                request.session[SESSION_KEY] = access.as_session_data(time.time())
+            else:
+                forget_email_access(request)
+                access = ANONYMOUS
+    request._email_access = access
+    return access
+
+async def aget_email_access(request):
+    access = getattr(request, "_email_access", None)
+    if access is not None:
+        return access
+    email_id = await request.session.aget('email_id')
+    if not email_id:
+        access = ANONYMOUS
+    else:
+        data = await request.session.aget(SESSION_KEY)
+        access = _from_cache(email_id, data)
+        if access is None:
+            active = await Email.objects.filter(id=email_id).values_list("active", flat=True).afirst()
+            access = _revalidated(email_id, active, data)
+            if access.active:
+                await request.session.aset(SESSION_KEY, access.as_session_data(time.time()))
+            else:
+                await request.session.apop('email_id', None)
+                await request.session.apop(SESSION_KEY, None)
+                access = ANONYMOUS
+    request._email_access = access
+    return access
+
+# Logs the verified email into the session with a fresh access cache
+def remember_email_access(request, email_obj):
+    access = EmailAccess(f"{email_obj.id}", email_obj.active, timezone.now().isoformat())
+    request.session['email_id'] = access.email_id
+    request.session[SESSION_KEY] = access.as_session_data(time.time())
+    request._email_access = access
+    return access
+
+def forget_email_access(request):
+    request.session.pop('email_id', None)
+    request.session.pop(SESSION_KEY, None)
+    request._email_access = ANONYMOUS
+
+# Remembers `path` for after verification without touching the session
+def set_next_url(response, path):
+    response.set_signed_cookie(
+        NEXT_URL_COOKIE,
+        path,
+        salt=NEXT_URL_SALT,
+        max_age=NEXT_URL_MAX_AGE,
+        httponly=True,
+        samesite="Lax",
+    )
+    return response
+
+def get_next_url(request, default="/"):
+    next_url = request.get_signed_cookie(NEXT_URL_COOKIE, default=None, salt=NEXT_URL_SALT)
+    if not next_url or not next_url.startswith("/") or next_url.startswith("//"):
+        return default
+    return next_url
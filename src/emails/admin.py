@@ -1,6 +1,7 @@
 from django.contrib import admin
-from .models import Email, EmailVerificationEvent
+from .models import Email, EmailVerificationEvent, OutgoingEmail
 
 # Register your models here.
 admin.site.register(Email)
 admin.site.register(EmailVerificationEvent)
+admin.site.register(OutgoingEmail)
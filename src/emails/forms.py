@@ -20,4 +20,13 @@ class EmailForm(forms.Form):
         verified = services.verify_email(email)
         if verified:
             raise forms.ValidationError("Invalid email.Please try again")
-        return email
\ No newline at end of file
+        return email
+
+# Context for emails/hx/form.html, so pages can render it inline instead of
+# loading it with a follow-up HTMX request
+def get_login_form_context(show_form, form=None):
+    return {
+        "form": form or EmailForm(),
+        "message": "",
+        "show_form": show_form,  # Logged-in visitors get the logout button instead
+    }
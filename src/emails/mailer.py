@@ -0,0 +1,129 @@
+import logging
+import queue
+import smtplib
+import time
+from dataclasses import dataclass, field
+from django.conf import settings
+from django.core.mail import get_connection
+
+logger = logging.getLogger(__name__)
+
+POOL_SIZE = getattr(settings, "EMAIL_POOL_SIZE", 4)
+BATCH_SIZE = getattr(settings, "EMAIL_BATCH_SIZE", 50)
+
+# Errors after which a pooled connection is discarded and reopened
+CONNECTION_ERRORS = (
+    smtplib.SMTPServerDisconnected,
+    smtplib.SMTPConnectError,
+    ConnectionError,
+    TimeoutError,
+)
+
+
+@dataclass
+class BatchResult:
+    sent: list = field(default_factory=list)
+    failed: list = field(default_factory=list)  # (message, error) pairs
+    elapsed: float = 0.0  # seconds
+    reconnects: int = 0
+
+
+class ConnectionPool:
+    """
+    Keeps up to `size` open email backend connections (SMTP sessions,
+    TLS handshake included) for reuse across batches and worker threads.
+    """
+
+    def __init__(self, size=POOL_SIZE, backend=None, **backend_kwargs):
+        self.size = size
+        self.backend = backend
+        self.backend_kwargs = backend_kwargs
+        self._idle = queue.LifoQueue(maxsize=size)
+
+    def new_connection(self):
+        connection = get_connection(self.backend, fail_silently=False, **self.backend_kwargs)
+        connection.open()
+        return connection
+
+    def acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return self.new_connection()
+
+    def release(self, connection):
+        try:
+            self._idle.put_nowait(connection)
+        except queue.Full:
+            self.discard(connection)
+
+    def discard(self, connection):
+        try:
+            connection.close()
+        except Exception:
+            pass
+
+    def close(self):
+        while True:
+            try:
+                connection = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self.discard(connection)
+
+    def send_batch(self, messages):
+        """
+        Sends `messages` over one pooled connection.
+        Each message goes through send_messages() so a failure can be pinned to it;
+        on a connection error the session is reopened once and the message retried.
+        """
+        result = BatchResult()
+        start = time.perf_counter()
+        connection = None
+        for index, message in enumerate(messages):
+            try:
+                if connection is None:
+                    connection = self.acquire()
+                try:
+                    connection.send_messages([message])
+                except CONNECTION_ERRORS:
+                    # Stale / dropped session: reconnect and retry this message once
+                    self.discard(connection)
+                    connection = None
+                    connection = self.new_connection()
+                    result.reconnects += 1
+                    connection.send_messages([message])
+            except CONNECTION_ERRORS as e:
+                # Server unreachable: fail the rest of the batch, it will be retried
+                if connection is not None:
+                    self.discard(connection)
+                    connection = None
+                result.failed += [(msg, e) for msg in messages[index:]]
+                break
+            except Exception as e:
+                result.failed.append((message, e))
+                continue
+            result.sent.append(message)
+        if connection is not None:
+            self.release(connection)
+        result.elapsed = time.perf_counter() - start
+        # Failures and reconnects are worth a line; the counts are in the outbox metrics
+        log_level = logging.WARNING if result.failed or result.reconnects else logging.DEBUG
+        logger.log(
+            log_level,
+            "email batch size=%d sent=%d failed=%d reconnects=%d latency_ms=%.1f",
+            len(messages), len(result.sent), len(result.failed),
+            result.reconnects, result.elapsed * 1000
+        )
+        return result
+
+
+# Process-wide pool used by the outbox worker
+default_pool = ConnectionPool()
+
+def send_batch(messages, pool=None):
+    return (pool or default_pool).send_batch(messages)
+
+# Splits a list into lists of at most `size` items
+def chunked(items, size=BATCH_SIZE):
+    return [items[i:i + size] for i in range(0, len(items), size)]
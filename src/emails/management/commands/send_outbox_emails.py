@@ -0,0 +1,55 @@
+import time
+from django.core.management.base import BaseCommand
+
+from emails import mailer, outbox
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox emails (verification emails) with retries and backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument("--workers", type=int, default=4, help="Sender threads.")
+        parser.add_argument(
+            "--send-batch-size",
+            type=int,
+            default=mailer.BATCH_SIZE,
+            help="Messages sent per pooled SMTP connection checkout.",
+        )
+        parser.add_argument("--max-attempts", type=int, default=outbox.MAX_ATTEMPTS)
+        parser.add_argument(
+            "--loop",
+            action="store_true",
+            help="Keep polling the outbox instead of exiting once it is drained.",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=2.0,
+            help="Seconds to sleep between polls when the outbox is empty (with --loop).",
+        )
+
+    def handle(self, *args, **options):
+        try:
+            self.run(**options)
+        finally:
+            mailer.default_pool.close()
+
+    def run(self, **options):
+        while True:
+            result = outbox.process_outbox(
+                batch_size=options["batch_size"],
+                max_workers=options["workers"],
+                max_attempts=options["max_attempts"],
+                send_batch_size=options["send_batch_size"],
+            )
+            if result["claimed"]:
+                latencies = ", ".join(f"{elapsed * 1000:.1f}" for elapsed in result["batch_latencies"])
+                self.stdout.write(
+                    f"claimed={result['claimed']} sent={result['sent']} failed={result['failed']} "
+                    f"batch_latency_ms=[{latencies}]"
+                )
+                continue
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
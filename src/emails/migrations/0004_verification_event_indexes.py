@@ -0,0 +1,27 @@
+# Generated by Django 5.1.15 on 2026-10-18 08:29
+
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('emails', '0003_outgoingemail'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='emailverificationevent',
+            name='token',
+            field=models.UUIDField(default=uuid.uuid1, unique=True),
+        ),
+        migrations.AddIndex(
+            model_name='emailverificationevent',
+            index=models.Index(fields=['parent', 'timestamp'], name='emails_event_parent_ts_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='emailverificationevent',
+            index=models.Index(condition=models.Q(('expired', False)), fields=['token'], name='emails_event_live_token_idx'),
+        ),
+    ]
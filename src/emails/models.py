@@ -1,6 +1,7 @@
 import uuid
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 # Create your models here.
 class Email(models.Model):
@@ -12,7 +13,7 @@ class EmailVerificationEvent(models.Model):
     parent = models.ForeignKey(Email, on_delete=models.SET_NULL, null=True)
     email = models.EmailField()
     # token
-    token = models.UUIDField(default=uuid.uuid1)
+    token = models.UUIDField(default=uuid.uuid1, unique=True)
     attempts = models.IntegerField(default=0)
     last_attempt_at = models.DateTimeField(
         auto_now=False,
@@ -29,5 +30,48 @@ class EmailVerificationEvent(models.Model):
     )
     timestamp = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # Latest events per email
+            models.Index(fields=["parent", "timestamp"], name="emails_event_parent_ts_idx"),
+            # Small index over the tokens verify_token can still accept
+            models.Index(
+                fields=["token"],
+                condition=models.Q(expired=False),
+                name="emails_event_live_token_idx",
+            ),
+        ]
+
     def get_link(self):
         return f"{settings.BASE_URL}/verify/{self.token}/"
+
+
+class OutgoingEmailStatus(models.TextChoices):
+    PENDING = "pending", "Pending"
+    SENDING = "sending", "Sending"
+    SENT = "sent", "Sent"
+    FAILED = "failed", "Failed"
+
+# Outbox row; delivered by the `send_outbox_emails` worker command
+class OutgoingEmail(models.Model):
+    event = models.ForeignKey(EmailVerificationEvent, on_delete=models.CASCADE, null=True, blank=True)
+    to_email = models.EmailField()
+    subject = models.CharField(max_length=255)
+    text_body = models.TextField()
+    html_body = models.TextField(blank=True)
+    status = models.CharField(
+        max_length=10,
+        choices=OutgoingEmailStatus.choices,
+        default=OutgoingEmailStatus.PENDING,
+    )
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    claimed_at = models.DateTimeField(blank=True, null=True)
+    sent_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    timestamp = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"]),
+        ]
@@ -0,0 +1,144 @@
+import helpers
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives
+from django.db import close_old_connections
+from django.utils import timezone
+
+from . import mailer
+from .models import OutgoingEmail, OutgoingEmailStatus
+
+EMAIL_HOST_USER = settings.EMAIL_HOST_USER
+MAX_ATTEMPTS = getattr(settings, "EMAIL_OUTBOX_MAX_ATTEMPTS", 5)
+RETRY_BACKOFF = getattr(settings, "EMAIL_OUTBOX_RETRY_BACKOFF", 30)  # seconds, doubled per attempt
+MAX_RETRY_BACKOFF = getattr(settings, "EMAIL_OUTBOX_MAX_RETRY_BACKOFF", 60 * 60)
+# Rows left in "sending" longer than this (crashed worker) are picked up again
+CLAIM_TIMEOUT = getattr(settings, "EMAIL_OUTBOX_CLAIM_TIMEOUT", 5 * 60)
+
+# Delivery attempts: sent, retry (will be tried again) or failed (given up)
+DELIVERY_OUTCOMES = helpers.metrics_counter(
+    "emails_outbox_deliveries_total", "Verification email delivery attempts by outcome.", ("outcome",)
+)
+
+# Seconds to wait before retrying after the given number of failed attempts
+def get_retry_delay(attempts):
+    return min(RETRY_BACKOFF * 2 ** max(attempts - 1, 0), MAX_RETRY_BACKOFF)
+
+def release_stale_claims(now=None):
+    now = now or timezone.now()
+    return OutgoingEmail.objects.filter(
+        status=OutgoingEmailStatus.SENDING,
+        claimed_at__lt=now - timedelta(seconds=CLAIM_TIMEOUT)
+    ).update(status=OutgoingEmailStatus.PENDING, claimed_at=None)
+
+# Claims up to `limit` due rows with one conditional UPDATE
+def claim_batch(limit=100, now=None):
+    """
+    Only rows still pending are claimed, so concurrent workers never
+    share a row. Rows another worker won carry its own `claimed_at`:
+    reading back status=sending, claimed_at=now returns exactly ours.
+    """
+    now = now or timezone.now()
+    due_ids = list(OutgoingEmail.objects.filter(
+        status=OutgoingEmailStatus.PENDING,
+        next_attempt_at__lte=now
+    ).order_by("next_attempt_at", "id").values_list("id", flat=True)[:limit])
+    if not due_ids:
+        return []
+    OutgoingEmail.objects.filter(
+        id__in=due_ids,
+        status=OutgoingEmailStatus.PENDING
+    ).update(status=OutgoingEmailStatus.SENDING, claimed_at=now)
+    return list(OutgoingEmail.objects.filter(
+        id__in=due_ids,
+        status=OutgoingEmailStatus.SENDING,
+        claimed_at=now
+    ).order_by("id"))
+
+def build_message(msg):
+    message = EmailMultiAlternatives(
+        msg.subject,
+        msg.text_body,
+        EMAIL_HOST_USER,
+        [msg.to_email],
+    )
+    if msg.html_body:
+        message.attach_alternative(msg.html_body, "text/html")
+    return message
+
+def mark_sent(msg):
+    msg.status = OutgoingEmailStatus.SENT
+    msg.attempts += 1
+    msg.sent_at = timezone.now()
+    msg.last_error = ""
+    msg.save(update_fields=["status", "attempts", "sent_at", "last_error"])
+    DELIVERY_OUTCOMES.inc("sent")
+
+# Schedules a retry with exponential backoff, or gives up after MAX_ATTEMPTS
+def mark_failed(msg, error, max_attempts=MAX_ATTEMPTS):
+    msg.attempts += 1
+    msg.last_error = str(error)
+    msg.claimed_at = None
+    if msg.attempts >= max_attempts:
+        msg.status = OutgoingEmailStatus.FAILED
+    else:
+        msg.status = OutgoingEmailStatus.PENDING
+        msg.next_attempt_at = timezone.now() + timedelta(seconds=get_retry_delay(msg.attempts))
+    msg.save(update_fields=["status", "attempts", "last_error", "claimed_at", "next_attempt_at"])
+    DELIVERY_OUTCOMES.inc("failed" if msg.status == OutgoingEmailStatus.FAILED else "retry")
+
+def deliver_batch(msgs, max_attempts=MAX_ATTEMPTS, pool=None):
+    """
+    Sends outbox rows over one pooled connection and records each outcome.
+    Returns (sent_count, failed_count, batch_latency_seconds).
+    """
+    messages = []
+    failed = 0
+    for msg in msgs:
+        try:
+            message = build_message(msg)
+        except Exception as e:
+            mark_failed(msg, e, max_attempts=max_attempts)
+            failed += 1
+            continue
+        message.outbox_row = msg
+        messages.append(message)
+    result = mailer.send_batch(messages, pool=pool)
+    for message in result.sent:
+        mark_sent(message.outbox_row)
+    for message, error in result.failed:
+        mark_failed(message.outbox_row, error, max_attempts=max_attempts)
+    return len(result.sent), failed + len(result.failed), result.elapsed
+
+def _deliver_in_thread(msgs, max_attempts, pool):
+    try:
+        return deliver_batch(msgs, max_attempts=max_attempts, pool=pool)
+    finally:
+        # Worker threads own their DB connections
+        close_old_connections()
+
+def process_outbox(batch_size=100, max_workers=4, max_attempts=MAX_ATTEMPTS,
+                   send_batch_size=mailer.BATCH_SIZE, pool=None):
+    """
+    Delivers one batch of due outbox rows on a thread pool.
+    The rows are split into send batches of `send_batch_size`, each sent over
+    a pooled connection. Returns claimed / sent / failed counts and the
+    latency (seconds) of every send batch.
+    """
+    release_stale_claims()
+    batch = claim_batch(limit=batch_size)
+    if not batch:
+        return {"claimed": 0, "sent": 0, "failed": 0, "batch_latencies": []}
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        results = list(executor.map(
+            lambda msgs: _deliver_in_thread(msgs, max_attempts, pool),
+            mailer.chunked(batch, send_batch_size)
+        ))
+    helpers.flush_metrics_if_due()  # the worker's counts reach /metrics in multi-process mode
+    return {
+        "claimed": len(batch),
+        "sent": sum(sent for sent, _, _ in results),
+        "failed": sum(failed for _, failed, _ in results),
+        "batch_latencies": [elapsed for _, _, elapsed in results],
+    }
@@ -1,9 +1,14 @@
-from django.conf import settings
-from django.core.mail import send_mail
+import helpers
+from django.db.models import Case, F, Q, Value, When
 from django.utils import timezone
-from .models import Email, EmailVerificationEvent
+from .models import Email, EmailVerificationEvent, OutgoingEmail
 
-EMAIL_HOST_USER = settings.EMAIL_HOST_USER
+VERIFICATION_SUBJECT = "Verify your email"
+
+# verify_token() results: verified, invalid, exhausted (too many uses), expired
+VERIFY_TOKEN_OUTCOMES = helpers.metrics_counter(
+    "emails_verify_token_total", "Email verification token checks by outcome.", ("outcome",)
+)
 
 def verify_email(email):
     qs = Email.objects.filter(email=email, active=False)
@@ -18,70 +23,58 @@ def get_verification_email_msg(verification_instance, as_html=False):
     return f"Verify your email with the following:\n{verify_link}"
 
 def start_verification_event(email):
+    """
+    Records the verification event and queues its email in the outbox.
+    Delivery happens in the `send_outbox_emails` worker, not in the request.
+    """
     email_obj, created = Email.objects.get_or_create(email=email)
     obj = EmailVerificationEvent.objects.create(
         parent=email_obj,
         email=email
     )
-    sent = send_verification_email(obj.id)
-    return obj, sent
+    queued = enqueue_verification_email(obj)
+    return obj, queued
 
-def send_verification_email(verify_obj_id):
-    verify_obj = EmailVerificationEvent.objects.get(id=verify_obj_id)
-    email = verify_obj.email
-    subject = "Verify your email"
-    text_msg = get_verification_email_msg(verify_obj, as_html=False)
-    text_html = get_verification_email_msg(verify_obj, as_html=True)
-    from_user_email_addr = EMAIL_HOST_USER
-    to_user_email = email
-    # Send a verification email
-    return send_mail(
-        subject,
-        text_msg,
-        from_user_email_addr,
-        [to_user_email],
-        fail_silently=False,
-        html_message=text_html
+def enqueue_verification_email(verify_obj):
+    return OutgoingEmail.objects.create(
+        event=verify_obj,
+        to_email=verify_obj.email,
+        subject=VERIFICATION_SUBJECT,
+        text_body=get_verification_email_msg(verify_obj, as_html=False),
+        html_body=get_verification_email_msg(verify_obj, as_html=True),
     )
 
 def verify_token(token, max_attempts=5):
-    qs = EmailVerificationEvent.objects.filter(token=token)
-    if not qs.exists() and not qs.count() == 1:
-        return False, "Invalid token", None
     """
-    Has token
+    Two queries. A conditional UPDATE checks the token and records the
+    attempt, so concurrent clicks can never use a token more than
+    `max_attempts` times. Then one fetch of the event with its Email
+    returns the verified address, or tells why the token was refused.
+    The token expires on its last allowed use. A single locked fetch is
+    not an option: SQLite ignores select_for_update(), and the ORM has
+    no UPDATE ... RETURNING.
     """
-    has_email_expired = qs.filter(expired=True)
-    if has_email_expired.exists():
-        """
-        Token expired
-        """
+    now = timezone.now()
+    last_attempt = Q(attempts__gte=max_attempts - 1)
+    claimed = EmailVerificationEvent.objects.filter(
+        token=token,
+        expired=False,
+        attempts__lt=max_attempts
+    ).update(
+        attempts=F('attempts') + 1,
+        last_attempt_at=now,
+        expired=Case(When(last_attempt, then=Value(True)), default=Value(False)),
+        expired_at=Case(When(last_attempt, then=Value(now)), default=F('expired_at')),
+    )
+    obj = EmailVerificationEvent.objects.select_related('parent').filter(token=token).first()
+    if obj is None:
+        VERIFY_TOKEN_OUTCOMES.inc("invalid")
+        return False, "Invalid token", None
+    if not claimed:
+        if obj.attempts >= max_attempts:
+            VERIFY_TOKEN_OUTCOMES.inc("exhausted")
+            return False, "Token expired, used too many times", None
+        VERIFY_TOKEN_OUTCOMES.inc("expired")
         return False, "Token expired, try again.", None
-    """
-    Has token, not expired
-    """
-    max_attempts_reached = qs.filter(attempts__gte=max_attempts)
-    if max_attempts_reached.exists():
-        """
-        update max attempts + 1
-        """
-        # max_attempts_reached.update()
-        return False, "Token expired, used too many times", None
-    """
-    Token valid
-    """
-    """
-    update attempts, expire token if attempts > max
-    """
-    obj = qs.first()
-    obj.attempts += 1
-    obj.last_attempt_at = timezone.now()
-    if obj.attempts > max_attempts:
-        """
-        invalidation process
-        """
-        obj.expired = True
-        obj.expired_at = timezone.now()
-    obj.save()
-    email_obj = obj.parent
-    return True, "Welcome", email_obj
\ No newline at end of file
+    VERIFY_TOKEN_OUTCOMES.inc("verified")
+    return True, "Welcome", obj.parent
@@ -1,3 +1,272 @@
-from django.test import TestCase
+import smtplib
+import socket
+import threading
+import unittest
+import uuid
+from datetime import timedelta
+from unittest import mock
+from django.core import mail
+from django.core.mail import EmailMessage
+from django.core.mail.backends.locmem import EmailBackend as LocMemBackend
+from django.db import connection
+from django.db.models import QuerySet
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
+from django.utils import timezone
 
-# Create your tests here.
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:  # optional, only needed for the SMTP round-trip test
+    Controller = None
+
+from . import mailer, outbox, services
+from .models import Email, EmailVerificationEvent, OutgoingEmail, OutgoingEmailStatus
+
+
+class VerifyTokenTests(TestCase):
+
+    def setUp(self):
+        self.email = Email.objects.create(email="reader@example.com")
+        self.event = EmailVerificationEvent.objects.create(
+            parent=self.email,
+            email=self.email.email
+        )
+
+    def test_valid_token(self):
+        # The conditional UPDATE, then the event joined with its Email
+        with self.assertNumQueries(2):
+            did_verify, msg, email_obj = services.verify_token(self.event.token)
+        self.assertTrue(did_verify)
+        self.assertEqual(email_obj, self.email)
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attempts, 1)
+        self.assertIsNotNone(self.event.last_attempt_at)
+        self.assertFalse(self.event.expired)
+
+    def test_invalid_token(self):
+        self.assertEqual(
+            services.verify_token(uuid.uuid4()),
+            (False, "Invalid token", None)
+        )
+
+    def test_expired_token(self):
+        self.event.expired = True
+        self.event.save()
+        self.assertEqual(
+            services.verify_token(self.event.token),
+            (False, "Token expired, try again.", None)
+        )
+
+    def test_token_expires_on_last_attempt(self):
+        for _ in range(3):
+            self.assertTrue(services.verify_token(self.event.token, max_attempts=3)[0])
+        self.event.refresh_from_db()
+        self.assertTrue(self.event.expired)
+        self.assertIsNotNone(self.event.expired_at)
+        self.assertEqual(
+            services.verify_token(self.event.token, max_attempts=3),
+            (False, "Token expired, used too many times", None)
+        )
+        self.event.refresh_from_db()
+        self.assertEqual(self.event.attempts, 3)
+
+
+class ConcurrentVerifyTokenTests(TransactionTestCase):
+
+    def test_parallel_verifications_respect_max_attempts(self):
+        email = Email.objects.create(email="race@example.com")
+        event = EmailVerificationEvent.objects.create(parent=email, email=email.email)
+        max_attempts = 5
+        threads_count = 20
+        barrier = threading.Barrier(threads_count)
+        results = []
+
+        def verify():
+            try:
+                barrier.wait()
+                results.append(services.verify_token(event.token, max_attempts=max_attempts)[0])
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=verify) for _ in range(threads_count)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(results), threads_count)
+        self.assertEqual(results.count(True), max_attempts)
+        event.refresh_from_db()
+        self.assertEqual(event.attempts, max_attempts)
+        self.assertTrue(event.expired)
+
+
+class OutboxTests(TransactionTestCase):
+    # Delivery runs on worker threads with their own DB connections
+
+    def test_start_verification_event_only_queues(self):
+        obj, queued = services.start_verification_event("queued@example.com")
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(queued.event, obj)
+        self.assertEqual(queued.status, OutgoingEmailStatus.PENDING)
+        self.assertIn(obj.get_link(), queued.text_body)
+
+    def test_process_outbox_sends_queued_emails(self):
+        for i in range(3):
+            services.start_verification_event(f"reader{i}@example.com")
+        result = outbox.process_outbox(batch_size=10, max_workers=2, send_batch_size=2)
+        self.assertEqual(
+            (result["claimed"], result["sent"], result["failed"]),
+            (3, 3, 0)
+        )
+        self.assertEqual(len(result["batch_latencies"]), 2)
+        self.assertEqual(len(mail.outbox), 3)
+        self.assertEqual(mail.outbox[0].subject, services.VERIFICATION_SUBJECT)
+        self.assertEqual(
+            OutgoingEmail.objects.filter(status=OutgoingEmailStatus.SENT).count(),
+            3
+        )
+        # Nothing left to do
+        self.assertEqual(outbox.process_outbox()["claimed"], 0)
+
+    def test_claim_batch_in_three_queries(self):
+        msgs = [services.start_verification_event(f"claim{i}@example.com")[1] for i in range(5)]
+        # due ids, one conditional UPDATE, the claimed rows
+        with self.assertNumQueries(3):
+            claimed = outbox.claim_batch(limit=10)
+        self.assertEqual([msg.id for msg in claimed], [msg.id for msg in msgs])
+        self.assertTrue(all(msg.status == OutgoingEmailStatus.SENDING for msg in claimed))
+        self.assertEqual(outbox.claim_batch(limit=10), [])
+
+    def test_claim_batch_skips_rows_another_worker_won(self):
+        msgs = [services.start_verification_event(f"race{i}@example.com")[1] for i in range(3)]
+        taken = msgs[1]
+        update = QuerySet.update
+
+        def race(queryset, **kwargs):
+            # Another worker claims a row between our select and our update
+            update(
+                OutgoingEmail.objects.filter(id=taken.id),
+                status=OutgoingEmailStatus.SENDING,
+                claimed_at=timezone.now() - timedelta(seconds=1),
+            )
+            return update(queryset, **kwargs)
+
+        with mock.patch.object(QuerySet, "update", autospec=True, side_effect=race):
+            claimed = outbox.claim_batch(limit=10)
+        self.assertEqual([msg.id for msg in claimed], [msgs[0].id, msgs[2].id])
+
+    def test_failed_delivery_is_retried_with_backoff(self):
+        obj, queued = services.start_verification_event("retry@example.com")
+        with mock.patch.object(outbox, "build_message", side_effect=OSError("smtp down")):
+            result = outbox.process_outbox(max_workers=1, max_attempts=2)
+        self.assertEqual(result["failed"], 1)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, OutgoingEmailStatus.PENDING)
+        self.assertEqual(queued.attempts, 1)
+        self.assertEqual(queued.last_error, "smtp down")
+        self.assertGreater(queued.next_attempt_at, timezone.now())
+        # Not due yet
+        self.assertEqual(outbox.process_outbox()["claimed"], 0)
+
+        OutgoingEmail.objects.filter(id=queued.id).update(next_attempt_at=timezone.now())
+        with mock.patch.object(outbox, "build_message", side_effect=OSError("smtp down")):
+            outbox.process_outbox(max_workers=1, max_attempts=2)
+        queued.refresh_from_db()
+        self.assertEqual(queued.status, OutgoingEmailStatus.FAILED)
+        self.assertEqual(len(mail.outbox), 0)
+
+
+class FlakyBackend(LocMemBackend):
+    """
+    Locmem backend whose connections drop after `budget` messages,
+    like an SMTP server closing an idle or long-lived session.
+    """
+    budget = 2
+    opened = 0
+
+    def open(self):
+        FlakyBackend.opened += 1
+        self.remaining = self.budget
+        return True
+
+    def send_messages(self, messages):
+        if self.remaining <= 0:
+            raise smtplib.SMTPServerDisconnected("Connection unexpectedly closed")
+        self.remaining -= len(messages)
+        return super().send_messages(messages)
+
+
+class ConnectionPoolTests(SimpleTestCase):
+
+    def make_messages(self, count):
+        return [
+            EmailMessage("Subject", "Body", "from@example.com", [f"to{i}@example.com"])
+            for i in range(count)
+        ]
+
+    def test_connection_is_reused_across_batches(self):
+        pool = mailer.ConnectionPool(size=1)
+        with mock.patch.object(pool, "new_connection", wraps=pool.new_connection) as new_connection:
+            first = pool.send_batch(self.make_messages(3))
+            second = pool.send_batch(self.make_messages(3))
+        self.assertEqual(new_connection.call_count, 1)
+        self.assertEqual(len(first.sent) + len(second.sent), 6)
+        self.assertEqual(len(mail.outbox), 6)
+        self.assertGreaterEqual(first.elapsed, 0)
+
+    def test_reconnects_when_connection_drops(self):
+        FlakyBackend.opened = 0
+        pool = mailer.ConnectionPool(size=1, backend="emails.tests.FlakyBackend")
+        with self.assertLogs("emails.mailer", "WARNING") as logs:
+            result = pool.send_batch(self.make_messages(5))
+        self.assertIn("reconnects=2", logs.output[0])
+        self.assertEqual(len(result.sent), 5)
+        self.assertEqual(result.failed, [])
+        self.assertEqual(result.reconnects, 2)
+        self.assertEqual(FlakyBackend.opened, 3)
+
+    def test_unreachable_server_fails_the_rest_of_the_batch(self):
+        pool = mailer.ConnectionPool(size=1)
+        with mock.patch.object(pool, "new_connection", side_effect=ConnectionRefusedError("refused")):
+            with self.assertLogs("emails.mailer", "WARNING"):
+                result = pool.send_batch(self.make_messages(3))
+        self.assertEqual(result.sent, [])
+        self.assertEqual(len(result.failed), 3)
+
+
+@unittest.skipIf(Controller is None, "aiosmtpd is not installed")
+class SMTPRoundTripTests(SimpleTestCase):
+
+    def setUp(self):
+        self.received = []
+
+        class Handler:
+            async def handle_DATA(handler, server, session, envelope):
+                self.received.append(envelope)
+                return "250 OK"
+
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.controller = Controller(Handler(), hostname="127.0.0.1", port=self.port)
+        self.controller.start()
+        self.addCleanup(self.controller.stop)
+
+    def test_batch_over_one_smtp_session(self):
+        pool = mailer.ConnectionPool(
+            size=1,
+            backend="django.core.mail.backends.smtp.EmailBackend",
+            host="127.0.0.1",
+            port=self.port,
+            use_tls=False,
+            username="",
+            password="",
+        )
+        self.addCleanup(pool.close)
+        messages = [
+            EmailMessage("Subject", "Body", "from@example.com", [f"to{i}@example.com"])
+            for i in range(5)
+        ]
+        result = pool.send_batch(messages)
+        self.assertEqual(len(result.sent), 5)
+        self.assertEqual(len(self.received), 5)
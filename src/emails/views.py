@@ -1,11 +1,14 @@
+import logging
 from django.conf import settings
 from django.contrib import messages
 from django.http import HttpResponse
 from django.shortcuts import render, redirect
 from django_htmx.http import HttpResponseClientRedirect
 
-from . import services
-from .forms import EmailForm
+from . import access, services
+from .forms import EmailForm, get_login_form_context
+
+logger = logging.getLogger(__name__)
 
 # Global email address used for verification
 EMAIL_ADDRESS = settings.EMAIL_ADDRESS
@@ -20,10 +23,7 @@ def logout_btn_hx_view(request):
         return redirect('/')  # Redirect to home for non-HTMX requests
 
     if request.method == "POST":  # Check if the request is a POST request
-        try:
-            del request.session['email_id']  # Attempt to delete 'email_id' from session
-        except:
-            pass  # Silently handle errors if 'email_id' is not in session
+        access.forget_email_access(request)  # Drop 'email_id' and its cached access check
 
         # If 'email_id' is no longer in session, redirect to the home page
         email_id_in_session = request.session.get('email_id')
@@ -45,11 +45,7 @@ def email_token_login_view(request):
     email_id_in_session = request.session.get('email_id')  # Check if user is already logged in
     template_name = "emails/hx/form.html"  # Template for rendering the form
     form = EmailForm(request.POST or None)  # Instantiate the email form with POST data
-    context = {
-        "form": form,
-        "message": "",
-        "show_form": not email_id_in_session,  # Show form only if user is not logged in
-    }
+    context = get_login_form_context(not email_id_in_session, form)
 
     if form.is_valid():  # Check if the form submission is valid
         email_val = form.cleaned_data.get('email')  # Extract the email address
@@ -59,7 +55,7 @@ def email_token_login_view(request):
         # return HttpResponseClientRedirect('/check-your-email')
         return render(request, template_name, context)  # Render the form with a success message
     else:
-        print(form.errors)
+        logger.debug("Login form errors: %s", form.errors.as_data())
 
     return render(request, template_name, context)
 
@@ -71,19 +67,15 @@ def verify_email_token_view(request, token, *args, **kwargs):
     """
     did_verify, msg, email_obj = services.verify_token(token)  # Verify the token
     if not did_verify:  # Handle failed verification
-        try:
-            del request.session['email_id']  # Remove 'email_id' from session if present
-        except:
-            pass  # Silently handle errors
+        access.forget_email_access(request)  # Remove 'email_id' from session if present
         messages.error(request, msg)  # Display an error message
         return redirect("/login/")  # Redirect to the login page
 
     # If verification is successful
     messages.success(request, msg)  # Display a success message
-    request.session['email_id'] = f"{email_obj.id}"  # Store the user's email ID in the session
+    access.remember_email_access(request, email_obj)  # Store the email ID (already validated) in the session
 
-    # Redirect to the next URL or home page if 'next_url' is not defined
-    next_url = request.session.get('next_url') or "/"
-    if not next_url.startswith("/"):  # Ensure the next URL is a valid path
-        next_url = "/"
-    return redirect(next_url)  # Redirect to the next page
+    # Redirect to the next URL (signed cookie, local paths only) or the home page
+    response = redirect(access.get_next_url(request))
+    response.delete_cookie(access.NEXT_URL_COOKIE, samesite="Lax")
+    return response
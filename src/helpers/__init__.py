@@ -1,11 +1,47 @@
 from ._cloudinary import (
     cloudinary_init,
+    get_cloudinary_cache_stats,
     get_cloudinary_image_object,
-    get_cloudinary_video_object
+    get_cloudinary_video_object,
+    get_stored_cloudinary_public_ids,
+    invalidate_cloudinary_object,
+)
+from ._metrics import (
+    MultiProcessStore,
+    flush_metrics_if_due,
+    metrics_counter,
+    metrics_histogram,
+    record_request_metrics,
+    render_metrics,
+)
+from ._perf import (
+    PerformanceMiddleware,
+    QueuedStreamHandler,
+    SampleFilter,
+    TimedDjangoTemplates,
+    get_request_metrics,
+    perf_count,
+    perf_timed,
 )
 
 __all__ = [
+    "MultiProcessStore",
+    "PerformanceMiddleware",
+    "QueuedStreamHandler",
+    "SampleFilter",
+    "TimedDjangoTemplates",
     "cloudinary_init",
+    "flush_metrics_if_due",
+    "get_cloudinary_cache_stats",
     "get_cloudinary_image_object",
     "get_cloudinary_video_object",
+    "get_request_metrics",
+    "get_stored_cloudinary_public_ids",
+    "invalidate_cloudinary_object",
+    "metrics_counter",
+    "metrics_histogram",
+    "perf_count",
+    "perf_timed",
+    "record_request_metrics",
+    "render_metrics",
 ]
\ No newline at end of file
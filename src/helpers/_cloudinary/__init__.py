@@ -1,7 +1,16 @@
+from .cache import (
+    get_cloudinary_cache_stats,
+    get_stored_cloudinary_public_ids,
+    invalidate_cloudinary_object,
+)
 from .config import cloudinary_init
 from .services import get_cloudinary_image_object, get_cloudinary_video_object
 
 __all__ = [
-    "cloudinary_init",                                                                                "get_cloudinary_image_object",
+    "cloudinary_init",
+    "get_cloudinary_cache_stats",
+    "get_cloudinary_image_object",
     "get_cloudinary_video_object",
+    "get_stored_cloudinary_public_ids",
+    "invalidate_cloudinary_object",
 ]
\ No newline at end of file
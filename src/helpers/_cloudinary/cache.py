@@ -0,0 +1,160 @@
+import threading
+import time
+from collections import OrderedDict
+from cloudinary.models import CloudinaryField
+from django.conf import settings
+
+# Default number of built URLs kept per process
+DEFAULT_MAXSIZE = getattr(settings, "CLOUDINARY_URL_CACHE_SIZE", 2048)
+
+# How long a signed delivery URL is treated as valid, and how long we keep one.
+# Cached signed URLs / embeds are dropped well before the validity window closes.
+SIGNED_URL_VALIDITY = getattr(settings, "CLOUDINARY_SIGNED_URL_VALIDITY", 3600)
+SIGNED_URL_CACHE_TTL = getattr(
+    settings,
+    "CLOUDINARY_SIGNED_URL_CACHE_TTL",
+    max(1, SIGNED_URL_VALIDITY // 4)
+)
+
+
+class LRUCache:
+    """
+    Small thread-safe, bounded LRU cache with hit/miss counters.
+    Used to memoize Cloudinary URL builds within a single process.
+    When `ttl` (seconds) is set, entries also expire after that long.
+    """
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                expires_at, value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        expires_at = None
+        if self.ttl is not None:
+            expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def discard(self, match):
+        # Remove every entry whose key satisfies the given predicate
+        with self._lock:
+            stale = [key for key in self._data if match(key)]
+            for key in stale:
+                del self._data[key]
+            return len(stale)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "ttl": self.ttl,
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+
+# Process-local cache of built image URLs / HTML
+image_url_cache = LRUCache()
+
+# Process-local cache of signed video URLs / rendered embeds
+video_url_cache = LRUCache(ttl=SIGNED_URL_CACHE_TTL)
+
+
+def get_resource_key(resource):
+    # (public_id, version) identifies one uploaded asset revision
+    return (
+        getattr(resource, "public_id", None),
+        getattr(resource, "version", None),
+    )
+
+
+def get_cloudinary_field_names(instance):
+    return [
+        field.name for field in instance._meta.fields
+        if isinstance(field, CloudinaryField)
+    ]
+
+
+def _get_public_id(instance, field_name, value):
+    if isinstance(value, str) and value:
+        # Raw "type/upload/vN/id.ext" values: assigned in code or read with values()
+        value = instance._meta.get_field(field_name).to_python(value)
+    return getattr(value, "public_id", None)
+
+
+def get_cloudinary_public_ids(instance, field_names=None):
+    # public_ids of the assets set on the instance's Cloudinary fields
+    public_ids = {
+        _get_public_id(instance, field_name, getattr(instance, field_name, None))
+        for field_name in field_names or get_cloudinary_field_names(instance)
+    }
+    public_ids.discard(None)
+    return public_ids
+
+
+def get_stored_cloudinary_public_ids(instance, field_names=None):
+    # Same, as stored in the database: read before a save replaces them
+    if instance.pk is None:
+        return set()
+    field_names = field_names or get_cloudinary_field_names(instance)
+    stored = instance.__class__._base_manager.filter(pk=instance.pk).values(*field_names).first() or {}
+    public_ids = {
+        _get_public_id(instance, field_name, value) for field_name, value in stored.items()
+    }
+    public_ids.discard(None)
+    return public_ids
+
+
+def invalidate_cloudinary_object(instance, previous_public_ids, field_names=None):
+    """
+    Drop cached URLs of the assets a saved instance no longer uses.
+    `previous_public_ids` are the ones it had before the save. Keys
+    include the asset version, so a re-upload under the same public_id
+    never hits an old entry; only replaced assets need dropping.
+    """
+    replaced = set(previous_public_ids) - get_cloudinary_public_ids(instance, field_names)
+    if not replaced:
+        return 0
+    removed = 0
+    for cache in (image_url_cache, video_url_cache):
+        removed += cache.discard(lambda key: key[0] in replaced)
+    return removed
+
+
+def get_cloudinary_cache_stats():
+    return {
+        "image": image_url_cache.stats(),
+        "video": video_url_cache.stats(),
+    }
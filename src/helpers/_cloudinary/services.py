@@ -1,6 +1,19 @@
 from django.conf import settings
 from django.template.loader import get_template
 
+from .._perf import perf_count, perf_timed
+from .cache import get_resource_key, image_url_cache, video_url_cache
+
+
+def get_cloudinary_resource(instance, field_name):
+    resource = getattr(instance, field_name)
+    if isinstance(resource, str) and resource:
+        # Values assigned in code stay raw strings until the row is reloaded
+        resource = instance._meta.get_field(field_name).to_python(resource)
+    return resource
+
+
+@perf_timed("cloudinary")
 def get_cloudinary_image_object(instance, 
                                 field_name="image", 
                                 as_html=False, 
@@ -12,10 +25,18 @@ def get_cloudinary_image_object(instance,
         return ""
 
     # Get the image object from the instance
-    image_object = getattr(instance, field_name)
+    image_object = get_cloudinary_resource(instance, field_name)
     if not image_object:  # Return empty if the field is empty
         return ""
 
+    # Reuse a previously built URL / tag for this asset revision
+    public_id, version = get_resource_key(image_object)
+    cache_key = (public_id, version, field_name, width, format, as_html)
+    cached = image_url_cache.get(cache_key)
+    perf_count("cloudinary_cache_hit" if cached is not None else "cloudinary_cache_miss")
+    if cached is not None:
+        return cached
+
     # Define options for the image transformation
     image_options = {
         "width": width
@@ -25,13 +46,17 @@ def get_cloudinary_image_object(instance,
 
     # Return HTML representation if requested
     if as_html:
-        return image_object.image(**image_options)
+        _html = image_object.image(**image_options)
+        image_url_cache.set(cache_key, _html)
+        return _html
 
     # Otherwise, return the image URL
     url = image_object.build_url(**image_options)
+    image_url_cache.set(cache_key, url)
     return url
 
 
+@perf_timed("cloudinary")
 def get_cloudinary_video_object(instance, 
                                 field_name="video", 
                                 as_html=False, 
@@ -48,10 +73,21 @@ def get_cloudinary_video_object(instance,
         return ""
 
     # Get the video object from the instance
-    video_object = getattr(instance, field_name)
+    video_object = get_cloudinary_resource(instance, field_name)
     if not video_object:  # Return empty if the field is empty
         return ""
 
+    # Reuse a recently signed URL / rendered embed for this asset revision
+    public_id, version = get_resource_key(video_object)
+    cache_key = (
+        public_id, version, field_name, as_html, width, height,
+        sign_url, fetch_format, quality, controls, autoplay
+    )
+    cached = video_url_cache.get(cache_key)
+    perf_count("cloudinary_cache_hit" if cached is not None else "cloudinary_cache_miss")
+    if cached is not None:
+        return cached
+
     # Define options for the video transformation
     video_options = {
         "sign_url": sign_url,
@@ -80,7 +116,9 @@ def get_cloudinary_video_object(instance,
             'cloud_name': cloud_name,
             'base_color': "#007cae"  # Base color for the video player
         })
+        video_url_cache.set(cache_key, _html)
         return _html
 
     # Otherwise, return the video URL
+    video_url_cache.set(cache_key, url)
     return url
@@ -0,0 +1,19 @@
+from .multiprocess import MultiProcessStore
+from .services import (
+    flush_metrics_if_due,
+    metrics_counter,
+    metrics_histogram,
+    record_request_metrics,
+    registry,
+    render_metrics,
+)
+
+__all__ = [
+    "MultiProcessStore",
+    "flush_metrics_if_due",
+    "metrics_counter",
+    "metrics_histogram",
+    "record_request_metrics",
+    "registry",
+    "render_metrics",
+]
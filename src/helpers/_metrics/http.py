@@ -0,0 +1,48 @@
+from .registry import DEFAULT_BUCKETS
+
+DB_QUERY_BUCKETS = (0, 1, 2, 3, 5, 8, 13, 21, 50, 100)
+
+# Request metrics per URL pattern, fed by helpers.PerformanceMiddleware
+def get_request_metrics_families(registry):
+    return {
+        "requests": registry.counter(
+            "http_requests_total", "Requests by URL pattern, method and status.",
+            ("route", "method", "status"),
+        ),
+        "latency": registry.histogram(
+            "http_request_duration_seconds", "Request latency by URL pattern.",
+            ("route", "method"), buckets=DEFAULT_BUCKETS,
+        ),
+        "db_queries": registry.histogram(
+            "http_request_db_queries", "Database queries per request by URL pattern.",
+            ("route",), buckets=DB_QUERY_BUCKETS,
+        ),
+        "cache": registry.counter(
+            "cache_requests_total", "Cache lookups by cache and result (hit / miss).",
+            ("cache", "result"),
+        ),
+    }
+
+# Request metric counts -> cache_requests_total labels
+CACHE_COUNTS = {
+    "cache_hit": ("content", "hit"),
+    "cache_miss": ("content", "miss"),
+    "cloudinary_cache_hit": ("cloudinary", "hit"),
+    "cloudinary_cache_miss": ("cloudinary", "miss"),
+}
+
+def get_route(request):
+    # The matched URL pattern ("courses/<slug:course_id>/"), never the raw path
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    return "/" + match.route
+
+def observe_request(families, request, response, metrics):
+    route = get_route(request)
+    families["requests"].inc(route, request.method, response.status_code)
+    families["latency"].observe(metrics.total_ms() / 1000, route, request.method)
+    families["db_queries"].observe(metrics.calls("db"), route)
+    for name, labels in CACHE_COUNTS.items():
+        if name in metrics.counts:
+            families["cache"].inc(*labels, amount=metrics.counts[name])
@@ -0,0 +1,170 @@
+import glob
+import json
+import os
+import time
+
+try:
+    import fcntl
+except ImportError:  # Windows: no compaction, files of exited processes are kept
+    fcntl = None
+
+from .registry import merge_snapshots
+
+# Holds the summed snapshots of exited processes
+AGGREGATE_FILE = "metrics-aggregate.json"
+LOCK_FILE = "metrics.lock"
+
+
+def _read_json(path):
+    try:
+        with open(path) as fh:
+            return json.load(fh)
+    except (OSError, ValueError):
+        return None  # missing, or being replaced right now
+
+def _write_json(path, data):
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as fh:
+        json.dump(data, fh)
+    os.replace(tmp_path, path)
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except (ProcessLookupError, OverflowError):
+        return False
+    except PermissionError:
+        return True  # running, under another user
+    return True
+
+# merge_snapshots() output back into the JSON snapshot form
+def _as_snapshot(merged):
+    return {
+        name: {**data, "values": [[list(labels), value] for labels, value in data["values"].items()]}
+        for name, data in merged.items()
+    }
+
+
+class MultiProcessStore:
+    """
+    Shares metrics between worker processes (gunicorn, the outbox worker)
+    through a directory: each process writes its snapshot to its own file,
+    at most every `interval` seconds and at exit, and /metrics sums them all.
+
+    Files are named by pid and process start time, so a process that
+    reuses a dead one's pid never overwrites its counts. On each collect,
+    files of exited processes are folded into one aggregate file and
+    removed: counters never go backwards and the file count stays bounded
+    by the live processes.
+    """
+
+    def __init__(self, directory, registry, interval=5.0):
+        self.directory = directory
+        self.registry = registry
+        self.interval = interval
+        self._pid = None
+        self._started = None
+        self._last_flush = 0.0
+        os.makedirs(directory, exist_ok=True)
+
+    def _identity(self):
+        # Re-read after a fork (e.g. gunicorn --preload): the child is a new writer
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid, self._started = pid, time.time_ns()
+        return self._pid, self._started
+
+    def get_path(self):
+        pid, started = self._identity()
+        return os.path.join(self.directory, f"metrics-{pid}-{started}.json")
+
+    def flush(self):
+        _write_json(self.get_path(), self.registry.snapshot())
+        self._last_flush = time.monotonic()
+
+    def flush_if_due(self):
+        if time.monotonic() - self._last_flush >= self.interval:
+            self.flush()
+
+    def _process_files(self):
+        # {path: (pid, started)} of every per-process snapshot file
+        files = {}
+        for path in glob.glob(os.path.join(self.directory, "metrics-*-*.json")):
+            pid, _, started = os.path.basename(path)[len("metrics-"):-len(".json")].partition("-")
+            try:
+                files[path] = (int(pid), int(started))
+            except ValueError:
+                continue
+        return files
+
+    def _exited(self, files):
+        newest = {}
+        for pid, started in files.values():
+            newest[pid] = max(started, newest.get(pid, started))
+        own_path = self.get_path()
+        return [
+            path for path, (pid, started) in files.items()
+            # A newer file for the same pid means the pid was reused
+            if path != own_path and (started < newest[pid] or not _pid_alive(pid))
+        ]
+
+    def _compact(self, files):
+        """
+        Folds exited processes' files into the aggregate. The aggregate
+        records which files it holds, so a crash between writing it and
+        deleting them never counts a file twice.
+        """
+        aggregate_path = os.path.join(self.directory, AGGREGATE_FILE)
+        aggregate = _read_json(aggregate_path) or {"folded": [], "metrics": {}}
+        folded = set(aggregate["folded"])
+        fresh = [path for path in self._exited(files) if os.path.basename(path) not in folded]
+        stale = [path for path in files if os.path.basename(path) in folded]
+        if fresh:
+            snapshots = [aggregate["metrics"]]
+            names = []
+            for path in fresh:
+                snapshot = _read_json(path)
+                if snapshot is not None:
+                    snapshots.append(snapshot)
+                    names.append(os.path.basename(path))
+            # Names of files already deleted are dropped, so the list stays short
+            aggregate = {
+                "folded": sorted(name for name in folded | set(names) if os.path.exists(
+                    os.path.join(self.directory, name)
+                )),
+                "metrics": _as_snapshot(merge_snapshots(snapshots)),
+            }
+            _write_json(aggregate_path, aggregate)
+            stale += [os.path.join(self.directory, name) for name in names]
+        for path in stale:
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            files.pop(path, None)
+        return aggregate["metrics"]
+
+    def _collect(self):
+        files = self._process_files()
+        snapshots = [self._compact(files) if fcntl is not None else {}, self.registry.snapshot()]
+        own_path = self.get_path()
+        for path in files:
+            if path != own_path:
+                snapshot = _read_json(path)
+                if snapshot is not None:
+                    snapshots.append(snapshot)
+        return snapshots
+
+    def collect(self):
+        # This process' live values, the last snapshot of every other one
+        # and the aggregate of exited ones
+        if fcntl is None:
+            return self._collect()
+        # Collecting and compacting under one lock, so no scrape sees a file
+        # both folded and still on disk (or neither)
+        with open(os.path.join(self.directory, LOCK_FILE), "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                return self._collect()
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
@@ -0,0 +1,42 @@
+import atexit
+from django.conf import settings
+
+from .http import get_request_metrics_families, observe_request
+from .multiprocess import MultiProcessStore
+from .registry import Registry, render_text
+
+# Directory shared by worker processes; empty keeps metrics per process
+METRICS_MULTIPROC_DIR = getattr(settings, "METRICS_MULTIPROC_DIR", "")
+# Seconds between snapshot writes in multi-process mode
+METRICS_FLUSH_INTERVAL = getattr(settings, "METRICS_FLUSH_INTERVAL", 5.0)
+
+# This process' metrics
+registry = Registry()
+request_metrics = get_request_metrics_families(registry)
+
+multiprocess_store = None
+if METRICS_MULTIPROC_DIR:
+    multiprocess_store = MultiProcessStore(METRICS_MULTIPROC_DIR, registry, METRICS_FLUSH_INTERVAL)
+    atexit.register(multiprocess_store.flush)
+
+def metrics_counter(name, documentation, labelnames=()):
+    return registry.counter(name, documentation, labelnames)
+
+def metrics_histogram(name, documentation, labelnames=(), **kwargs):
+    return registry.histogram(name, documentation, labelnames, **kwargs)
+
+def flush_metrics_if_due():
+    if multiprocess_store is not None:
+        multiprocess_store.flush_if_due()
+
+def record_request_metrics(request, response, metrics):
+    observe_request(request_metrics, request, response, metrics)
+    flush_metrics_if_due()
+
+# All metrics in the Prometheus text format, summed over processes when shared
+def render_metrics(store=None):
+    store = store or multiprocess_store
+    if store is None:
+        return render_text([registry.snapshot()])
+    store.flush()
+    return render_text(store.collect())
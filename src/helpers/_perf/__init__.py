@@ -0,0 +1,17 @@
+from .db import install_query_timer
+from .handlers import QueuedStreamHandler
+from .metrics import get_request_metrics, perf_count, perf_timed
+from .middleware import PerformanceMiddleware
+from .sampling import SampleFilter
+from .templates import TimedDjangoTemplates
+
+__all__ = [
+    "PerformanceMiddleware",
+    "QueuedStreamHandler",
+    "SampleFilter",
+    "TimedDjangoTemplates",
+    "get_request_metrics",
+    "install_query_timer",
+    "perf_count",
+    "perf_timed",
+]
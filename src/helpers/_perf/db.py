@@ -0,0 +1,27 @@
+import time
+from django.db.backends.signals import connection_created
+
+from .metrics import get_request_metrics
+
+
+# connection.execute_wrapper() hook timing every query of the current request
+def query_timer(execute, sql, params, many, context):
+    metrics = get_request_metrics()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_time("db", time.perf_counter() - start)
+
+def install_query_timer(connection):
+    # Installed for the connection's lifetime: connections are per thread, and
+    # async views query from sync_to_async threads, not the request's own
+    if query_timer not in connection.execute_wrappers:
+        connection.execute_wrappers.append(query_timer)
+
+def _on_connection_created(sender, connection, **kwargs):
+    install_query_timer(connection)
+
+connection_created.connect(_on_connection_created, dispatch_uid="helpers.perf.query_timer")
@@ -0,0 +1,24 @@
+import atexit
+import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
+
+
+class QueuedStreamHandler(QueueHandler):
+    """
+    Hands records to a background thread that writes them to stderr, so
+    the request thread never blocks on the stream. Filters (e.g. sampling)
+    run before a record is queued. Used from settings.LOGGING.
+    """
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.listener = QueueListener(self.queue, logging.StreamHandler(stream), respect_handler_level=True)
+        self.listener.start()
+        atexit.register(self.close)
+
+    def close(self):
+        listener, self.listener = self.listener, None
+        if listener is not None:
+            listener.stop()  # writes out what is still queued
+        super().close()
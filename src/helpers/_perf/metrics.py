@@ -0,0 +1,78 @@
+import contextvars
+import time
+from contextlib import contextmanager
+
+# Metrics of the request being handled; contextvars follow the request into
+# sync_to_async threads, so async views are measured too
+_current = contextvars.ContextVar("perf_request_metrics", default=None)
+
+
+class RequestMetrics:
+    """
+    Time spent and events counted while handling one request.
+    `timings` maps a name to [seconds, calls]; `counts` a name to a count.
+    """
+    __slots__ = ("started", "timings", "counts", "_active")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.timings = {}
+        self.counts = {}
+        self._active = set()
+
+    def add_time(self, name, elapsed):
+        timing = self.timings.setdefault(name, [0.0, 0])
+        timing[0] += elapsed
+        timing[1] += 1
+
+    def add_count(self, name, value=1):
+        self.counts[name] = self.counts.get(name, 0) + value
+
+    def duration_ms(self, name):
+        return self.timings.get(name, (0.0, 0))[0] * 1000
+
+    def calls(self, name):
+        return self.timings.get(name, (0.0, 0))[1]
+
+    def total_ms(self):
+        return (time.perf_counter() - self.started) * 1000
+
+    def as_dict(self):
+        return {
+            "total_ms": round(self.total_ms(), 3),
+            "timings": {name: {"ms": round(seconds * 1000, 3), "calls": calls}
+                        for name, (seconds, calls) in self.timings.items()},
+            "counts": dict(self.counts),
+        }
+
+
+def start_request_metrics():
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+def stop_request_metrics(token):
+    _current.reset(token)
+
+def get_request_metrics():
+    return _current.get()
+
+# Times the block into the current request's metrics (a no-op outside requests)
+@contextmanager
+def perf_timed(name):
+    metrics = _current.get()
+    if metrics is None or name in metrics._active:
+        # Nested calls (a template including another) count once, at the outer level
+        yield
+        return
+    metrics._active.add(name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        metrics._active.discard(name)
+        metrics.add_time(name, time.perf_counter() - start)
+
+def perf_count(name, value=1):
+    metrics = _current.get()
+    if metrics is not None:
+        metrics.add_count(name, value)
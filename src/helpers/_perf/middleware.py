@@ -0,0 +1,91 @@
+import logging
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connection
+
+from .._metrics import record_request_metrics
+from .db import install_query_timer
+from .metrics import start_request_metrics, stop_request_metrics
+
+logger = logging.getLogger("helpers.perf")
+
+# Server-Timing entries: metric name -> what its calls are
+SERVER_TIMING_METRICS = {
+    "db": "queries",
+    "template": "renders",
+    "cloudinary": "URL builds",
+}
+
+def format_server_timing(metrics):
+    entries = []
+    for name, unit in SERVER_TIMING_METRICS.items():
+        if name in metrics.timings:
+            desc = f"{metrics.calls(name)} {unit}"
+            if name == "cloudinary":
+                desc += f", {metrics.counts.get('cloudinary_cache_hit', 0)} cached"
+            entries.append(f'{name};dur={metrics.duration_ms(name):.1f};desc="{desc}"')
+    hits, misses = metrics.counts.get("cache_hit", 0), metrics.counts.get("cache_miss", 0)
+    if hits or misses:
+        entries.append(f'cache;desc="{hits} hits, {misses} misses"')
+    entries.append(f"total;dur={metrics.total_ms():.1f}")
+    return ", ".join(entries)
+
+class PerformanceMiddleware:
+    """
+    Measures each request (DB queries, template renders, Cloudinary URL
+    builds, cache hits) and reports it as a `Server-Timing` header and a
+    `helpers.perf` debug log line. Place it first in MIDDLEWARE. Streaming
+    responses are measured up to the point the view returns.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        # Timings describe the backend, so the header is opt-in outside DEBUG
+        self.server_timing = getattr(settings, "PERF_SERVER_TIMING", settings.DEBUG)
+        install_query_timer(connection)
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        metrics, token = start_request_metrics()
+        try:
+            response = self.get_response(request)
+        finally:
+            stop_request_metrics(token)
+        return self.report(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics, token = start_request_metrics()
+        try:
+            response = await self.get_response(request)
+        finally:
+            stop_request_metrics(token)
+        return self.report(request, response, metrics)
+
+    def report(self, request, response, metrics):
+        record_request_metrics(request, response, metrics)  # /metrics aggregates
+        if self.server_timing:
+            response.headers["Server-Timing"] = format_server_timing(metrics)
+        # One line per request: off unless helpers.perf is at DEBUG (PERF_LOG_LEVEL)
+        if not logger.isEnabledFor(logging.DEBUG):
+            return response
+        logger.debug(
+            "method=%s path=%s status=%s total_ms=%.1f db_queries=%d db_ms=%.1f "
+            "template_ms=%.1f cloudinary_ms=%.1f cache_hits=%d cache_misses=%d",
+            request.method,
+            request.path,
+            response.status_code,
+            metrics.total_ms(),
+            metrics.calls("db"),
+            metrics.duration_ms("db"),
+            metrics.duration_ms("template"),
+            metrics.duration_ms("cloudinary"),
+            metrics.counts.get("cache_hit", 0),
+            metrics.counts.get("cache_miss", 0),
+            extra={"perf": metrics.as_dict()},
+        )
+        return response
@@ -0,0 +1,18 @@
+import logging
+import random
+
+
+class SampleFilter(logging.Filter):
+    """
+    Passes a `rate` fraction of records below WARNING; warnings and
+    errors always pass. Used from settings.LOGGING.
+    """
+
+    def __init__(self, rate=1.0, name=""):
+        super().__init__(name)
+        self.rate = rate
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING or self.rate >= 1:
+            return True
+        return random.random() < self.rate
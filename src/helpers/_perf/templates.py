@@ -0,0 +1,24 @@
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+from .metrics import perf_timed
+
+
+class TimedTemplate(Template):
+
+    def render(self, context=None, request=None):
+        with perf_timed("template"):
+            return super().render(context, request)
+
+
+# DjangoTemplates whose renders are timed into the request metrics
+class TimedDjangoTemplates(DjangoTemplates):
+
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
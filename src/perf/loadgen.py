@@ -0,0 +1,281 @@
+import http.cookiejar
+import logging
+import random
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from django.core.asgi import get_asgi_application
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+
+try:
+    import uvicorn
+except ImportError:  # optional, only needed for LocalAsgiServer
+    uvicorn = None
+
+from courses.models import Course, Lesson, PublishStatus
+from courses.services import VISIBLE_LESSON_STATUSES
+from .utils import summarize
+
+# Default share of each route in the replayed traffic
+DEFAULT_MIX = {
+    "home": 20,
+    "courses_hx": 15,
+    "course_detail": 25,
+    "lesson": 20,
+    "lesson_gated": 10,
+    "login_post": 5,
+    "verify": 5,
+}
+
+# Parses "home=20,lesson=5" into a route mix
+def parse_mix(value):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        name = name.strip()
+        if name not in DEFAULT_MIX:
+            raise ValueError(f"Unknown route {name!r}, expected one of {', '.join(DEFAULT_MIX)}")
+        mix[name] = float(weight)
+    return mix
+
+
+class _NoRedirect(urllib.request.HTTPRedirectHandler):
+    # A redirect is the response being measured (e.g. after /verify/), not followed
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+# One visitor with its own cookies (session, csrftoken); urllib opens a connection per request
+class VirtualUser:
+    def __init__(self, base_url, timeout=30):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.cookies = http.cookiejar.CookieJar()
+        self.opener = urllib.request.build_opener(
+            urllib.request.HTTPCookieProcessor(self.cookies), _NoRedirect
+        )
+
+    def request(self, path, data=None, headers=None):
+        """
+        Returns (status, elapsed_ms). HTTP error statuses are returned,
+        connection errors raise.
+        """
+        body = urllib.parse.urlencode(data).encode() if data is not None else None
+        req = urllib.request.Request(self.base_url + path, data=body, headers=headers or {})
+        start = time.perf_counter()
+        try:
+            with self.opener.open(req, timeout=self.timeout) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            e.read()
+            status = e.code
+        return status, (time.perf_counter() - start) * 1000
+
+    def get_cookie(self, name):
+        for cookie in self.cookies:
+            if cookie.name == name:
+                return cookie.value
+        return None
+
+    def csrf_headers(self):
+        token = self.get_cookie("csrftoken")
+        if token is None:
+            self.request("/login/")  # renders the form, which sets the cookie
+            token = self.get_cookie("csrftoken")
+        return {"X-CSRFToken": token or "", "HX-Request": "true", "Referer": self.base_url + "/login/"}
+
+
+# Paths of the published courses and their visible lessons, split by gating
+def get_published_paths():
+    lessons = Lesson.objects.filter(
+        course__status=PublishStatus.PUBLISHED,
+        status__in=VISIBLE_LESSON_STATUSES,
+    ).select_related("course")
+    open_lessons, gated_lessons = [], []
+    for lesson in lessons:
+        (gated_lessons if lesson.requires_email else open_lessons).append(lesson.path)
+    course_paths = [
+        course.path for course in Course.objects.filter(status=PublishStatus.PUBLISHED).only("public_id")
+    ]
+    return course_paths, open_lessons, gated_lessons
+
+
+# Turns the route mix into concrete requests over the seeded content
+class RoutePlan:
+    def __init__(self, course_paths, lesson_paths, gated_lesson_paths, tokens, mix=None, seed=0):
+        self.targets = {
+            "home": ["/"],
+            "courses_hx": ["/courses/"],
+            "course_detail": [path + "/" for path in course_paths],
+            "lesson": [path + "/" for path in lesson_paths],
+            "lesson_gated": [path + "/" for path in gated_lesson_paths],
+            "login_post": ["/hx/login/"],
+            "verify": [f"/verify/{token}/" for token in tokens],
+        }
+        mix = dict(DEFAULT_MIX if mix is None else mix)
+        # Routes without content (e.g. no gated lessons) are left out of the mix
+        self.mix = {name: weight for name, weight in mix.items() if weight > 0 and self.targets[name]}
+        self.rng = random.Random(seed)
+
+    def schedule(self, count):
+        """
+        Returns `count` (route, path) pairs. Every verify request gets its
+        own token, so the mix is capped by the tokens available.
+        """
+        names = list(self.mix)
+        routes = self.rng.choices(names, [self.mix[name] for name in names], k=count)
+        tokens = iter(self.targets["verify"])
+        plan = []
+        for name in routes:
+            if name == "verify":
+                path = next(tokens, None)
+                if path is None:
+                    continue
+            else:
+                path = self.rng.choice(self.targets[name])
+            plan.append((name, path))
+        return plan
+
+    @staticmethod
+    def verify_count(count, mix=None):
+        mix = DEFAULT_MIX if mix is None else mix
+        share = mix.get("verify", 0) / (sum(mix.values()) or 1)
+        # Headroom over the expected share for the random draw
+        return int(count * share * 1.5) + 10
+
+
+def _send(user, name, path, seq):
+    if name == "login_post":
+        return user.request(path, {"email": f"load{seq}@example.com"}, user.csrf_headers())
+    if name == "courses_hx":
+        return user.request(path, headers={"HX-Request": "true"})
+    return user.request(path)
+
+
+# Replays the plan with `concurrency` visitors and returns per-route samples
+def run_load(base_url, plan, concurrency=16, timeout=30):
+    """
+    Returns (elapsed_seconds, {route: {"samples": [...], "errors": n}}).
+    A 4xx/5xx status or a failed connection is an error.
+    """
+    results = {name: {"samples": [], "errors": 0} for name, _ in plan}
+    lock = threading.Lock()
+    local = threading.local()
+
+    def fetch(job):
+        seq, (name, path) = job
+        user = getattr(local, "user", None)
+        if user is None:
+            user = local.user = VirtualUser(base_url, timeout=timeout)
+        try:
+            status, elapsed = _send(user, name, path, seq)
+            failed = status >= 400
+        except OSError:
+            elapsed, failed = None, True
+        with lock:
+            if failed:
+                results[name]["errors"] += 1
+            else:
+                results[name]["samples"].append(elapsed)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(fetch, enumerate(plan)))
+    return time.perf_counter() - start, results
+
+# Per-route latency stats, throughput and error counts
+def build_report(elapsed, results):
+    report = {}
+    for name, result in sorted(results.items()):
+        stats = summarize(result["samples"])
+        stats["errors"] = result["errors"]
+        stats["rps"] = len(result["samples"]) / elapsed if elapsed else 0.0
+        report[name] = stats
+    total = sum(len(result["samples"]) for result in results.values())
+    errors = sum(result["errors"] for result in results.values())
+    summary = {
+        "requests": total + errors,
+        "errors": errors,
+        "elapsed_s": elapsed,
+        "rps": total / elapsed if elapsed else 0.0,
+    }
+    return summary, report
+
+
+# Silences the per-request helpers.perf line, which would drown a report
+@contextmanager
+def muted_perf_log():
+    """
+    Enter it once the server exists: building the WSGI / ASGI app runs
+    django.setup(), which applies LOGGING again and would undo it.
+    """
+    logger = logging.getLogger("helpers.perf")
+    level = logger.level
+    logger.setLevel(logging.WARNING)
+    try:
+        yield
+    finally:
+        logger.setLevel(level)
+
+
+class _QuietHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+# Serves the Django WSGI app from a background thread on a free local port
+class LocalServer:
+    def __init__(self, host="127.0.0.1", port=0):
+        self.httpd = ThreadedWSGIServer((host, port), _QuietHandler, allow_reuse_address=True)
+        self.httpd.set_app(get_wsgi_application())
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+# Serves the Django ASGI app with uvicorn from a background thread on a free local port
+class LocalAsgiServer:
+    def __init__(self, host="127.0.0.1", port=0):
+        if uvicorn is None:
+            raise RuntimeError("LocalAsgiServer needs uvicorn (pip install uvicorn).")
+        # Django's ASGI handler has no lifespan support
+        config = uvicorn.Config(
+            get_asgi_application(), host=host, port=port,
+            lifespan="off", access_log=False, log_level="warning",
+        )
+        self.server = uvicorn.Server(config)
+        self.thread = threading.Thread(target=self.server.run, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self.server.servers[0].sockets[0].getsockname()[:2]
+        return f"http://{host}:{port}"
+
+    def __enter__(self):
+        self.thread.start()
+        while not self.server.started:
+            if not self.thread.is_alive():
+                raise RuntimeError("uvicorn failed to start.")
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.server.should_exit = True
+        self.thread.join()
@@ -0,0 +1,93 @@
+import random
+import time
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from courses import search
+from courses.models import Course, Lesson, PublishStatus
+from perf.utils import benchmark_database, fast_sqlite_writes, format_stats, time_calls
+
+SYLLABLES = "ka lo mi ne ru sa te vi zo pa di fu ge ho ju".split()
+
+
+# A Zipf-distributed vocabulary, closer to real titles than a short word list
+class Vocabulary:
+    def __init__(self, rng, size=5000):
+        words = set()
+        while len(words) < size:
+            words.add("".join(rng.choices(SYLLABLES, k=rng.randint(2, 4))))
+        self.words = sorted(words)
+        rng.shuffle(self.words)
+        self.weights = [1 / (rank + 1) for rank in range(size)]
+        self.rng = rng
+
+    def text(self, count):
+        return " ".join(self.rng.choices(self.words, self.weights, k=count))
+
+
+class Command(BaseCommand):
+    help = "Time courses.search over a large catalogue with the FTS5 and in-process backends."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lessons", type=int, default=100_000)
+        parser.add_argument("--lessons-per-course", type=int, default=50)
+        parser.add_argument("--samples", type=int, default=500)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the benchmark database between runs.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        vocabulary = Vocabulary(rng)
+        with benchmark_database(keepdb=options["keepdb"]):
+            if Lesson.objects.count() < options["lessons"]:
+                self.seed(vocabulary, options)
+            queries = [self.make_query(vocabulary) for _ in range(options["samples"])]
+            backends = [search.MemoryBackend()]
+            if search.fts5_table_exists():
+                backends.insert(0, search.FTS5Backend())
+            for backend in backends:
+                start = time.perf_counter()
+                search.rebuild_index(backend)
+                self.stdout.write(f"{backend.name}: indexed in {time.perf_counter() - start:.1f}s")
+                stats = time_calls(lambda text: search.search_content(text, backend=backend), queries)
+                self.stdout.write(format_stats(f"search_content ({backend.name})", stats))
+
+    def make_query(self, vocabulary):
+        words = vocabulary.text(vocabulary.rng.randint(1, 2)).split()
+        # Search-as-you-type: the last word is usually still being typed
+        last = words[-1]
+        words[-1] = last[:vocabulary.rng.randint(min(3, len(last)), len(last))]
+        return " ".join(words)
+
+    def seed(self, vocabulary, options):
+        start = time.perf_counter()
+        fast_sqlite_writes()
+        per_course = options["lessons_per_course"]
+        with transaction.atomic():
+            courses = Course.objects.bulk_create([
+                Course(
+                    title=vocabulary.text(3).title(),
+                    description=vocabulary.text(30),
+                    status=PublishStatus.PUBLISHED if i % 10 else PublishStatus.DRAFT,
+                    public_id=f"bench-course-{i}",
+                )
+                for i in range(max(1, options["lessons"] // per_course))
+            ], batch_size=1000)
+            lessons = (
+                Lesson(
+                    course=courses[i // per_course % len(courses)],
+                    title=vocabulary.text(4).title(),
+                    description=vocabulary.text(20),
+                    public_id=f"bench-lesson-{i}",
+                    status=PublishStatus.PUBLISHED if i % 7 else PublishStatus.DRAFT,
+                )
+                for i in range(options["lessons"])
+            )
+            batch = []
+            for lesson in lessons:
+                batch.append(lesson)
+                if len(batch) == 5000:
+                    Lesson.objects.bulk_create(batch)
+                    batch = []
+            Lesson.objects.bulk_create(batch)
+        self.stdout.write(f"seeded {options['lessons']} lessons in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import Client, override_settings
+
+from courses.models import AccessRequirement, Course, Lesson, PublishStatus
+from emails.models import Email
+from perf.utils import benchmark_database
+
+# Counts statements against the session table, split into reads and writes
+class SessionQueryCounter:
+    def __init__(self):
+        self.reads = 0
+        self.writes = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        if "django_session" in sql:
+            if sql.lstrip().upper().startswith("SELECT"):
+                self.reads += 1
+            else:
+                self.writes += 1
+        return execute(sql, params, many, context)
+
+
+class Command(BaseCommand):
+    help = (
+        "Count django_session reads / writes per 1k requests for each "
+        "SESSION_STRATEGY, for anonymous visitors and verified readers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=1000)
+        parser.add_argument(
+            "--strategies",
+            nargs="+",
+            default=list(settings.SESSION_ENGINES),
+            choices=list(settings.SESSION_ENGINES),
+        )
+
+    def handle(self, *args, **options):
+        with benchmark_database():
+            paths = self.seed()
+            email = Email.objects.create(email="bench-session@example.com")
+            for strategy in options["strategies"]:
+                engine = settings.SESSION_ENGINES[strategy]
+                with override_settings(SESSION_ENGINE=engine, ALLOWED_HOSTS=["testserver"]):
+                    cache.clear()
+                    anonymous = self.run(paths, options["requests"], lambda: Client())
+                    verified = self.run(paths, options["requests"], self.verified_client(email))
+                per_1k = 1000 / options["requests"]
+                self.stdout.write(
+                    f"{strategy}: anonymous writes/1k={anonymous.writes * per_1k:.0f} "
+                    f"reads/1k={anonymous.reads * per_1k:.0f} | "
+                    f"verified writes/1k={verified.writes * per_1k:.0f} "
+                    f"reads/1k={verified.reads * per_1k:.0f}"
+                )
+
+    def seed(self):
+        open_course = Course.objects.create(
+            title="Open Course", status=PublishStatus.PUBLISHED, access=AccessRequirement.ANYONE
+        )
+        gated_course = Course.objects.create(
+            title="Gated Course", status=PublishStatus.PUBLISHED, access=AccessRequirement.EMAIL_REQUIRED
+        )
+        open_lesson = Lesson.objects.create(course=open_course, title="Open Lesson")
+        gated_lesson = Lesson.objects.create(course=gated_course, title="Gated Lesson")
+        return [
+            "/courses/",
+            open_course.path + "/",
+            gated_course.path + "/",
+            open_lesson.path + "/",
+            gated_lesson.path + "/",
+        ]
+
+    def verified_client(self, email):
+        client = Client()
+        session = client.session
+        session["email_id"] = f"{email.id}"
+        session.save()
+        client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+        return lambda: client
+
+    def run(self, paths, total, get_client):
+        counter = SessionQueryCounter()
+        with connection.execute_wrapper(counter):
+            for i in range(total):
+                # Anonymous visitors arrive without cookies; verified readers reuse theirs
+                response = get_client().get(paths[i % len(paths)])
+                assert response.status_code == 200, response.status_code
+        return counter
@@ -0,0 +1,176 @@
+import datetime
+import json
+import platform
+import random
+import subprocess
+import time
+import uuid
+import cloudinary
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+import helpers
+from courses import services as courses_services
+from courses.models import Course, Lesson, PublishStatus
+from emails import services as emails_services
+from emails.models import EmailVerificationEvent
+from perf import seeding
+from perf.utils import (
+    benchmark_database,
+    compare_results,
+    fast_sqlite_writes,
+    format_stats,
+    load_baseline,
+    time_calls,
+)
+
+METRICS = ("mean_ms", "p50_ms", "p95_ms", "p99_ms")
+
+
+class Command(BaseCommand):
+    help = (
+        "Time the courses, emails and Cloudinary hot paths on a seeded throwaway "
+        "database, write the results as JSON and optionally fail on regressions "
+        "against a baseline run."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=200)
+        parser.add_argument("--lessons-per-course", type=int, default=20)
+        parser.add_argument("--events", type=int, default=20_000, help="Verification events to create.")
+        parser.add_argument("--samples", type=int, default=500, help="Timed calls per case.")
+        parser.add_argument("--warmup", type=int, default=20, help="Untimed calls before each case.")
+        parser.add_argument("--batch-size", type=int, default=5000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the benchmark database between runs.")
+        parser.add_argument("-o", "--output", help="Write the results to this JSON file.")
+        parser.add_argument("--baseline", help="Results JSON of an earlier run to compare against.")
+        parser.add_argument(
+            "--threshold", type=float, default=0.2,
+            help="Fail when a case is this much slower than the baseline (0.2 = 20%%).",
+        )
+        parser.add_argument("--metric", choices=METRICS, default="p50_ms", help="Statistic compared.")
+        parser.add_argument("--min-delta-ms", type=float, default=0.05, help="Ignore smaller slowdowns.")
+
+    def handle(self, *args, **options):
+        baseline = load_baseline(options["baseline"])
+        rng = random.Random(options["seed"])
+        if not cloudinary.config().cloud_name:
+            # URLs are only built, never fetched
+            cloudinary.config(cloud_name="bench")
+        with benchmark_database(keepdb=options["keepdb"]):
+            self.seed(rng, options)
+            results = self.run_cases(rng, options)
+        report = {"meta": self.get_meta(options), "results": results}
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump(report, fh, indent=2, sort_keys=True)
+            self.stdout.write(f"results written to {options['output']}")
+        if baseline is not None:
+            self.compare(results, baseline, options)
+
+    def get_meta(self, options):
+        try:
+            commit = subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True
+            ).stdout.strip()
+        except (OSError, subprocess.CalledProcessError):
+            commit = None
+        return {
+            "created": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "commit": commit,
+            "python": platform.python_version(),
+            "django": django.get_version(),
+            "options": {
+                name: options[name]
+                for name in ("courses", "lessons_per_course", "events", "samples", "warmup", "seed")
+            },
+        }
+
+    def seed(self, rng, options):
+        if Course.objects.exists():
+            return  # --keepdb
+        start = time.perf_counter()
+        fast_sqlite_writes()
+        seeding.seed_courses(
+            rng, options["courses"], options["lessons_per_course"], batch_size=options["batch_size"]
+        )
+        seeding.seed_verification_events(
+            rng, max(1, options["events"] // 10), options["events"], batch_size=options["batch_size"]
+        )
+        self.stdout.write(f"seeded in {time.perf_counter() - start:.1f}s")
+
+    def run_cases(self, rng, options):
+        count = options["samples"] + options["warmup"]
+        courses = list(courses_services.get_publish_courses())
+        if not courses:
+            raise CommandError("The benchmark database has no published courses.")
+        lessons = list(
+            Lesson.objects.filter(
+                course__status=PublishStatus.PUBLISHED,
+                status__in=courses_services.VISIBLE_LESSON_STATUSES,
+            ).select_related("course")
+        )
+        # verify_token uses up a token: every call gets a fresh one
+        tokens = list(
+            EmailVerificationEvent.objects.filter(attempts=0, expired=False)
+            .values_list("token", flat=True)[:count]
+        )
+        new_emails = [f"suite-{uuid.uuid4().hex}@example.com" for _ in range(count)]
+        # Distinct lessons so the first pass builds every URL and the second reuses it
+        with_video = [lesson for lesson in lessons if lesson.video]
+        media = rng.sample(with_video, min(count, len(with_video)))
+
+        cases = [
+            ("get_publish_courses", lambda _: list(courses_services.get_publish_courses()), range(count)),
+            ("get_course_lessons", lambda course: list(courses_services.get_course_lessons(course)),
+             rng.choices(courses, k=count)),
+            ("get_lesson_detail", lambda lesson: courses_services.get_lesson_detail(*lesson), [
+                (lesson.course.public_id, lesson.public_id) for lesson in rng.choices(lessons, k=count)
+            ]),
+            ("verify_token", emails_services.verify_token, tokens),
+            ("start_verification_event", emails_services.start_verification_event, new_emails),
+            ("cloudinary_image_url (build)", self.image_url, media),
+            ("cloudinary_image_url (cached)", self.image_url, media),
+            ("cloudinary_video_url (build)", self.video_url, media),
+            ("cloudinary_video_url (cached)", self.video_url, media),
+        ]
+        results = {}
+        with override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend"):
+            for name, func, items in cases:
+                items = list(items)
+                if len(items) <= options["warmup"]:
+                    self.stderr.write(f"{name}: not enough data for {count} calls, skipped")
+                    continue
+                for item in items[:options["warmup"]]:
+                    func(item)
+                results[name] = time_calls(func, items[options["warmup"]:])
+                self.stdout.write(format_stats(name, results[name]))
+        return results
+
+    def image_url(self, lesson):
+        return helpers.get_cloudinary_image_object(lesson, field_name="thumbnail", width=382)
+
+    def video_url(self, lesson):
+        return helpers.get_cloudinary_video_object(lesson, as_html=False, width=1280, height=720)
+
+    def compare(self, results, baseline, options):
+        rows = compare_results(
+            results,
+            baseline,
+            threshold=options["threshold"],
+            metric=options["metric"],
+            min_delta_ms=options["min_delta_ms"],
+        )
+        regressions = []
+        for name, before, after, change, regressed in rows:
+            flag = "  REGRESSION" if regressed else ""
+            self.stdout.write(f"{name}: {before:.3f}ms -> {after:.3f}ms ({change:+.1%}){flag}")
+            if regressed:
+                regressions.append(name)
+        if regressions:
+            raise CommandError(
+                f"{len(regressions)} case(s) regressed by more than {options['threshold']:.0%} "
+                f"on {options['metric']}: {', '.join(regressions)}"
+            )
@@ -0,0 +1,54 @@
+import random
+import time
+import uuid
+from django.core.management.base import BaseCommand
+
+from emails import services as emails_services
+from emails.models import EmailVerificationEvent
+from perf import seeding
+from perf.utils import benchmark_database, fast_sqlite_writes, format_stats, time_calls
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark emails.services.verify_token against a large verification "
+        "events table in a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000, help="Verification events to create.")
+        parser.add_argument("--emails", type=int, default=10_000, help="Distinct Email rows.")
+        parser.add_argument("--samples", type=int, default=1000, help="verify_token calls to time.")
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the benchmark database between runs.")
+
+    def handle(self, *args, **options):
+        rng = random.Random(options["seed"])
+        with benchmark_database(keepdb=options["keepdb"]):
+            tokens = self.seed(rng, options)
+            valid = rng.sample(tokens, min(options["samples"], len(tokens)))
+            missing = [uuid.uuid4() for _ in range(max(1, options["samples"] // 10))]
+
+            query = EmailVerificationEvent.objects.filter(
+                token=valid[0], expired=False, attempts__lt=5
+            )
+            self.stdout.write(f"query plan: {query.explain()}")
+            valid_stats = time_calls(emails_services.verify_token, valid)
+            missing_stats = time_calls(emails_services.verify_token, missing)
+        self.stdout.write(format_stats("verify_token (valid)", valid_stats))
+        self.stdout.write(format_stats("verify_token (unknown)", missing_stats))
+
+    def seed(self, rng, options):
+        if not EmailVerificationEvent.objects.exists():
+            start = time.perf_counter()
+            fast_sqlite_writes()
+            emails, events = seeding.seed_verification_events(
+                rng, options["emails"], options["rows"], batch_size=options["batch_size"]
+            )
+            self.stdout.write(f"seeded {events} events for {emails} emails in {time.perf_counter() - start:.1f}s")
+        # Unused tokens (--keepdb reuses the data): each call uses one up
+        return list(
+            EmailVerificationEvent.objects.filter(attempts=0, expired=False)
+            .values_list("token", flat=True)[:options["samples"] * 10]
+        )
@@ -0,0 +1,87 @@
+import random
+import time
+import cloudinary
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+from courses.models import Course
+from perf import loadgen, seeding
+from perf.utils import benchmark_database, fast_sqlite_writes, format_stats
+
+# Course pages, served by the sync views under WSGI and the async ones under ASGI
+PAGE_MIX = {"courses_hx": 10, "course_detail": 45, "lesson": 35, "lesson_gated": 10}
+
+# Stack name, URLconf and the local server running it
+STACKS = (
+    ("wsgi", "perf.urls_sync", loadgen.LocalServer),
+    ("asgi", "perf.urls_async", loadgen.LocalAsgiServer),
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Serve the course pages from a seeded throwaway database twice: the sync views "
+        "on a threaded WSGI server and the async views on uvicorn (ASGI). Replay the same "
+        "requests over HTTP against both and compare req/s and latency. Needs uvicorn."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000, help="Requests per run.")
+        parser.add_argument("--concurrency", type=int, default=16, help="Concurrent virtual users.")
+        parser.add_argument("--warmup", type=int, default=50, help="Untimed requests before each run.")
+        parser.add_argument("--courses", type=int, default=20)
+        parser.add_argument("--lessons", type=int, default=10, help="Lessons per course.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds.")
+        parser.add_argument("--cold", action="store_true", help="Serve without a cache (dummy backend).")
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the benchmark database between runs.")
+
+    def handle(self, *args, **options):
+        if loadgen.uvicorn is None:
+            raise CommandError("The ASGI run needs uvicorn: pip install uvicorn")
+        if not cloudinary.config().cloud_name:
+            # The seeded media are fake ids: URLs are built, never fetched
+            cloudinary.config(cloud_name="bench")
+        caches = settings.CACHES
+        if options["cold"]:
+            caches = {"default": {"BACKEND": "django.core.cache.backends.dummy.DummyCache"}}
+        reports = {}
+        with benchmark_database(keepdb=options["keepdb"]):
+            self.seed(options)
+            course_paths, open_lessons, gated_lessons = loadgen.get_published_paths()
+            if not course_paths:
+                raise CommandError("No published courses to request.")
+            plan = loadgen.RoutePlan(
+                course_paths, open_lessons, gated_lessons, [], mix=PAGE_MIX, seed=options["seed"]
+            )
+            # Both stacks replay the same requests
+            warmup = plan.schedule(options["warmup"])
+            workload = plan.schedule(options["requests"])
+            with override_settings(ALLOWED_HOSTS=["127.0.0.1", "localhost"], CACHES=caches):
+                for name, urlconf, server_class in STACKS:
+                    with override_settings(ROOT_URLCONF=urlconf):
+                        reports[name] = self.run(server_class(), warmup, workload, options)
+        for name, (summary, report) in reports.items():
+            self.stdout.write(
+                f"{name}: {summary['rps']:.1f} req/s, {summary['errors']} errors "
+                f"in {summary['elapsed_s']:.1f}s"
+            )
+            for route, stats in report.items():
+                self.stdout.write("  " + format_stats(route, stats))
+
+    def seed(self, options):
+        if Course.objects.exists():
+            return  # --keepdb
+        start = time.perf_counter()
+        fast_sqlite_writes()
+        seeding.seed_courses(random.Random(options["seed"]), options["courses"], options["lessons"])
+        self.stdout.write(f"seeded in {time.perf_counter() - start:.1f}s")
+
+    def run(self, server, warmup, workload, options):
+        with server, loadgen.muted_perf_log():
+            loadgen.run_load(server.url, warmup, options["concurrency"], options["timeout"])
+            elapsed, results = loadgen.run_load(
+                server.url, workload, options["concurrency"], options["timeout"]
+            )
+        return loadgen.build_report(elapsed, results)
@@ -0,0 +1,142 @@
+import json
+import random
+import time
+import uuid
+import cloudinary
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+from django.test import override_settings
+
+from courses.models import Course
+from emails.models import Email, EmailVerificationEvent
+from perf import loadgen, seeding
+from perf.utils import (
+    benchmark_database,
+    compare_results,
+    fast_sqlite_writes,
+    format_stats,
+    load_baseline,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Replay a mix of public page, HTMX, login and verification requests over HTTP "
+        "and report throughput and p50/p95/p99 per route. Without --url the site is "
+        "served from a seeded throwaway database by an in-process threaded WSGI server."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--url",
+            help="Base URL of a running server (runserver, gunicorn, uvicorn, ...). It must use "
+                 "this project's database: paths are read from it, and verification events for "
+                 "loadtest@example.com are written to it. The login route queues outbox mail for "
+                 "load*@example.com on the target. Refused with DEBUG off unless --yes is given.",
+        )
+        parser.add_argument("--yes", action="store_true", help="Allow --url even though DEBUG is off.")
+        parser.add_argument("--requests", type=int, default=2000)
+        parser.add_argument("--concurrency", type=int, default=16, help="Concurrent virtual users.")
+        parser.add_argument("--warmup", type=int, default=50, help="Untimed requests before the run.")
+        parser.add_argument("--mix", type=loadgen.parse_mix, help="Route weights, e.g. home=20,lesson=10,verify=5.")
+        parser.add_argument("--courses", type=int, default=20, help="Courses seeded for the in-process server.")
+        parser.add_argument("--lessons", type=int, default=10, help="Lessons per seeded course.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--timeout", type=float, default=30, help="Per-request timeout in seconds.")
+        parser.add_argument("--keepdb", action="store_true", help="Reuse the benchmark database between runs.")
+        parser.add_argument("-o", "--output", help="Write the report to this JSON file.")
+        parser.add_argument("--baseline", help="Report JSON of an earlier run to compare against.")
+        parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown (0.2 = 20%%).")
+        parser.add_argument("--metric", choices=("p50_ms", "p95_ms", "p99_ms"), default="p95_ms")
+        parser.add_argument("--min-delta-ms", type=float, default=1.0, help="Ignore smaller slowdowns.")
+        parser.add_argument("--max-error-rate", type=float, default=0.01, help="Fail above this share of errors.")
+
+    def handle(self, *args, **options):
+        if options["url"] and not settings.DEBUG and not options["yes"]:
+            raise CommandError(
+                "--url writes verification events into this database and queues mail on the "
+                "target, and DEBUG is off; pass --yes to run against it anyway."
+            )
+        baseline = load_baseline(options["baseline"])
+        if options["url"]:
+            summary, report = self.run(options["url"], options)
+        else:
+            if not cloudinary.config().cloud_name:
+                # The seeded media are fake ids: URLs are built, never fetched
+                cloudinary.config(cloud_name="bench")
+            with benchmark_database(keepdb=options["keepdb"]):
+                self.seed(options)
+                with override_settings(ALLOWED_HOSTS=["127.0.0.1", "localhost"]):
+                    server = loadgen.LocalServer()
+                    with server, loadgen.muted_perf_log():
+                        summary, report = self.run(server.url, options)
+        self.stdout.write(
+            f"{summary['requests']} requests in {summary['elapsed_s']:.1f}s: "
+            f"{summary['rps']:.1f} req/s, {summary['errors']} errors"
+        )
+        for name, stats in report.items():
+            self.stdout.write(
+                format_stats(name, stats) + f" rps={stats['rps']:.1f} errors={stats['errors']}"
+            )
+        if options["output"]:
+            with open(options["output"], "w") as fh:
+                json.dump({"summary": summary, "results": report}, fh, indent=2, sort_keys=True)
+            self.stdout.write(f"report written to {options['output']}")
+        self.verify_report(summary, report, baseline, options)
+
+    def run(self, base_url, options):
+        plan = self.make_plan(options)
+        warmup = plan.schedule(options["warmup"])
+        loadgen.run_load(base_url, warmup, options["concurrency"], options["timeout"])
+        workload = plan.schedule(options["requests"])
+        elapsed, results = loadgen.run_load(base_url, workload, options["concurrency"], options["timeout"])
+        return loadgen.build_report(elapsed, results)
+
+    def make_plan(self, options):
+        course_paths, open_lessons, gated_lessons = loadgen.get_published_paths()
+        if not course_paths:
+            raise CommandError("No published courses to request.")
+        count = loadgen.RoutePlan.verify_count(options["requests"] + options["warmup"], options["mix"])
+        tokens = self.create_tokens(count)
+        close_old_connections()
+        return loadgen.RoutePlan(
+            course_paths, open_lessons, gated_lessons, tokens, mix=options["mix"], seed=options["seed"]
+        )
+
+    def create_tokens(self, count):
+        # Fresh single-use tokens for the /verify/<token>/ clicks
+        email_obj, _ = Email.objects.get_or_create(email="loadtest@example.com")
+        events = EmailVerificationEvent.objects.bulk_create([
+            EmailVerificationEvent(parent=email_obj, email=email_obj.email, token=uuid.uuid4())
+            for _ in range(count)
+        ])
+        return [event.token for event in events]
+
+    def seed(self, options):
+        if Course.objects.exists():
+            return  # --keepdb
+        start = time.perf_counter()
+        fast_sqlite_writes()
+        seeding.seed_courses(random.Random(options["seed"]), options["courses"], options["lessons"])
+        self.stdout.write(f"seeded in {time.perf_counter() - start:.1f}s")
+
+    def verify_report(self, summary, report, baseline, options):
+        failures = []
+        if summary["requests"] and summary["errors"] / summary["requests"] > options["max_error_rate"]:
+            failures.append(f"error rate {summary['errors'] / summary['requests']:.1%}")
+        if baseline is not None:
+            rows = compare_results(
+                report,
+                baseline,
+                threshold=options["threshold"],
+                metric=options["metric"],
+                min_delta_ms=options["min_delta_ms"],
+            )
+            for name, before, after, change, regressed in rows:
+                flag = "  REGRESSION" if regressed else ""
+                self.stdout.write(f"{name}: {before:.1f}ms -> {after:.1f}ms ({change:+.1%}){flag}")
+                if regressed:
+                    failures.append(f"{name} {options['metric']} {change:+.0%}")
+        if failures:
+            raise CommandError("Load test failed: " + "; ".join(failures))
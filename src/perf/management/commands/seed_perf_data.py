@@ -0,0 +1,58 @@
+import random
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from courses import search
+from perf import seeding
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the configured database with synthetic courses, lessons, emails and "
+        "verification events for performance work. Deterministic for a given --seed; "
+        "media are fake Cloudinary ids, nothing is uploaded. Meant for development "
+        "databases: refuses to run with DEBUG off unless --yes is given."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--courses", type=int, default=1000)
+        parser.add_argument("--lessons-per-course", type=int, default=20)
+        parser.add_argument("--emails", type=int, default=100_000)
+        parser.add_argument("--events", type=int, default=1_000_000, help="Verification events to create.")
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--clear", action="store_true", help="Delete previously seeded rows first.")
+        parser.add_argument("--skip-index", action="store_true", help="Do not rebuild the search index.")
+        parser.add_argument("--yes", action="store_true", help="Seed even though DEBUG is off.")
+
+    def handle(self, *args, **options):
+        if not settings.DEBUG and not options["yes"]:
+            raise CommandError(
+                "DEBUG is off, so this may be a production database; pass --yes to seed it anyway."
+            )
+        if seeding.seeded_data_exists():
+            if not options["clear"]:
+                raise CommandError("Seeded data already exists; pass --clear to replace it.")
+            start = time.perf_counter()
+            seeding.clear_seeded_data(batch_size=options["batch_size"])
+            self.stdout.write(f"cleared previous seed in {time.perf_counter() - start:.1f}s")
+        rng = random.Random(options["seed"])
+
+        start = time.perf_counter()
+        courses, lessons = seeding.seed_courses(
+            rng, options["courses"], options["lessons_per_course"], batch_size=options["batch_size"]
+        )
+        self.stdout.write(f"{courses} courses, {lessons} lessons in {time.perf_counter() - start:.1f}s")
+
+        start = time.perf_counter()
+        emails, events = seeding.seed_verification_events(
+            rng, options["emails"], options["events"], batch_size=options["batch_size"]
+        )
+        self.stdout.write(f"{emails} emails, {events} verification events in {time.perf_counter() - start:.1f}s")
+
+        seeding.bump_seeded_versions()
+        if not options["skip_index"]:
+            start = time.perf_counter()
+            search.rebuild_index()
+            self.stdout.write(f"search index rebuilt in {time.perf_counter() - start:.1f}s")
@@ -0,0 +1,225 @@
+import uuid
+from datetime import timedelta
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.text import slugify
+
+from courses import cache as courses_cache
+from courses.models import (
+    PUBLIC_ID_SLUG_LENGTH,
+    AccessRequirement,
+    Course,
+    Lesson,
+    PublishStatus,
+    encode_base32,
+)
+from emails.models import Email, EmailVerificationEvent
+
+# Starts the public ids of seeded courses and lessons. slugify() never
+# yields a double hyphen, so no generated public id can start with it
+PUBLIC_ID_PREFIX = "perf--"
+# Cloudinary folder of the fake media ids
+MEDIA_FOLDER = "perf"
+# Domain of the seeded email addresses
+EMAIL_DOMAIN = "perf.example.com"
+
+WORDS = (
+    "python django async cache query index search video course lesson intro "
+    "advanced testing deploy docker redis postgres sqlite templates forms "
+    "signals middleware security email session api rest htmx tailwind "
+    "performance profiling scaling design patterns data models views"
+).split()
+
+# Status / access mixes, weighted roughly like a live catalogue
+COURSE_STATUSES = {PublishStatus.PUBLISHED: 80, PublishStatus.COMING_SOON: 10, PublishStatus.DRAFT: 10}
+LESSON_STATUSES = {PublishStatus.PUBLISHED: 75, PublishStatus.COMING_SOON: 15, PublishStatus.DRAFT: 10}
+EMAIL_REQUIRED_SHARE = 0.3
+CAN_PREVIEW_SHARE = 0.2
+# Token uses drawn per event: mostly unused, some partly or fully used up
+ATTEMPTS = (0, 0, 0, 0, 1, 2, 5)
+
+EVENT_FIELDS = (
+    "parent", "email", "token", "attempts", "last_attempt_at", "expired", "expired_at", "timestamp"
+)
+
+
+def _choose(rng, weights):
+    return rng.choices(list(weights), list(weights.values()))[0]
+
+def _title(rng, count):
+    return " ".join(rng.choices(WORDS, k=count)).title()
+
+# Same shape as courses.models.generate_public_id, but drawn from `rng` and prefixed
+def make_public_id(rng, title):
+    slug = slugify(title)[:PUBLIC_ID_SLUG_LENGTH].strip("-")
+    return f"{PUBLIC_ID_PREFIX}{slug}-{encode_base32(rng.getrandbits(90), 18)}"
+
+# Fake, never uploaded Cloudinary values in the stored "type/upload/vN/id.ext" form
+def fake_image(public_id, version):
+    return f"image/upload/v{version}/{MEDIA_FOLDER}/{public_id}.jpg"
+
+def fake_video(public_id, version):
+    return f"video/private/v{version}/{MEDIA_FOLDER}/{public_id}.mp4"
+
+def _batched(iterable, size):
+    batch = []
+    for item in iterable:
+        batch.append(item)
+        if len(batch) == size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+# Creates courses and their lessons; returns (courses, lessons) created
+def seed_courses(rng, courses, lessons_per_course, batch_size=10_000):
+    """
+    Statuses, access and can_preview follow the mixes above. Every course
+    and lesson gets a fake image id; lessons that are not coming soon
+    also get a fake video. Renditions are left empty, so pages build
+    the URLs on first render.
+    """
+    version = 1_700_000_000
+    course_count = lesson_count = 0
+    # Course batches bounded so a batch's lessons stay around `batch_size` rows
+    courses_per_batch = max(1, batch_size // max(1, lessons_per_course))
+    for batch in _batched(range(courses), courses_per_batch):
+        course_objs = []
+        for _ in batch:
+            title = _title(rng, rng.randint(2, 5))
+            public_id = make_public_id(rng, title)
+            course_objs.append(Course(
+                title=title,
+                description=_title(rng, 30).capitalize(),
+                public_id=public_id,
+                image=fake_image(public_id, version),
+                access=(
+                    AccessRequirement.EMAIL_REQUIRED if rng.random() < EMAIL_REQUIRED_SHARE
+                    else AccessRequirement.ANYONE
+                ),
+                status=_choose(rng, COURSE_STATUSES),
+            ))
+        with transaction.atomic():
+            Course.objects.bulk_create(course_objs)
+            lesson_objs = []
+            for course in course_objs:
+                for order in range(lessons_per_course):
+                    title = _title(rng, rng.randint(2, 6))
+                    public_id = make_public_id(rng, title)
+                    status = _choose(rng, LESSON_STATUSES)
+                    lesson_objs.append(Lesson(
+                        course=course,
+                        title=title,
+                        description=_title(rng, 15).capitalize(),
+                        public_id=public_id,
+                        thumbnail=fake_image(public_id, version),
+                        video=fake_video(public_id, version) if status != PublishStatus.COMING_SOON else None,
+                        order=order,
+                        can_preview=rng.random() < CAN_PREVIEW_SHARE,
+                        status=status,
+                    ))
+            Lesson.objects.bulk_create(lesson_objs, batch_size=batch_size)
+        course_count += len(course_objs)
+        lesson_count += len(lesson_objs)
+    return course_count, lesson_count
+
+# Batched multi-row INSERT of already prepared column values
+def bulk_insert(model, field_names, rows, batch_size=10_000):
+    """
+    For tables far too large for bulk_create: its per-object, per-value
+    preparation costs more than the database writes. `rows` hold values
+    already converted with the fields' get_db_prep_save().
+    """
+    fields = [model._meta.get_field(name) for name in field_names]
+    sql = "INSERT INTO {} ({}) VALUES ({})".format(
+        connection.ops.quote_name(model._meta.db_table),
+        ", ".join(connection.ops.quote_name(field.column) for field in fields),
+        ", ".join(["%s"] * len(fields)),
+    )
+    count = 0
+    for batch in _batched(rows, batch_size):
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.executemany(sql, batch)
+        count += len(batch)
+    return count
+
+def _prep(model, field_name, value):
+    return model._meta.get_field(field_name).get_db_prep_save(value, connection)
+
+# Creates Email rows and verification events spread over them
+def seed_verification_events(rng, emails, events, batch_size=10_000):
+    """
+    Returns (emails, events) created. Events are a mix of unused, partly
+    used, used-up and expired tokens, with deterministic UUIDs.
+    """
+    email_addresses = [f"user{i}@{EMAIL_DOMAIN}" for i in range(emails)]
+    email_ids = []
+    for batch in _batched(email_addresses, batch_size):
+        with transaction.atomic():
+            created = Email.objects.bulk_create([Email(email=address) for address in batch])
+        email_ids.extend(email.pk for email in created)
+    if not email_ids:
+        return 0, 0
+
+    model = EmailVerificationEvent
+    now = timezone.now()
+    # The few distinct datetime values, prepared once instead of per row
+    timestamp = _prep(model, "timestamp", now)
+    expired_at = _prep(model, "expired_at", now)
+    last_attempts = {
+        attempts: _prep(model, "last_attempt_at", now - timedelta(minutes=attempts)) if attempts else None
+        for attempts in ATTEMPTS
+    }
+    # UUIDField.get_db_prep_value, resolved once: native uuid or 32 hex characters
+    native_uuid = connection.features.has_native_uuid_field
+
+    def rows():
+        for _ in range(events):
+            index = rng.randrange(len(email_ids))
+            attempts = rng.choice(ATTEMPTS)
+            expired = attempts >= 5 or rng.random() < 0.2
+            token = uuid.UUID(int=rng.getrandbits(128), version=4)
+            yield (
+                email_ids[index],
+                email_addresses[index],
+                token if native_uuid else token.hex,
+                attempts,
+                last_attempts[attempts],
+                expired,
+                expired_at if expired else None,
+                timestamp,
+            )
+
+    created = bulk_insert(model, EVENT_FIELDS, rows(), batch_size=batch_size)
+    return len(email_ids), created
+
+def _seeded_courses():
+    return Course.objects.filter(public_id__startswith=PUBLIC_ID_PREFIX)
+
+def _seeded_emails():
+    return Email.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}")
+
+def seeded_data_exists():
+    return _seeded_emails().exists() or _seeded_courses().exists()
+
+# Deletes through the ORM, a batch of primary keys at a time, so memory stays bounded
+def _delete_in_batches(queryset, batch_size):
+    model = queryset.model
+    pks = queryset.order_by().values_list("pk", flat=True)
+    deleted = 0
+    while batch := list(pks[:batch_size]):
+        with transaction.atomic():
+            deleted += model.objects.filter(pk__in=batch).delete()[0]
+    return deleted
+
+# Removes everything the seed functions created (lessons and outbox rows cascade)
+def clear_seeded_data(batch_size=10_000):
+    # Events first: deleting an Email only unlinks its events
+    _delete_in_batches(EmailVerificationEvent.objects.filter(email__endswith=f"@{EMAIL_DOMAIN}"), batch_size)
+    _delete_in_batches(_seeded_emails(), batch_size)
+    _delete_in_batches(_seeded_courses(), batch_size)
+
+# bulk_create sends no signals: invalidate the cached course pages by hand
+def bump_seeded_versions():
+    scopes = [courses_cache.get_course_scope(pk) for pk in Course.objects.values_list("pk", flat=True)]
+    courses_cache.bump_content_version(courses_cache.LIST_SCOPE, *scopes)
@@ -0,0 +1,9 @@
+from django.urls import path, include
+
+from course.urls import urlpatterns as project_urlpatterns
+from courses.urls import async_urlpatterns
+
+# Project URLs with /courses/ pinned to the async views (ASGI runs of compare_wsgi_asgi)
+urlpatterns = [
+    path("courses/", include(async_urlpatterns)),
+] + project_urlpatterns
@@ -0,0 +1,9 @@
+from django.urls import path, include
+
+from course.urls import urlpatterns as project_urlpatterns
+from courses.urls import sync_urlpatterns
+
+# Project URLs with /courses/ pinned to the sync views (WSGI runs of compare_wsgi_asgi)
+urlpatterns = [
+    path("courses/", include(sync_urlpatterns)),
+] + project_urlpatterns
@@ -0,0 +1,91 @@
+import json
+import statistics
+import time
+from contextlib import contextmanager
+from django.core.management.base import CommandError
+from django.db import connection
+
+# Runs the block against a throwaway copy of the default database
+@contextmanager
+def benchmark_database(keepdb=False, verbosity=0):
+    """
+    Creates (and afterwards destroys) the test database, so benchmarks
+    never write into the development / production data.
+    """
+    old_name = connection.settings_dict["NAME"]
+    connection.creation.create_test_db(verbosity=verbosity, autoclobber=True, keepdb=keepdb)
+    try:
+        yield connection.settings_dict["NAME"]
+    finally:
+        connection.creation.destroy_test_db(old_name, verbosity=verbosity, keepdb=keepdb)
+
+# Relaxes durability for bulk seeding of a throwaway SQLite database
+def fast_sqlite_writes():
+    if connection.vendor != "sqlite":
+        return
+    with connection.cursor() as cursor:
+        cursor.execute("PRAGMA synchronous = OFF")
+        cursor.execute("PRAGMA journal_mode = MEMORY")
+        # 256 MB page cache: index pages of random keys (UUID tokens) stay in memory
+        cursor.execute("PRAGMA cache_size = -262144")
+
+# Times `func` once per item and returns latency stats in milliseconds
+def time_calls(func, items):
+    samples = []
+    for item in items:
+        start = time.perf_counter()
+        func(item)
+        samples.append((time.perf_counter() - start) * 1000)
+    return summarize(samples)
+
+def percentile(sorted_samples, pct):
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, max(0, round(pct / 100 * len(sorted_samples)) - 1))
+    return sorted_samples[index]
+
+def summarize(samples):
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "mean_ms": statistics.fmean(ordered) if ordered else 0.0,
+        "p50_ms": percentile(ordered, 50),
+        "p95_ms": percentile(ordered, 95),
+        "p99_ms": percentile(ordered, 99),
+        "max_ms": ordered[-1] if ordered else 0.0,
+    }
+
+def format_stats(name, stats):
+    return (
+        f"{name}: n={stats['count']} mean={stats['mean_ms']:.3f}ms "
+        f"p50={stats['p50_ms']:.3f}ms p95={stats['p95_ms']:.3f}ms "
+        f"p99={stats['p99_ms']:.3f}ms max={stats['max_ms']:.3f}ms"
+    )
+
+# Compares two benchmark results ({case: stats}) on one statistic
+def compare_results(results, baseline, threshold=0.2, metric="p50_ms", min_delta_ms=0.05):
+    """
+    Returns (case, baseline_ms, current_ms, change, regressed) for every case
+    present in both. A case regressed when it is more than `threshold` (a fraction)
+    slower and at least `min_delta_ms` slower, so sub-noise timings of very
+    fast calls do not fail a run.
+    """
+    rows = []
+    for name, stats in results.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name][metric], stats[metric]
+        change = (after - before) / before if before else 0.0
+        regressed = change > threshold and after - before >= min_delta_ms
+        rows.append((name, before, after, change, regressed))
+    return rows
+
+# The "results" of a bench_suite / load_test JSON report, None without a path
+def load_baseline(path):
+    if not path:
+        return None
+    try:
+        with open(path) as fh:
+            return json.load(fh)["results"]
+    except (OSError, ValueError, KeyError, TypeError) as e:
+        raise CommandError(f"Cannot read baseline {path}: {e}")